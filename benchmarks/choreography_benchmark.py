@@ -0,0 +1,74 @@
+"""
+qfly | Qualisys Drone SDK Benchmark: Choreography
+
+Times one control tick of a keyframed swarm choreography,
+computing targets for every drone, as in the example scripts:
+
+  per_drone  np.interp on scalars and utils.pol2cart,
+             in a Python loop over drones
+  timeline   Timeline.evaluate, all drones in one vectorized call
+
+Also times Timeline.send with stubbed drones, which adds geofencing
+and handing each setpoint to its drone, and so still grows with
+swarm size.
+"""
+
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+# Import qfly from this checkout, whether installed or not
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from qfly import Pose, Timeline, World, utils
+
+
+# SETTINGS
+drone_counts = [2, 20, 200]  # Swarm sizes
+keyframe_count = 13  # Keyframes per drone
+radius = 0.5  # Circle radius (Unit: m)
+repeat = 5  # Timing runs, best of which is reported
+world = World()
+
+
+class StubCrazyflie:
+    """Stands in for QualisysCrazyflie, geofencing setpoints and dropping them."""
+
+    def __init__(self):
+        self.world = world
+
+    def safe_position_setpoint(self, target, world=None):
+        target.clamp(world or self.world)
+
+
+def per_drone(keyframe_times, phis, t):
+    targets = []
+    for phi in phis:
+        _x, _y = utils.pol2cart(radius, float(np.interp(t, keyframe_times, phi)))
+        targets.append(Pose(_x, _y, 1.0))
+    return targets
+
+
+for drone_count in drone_counts:
+    keyframe_times = np.arange(keyframe_count, dtype=float)
+    # Each drone circles from its own starting angle
+    phis = (np.arange(keyframe_count) * 30.0)[None, :] + \
+        np.arange(drone_count)[:, None] * 360.0 / drone_count
+    positions = np.stack([radius * np.cos(np.radians(phis)),
+                          radius * np.sin(np.radians(phis)),
+                          np.ones_like(phis)], axis=-1)
+    timeline = Timeline(keyframe_times, positions, interpolation='spline')
+    stubs = [StubCrazyflie() for _ in range(drone_count)]
+    out = np.empty((drone_count, 4))
+
+    number = max(10, 20000 // drone_count)
+    results = {}
+    for name, tick in [('per_drone', lambda: per_drone(keyframe_times, phis, 5.5)),
+                       ('timeline', lambda: timeline.evaluate(5.5, out=out)),
+                       ('send', lambda: timeline.send(stubs, 5.5))]:
+        results[name] = min(timeit.repeat(tick, number=number, repeat=repeat)) / number
+    print(f'{drone_count:4d} drones | '
+          + ' | '.join(f'{name}: {seconds * 1e6:8.1f} us/tick' for name, seconds in results.items())
+          + f' | speedup: {results["per_drone"] / results["timeline"]:6.1f}x')
@@ -0,0 +1,96 @@
+"""
+qfly | Qualisys Drone SDK Benchmark: Connect
+
+Measures time spent connecting to a real Crazyflie.
+Requires a Crazyradio and a powered Crazyflie, but no QTM.
+
+Compares opening the link without a TOC cache, with a cold cache
+and with a warm cache.
+
+Compares writing the connect-time parameters one at a time,
+waiting for each acknowledgement, against writing them in one batch.
+"""
+
+
+import os
+import sys
+import tempfile
+from threading import Event
+import time
+
+from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+
+# Import qfly from this checkout, whether installed or not
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from qfly import radio
+
+
+# SETTINGS
+cf_uri = 'radio://0/80/2M/E7E7E7E7E7'  # Crazyflie address
+repeats = 5  # Measurements per method
+params = {
+    'activeMarker.front': 1,
+    'activeMarker.right': 2,
+    'activeMarker.back': 3,
+    'activeMarker.left': 4,
+    'ring.effect': 0,
+    'posCtlPid.xyVelMax': 0.5,
+    'posCtlPid.zVelMax': 0.5,
+    'stabilizer.estimator': 2,
+    'locSrv.extQuatStdDev': 0.2,
+}
+
+
+def set_one_by_one(cf):
+    for name, value in params.items():
+        group, _, short_name = name.partition('.')
+        updated = Event()
+
+        def on_update(name, value):
+            updated.set()
+
+        cf.param.add_update_callback(group=group, name=short_name, cb=on_update)
+        cf.param.set_value(name, value)
+        updated.wait(2.0)
+        cf.param.remove_update_callback(group=group, name=short_name, cb=on_update)
+
+
+def set_in_batch(cf):
+    failures = radio.set_params(cf, params)
+    if failures:
+        print(f'Failures: {failures}')
+
+
+def open_link(toc_cache):
+    cf = radio.make_crazyflie(toc_cache)
+    scf = SyncCrazyflie(cf_uri, cf=cf)
+    t = time.perf_counter()
+    scf.open_link()
+    elapsed = time.perf_counter() - t
+    scf.close_link()
+    return elapsed
+
+
+radio.init_drivers()
+
+# TOC cache
+with tempfile.TemporaryDirectory() as cache_dir:
+    no_cache = min(open_link(False) for _ in range(repeats))
+    cold_cache = open_link(cache_dir)
+    warm_cache = min(open_link(cache_dir) for _ in range(repeats))
+print(f'{"no cache":>12} | open link: {no_cache:.3f} s')
+print(f'{"cold cache":>12} | open link: {cold_cache:.3f} s')
+print(f'{"warm cache":>12} | open link: {warm_cache:.3f} s')
+
+# Parameter writes
+cf = radio.make_crazyflie()
+with SyncCrazyflie(cf_uri, cf=cf) as scf:
+    for label, method in [('one by one', set_one_by_one),
+                          ('batch', set_in_batch)]:
+        elapsed = []
+        for _ in range(repeats):
+            t = time.perf_counter()
+            method(scf.cf)
+            elapsed.append(time.perf_counter() - t)
+        print(f'{label:>12} | {len(params)} params | '
+              f'best: {min(elapsed):.3f} s | mean: {sum(elapsed) / repeats:.3f} s')
@@ -0,0 +1,106 @@
+"""
+qfly | Qualisys Drone SDK Benchmark: Extpos Lead
+
+Replays a drone flying in a circle through QualisysCrazyflie,
+with a stubbed radio that takes time to deliver each pose,
+and measures how far the delivered poses are from where the drone
+really is when they arrive, without and with latency compensation.
+
+QTM latency is modelled by replaying each frame some time after
+the position it holds, and radio latency by a delay in the stub.
+The 'auto' lead only sees the part of the delay that qfly can measure,
+so a fixed lead that knows the whole delay does best.
+"""
+
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+from cflib.utils.callbacks import Caller
+import numpy as np
+
+# Import qfly from this checkout, whether installed or not
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from qfly import QualisysCrazyflie, QtmWrapper, ReplaySource, World
+from qfly.qtm import FRAME_DTYPE
+
+
+# SETTINGS
+rate = 100  # Mocap frame rate (Unit: Hz)
+duration = 10.0  # Replay length (Unit: s)
+radius = 1.0  # Circle radius (Unit: m)
+speed = 1.0  # Flying speed (Unit: m/s)
+noise = 0.0005  # Mocap noise (Unit: m)
+qtm_delay = 0.010  # From exposure to frame leaving QTM (Unit: s)
+radio_delay = 0.004  # From send to arrival on drone (Unit: s)
+leads = [None, 'auto', qtm_delay + radio_delay]  # Lead settings to compare
+
+
+def circle(t):
+    phase = t * speed / radius
+    return np.stack([radius * np.cos(phase), radius * np.sin(phase),
+                     np.ones_like(phase)], axis=-1)
+
+
+class StubExtpos:
+    """Stands in for cflib's Extpos, taking time to deliver poses."""
+
+    def __init__(self):
+        self.arrivals = []
+
+    def send_extpos(self, x, y, z):
+        time.sleep(radio_delay)
+        self.arrivals.append((time.perf_counter(), x, y, z))
+
+
+class StubCrazyflie:
+    """Stands in for cflib's Crazyflie."""
+
+    def __init__(self):
+        self.extpos = StubExtpos()
+        self.link_quality_updated = Caller()
+        self.link_statistics = self
+
+
+def make_replay():
+    times = np.arange(int(duration * rate)) / rate
+    frames = np.zeros((len(times), 1), dtype=FRAME_DTYPE)
+    # Each frame holds where the drone was when it was exposed
+    rng = np.random.default_rng(0)
+    frames['position'][:, 0] = circle(times - qtm_delay) + rng.normal(0, noise, (len(times), 3))
+    frames['rotation'] = np.eye(3)
+    frames['valid'] = True
+    frames['frame'] = np.arange(len(times))[:, None]
+    return ReplaySource(frames, ['cf'], times=times)
+
+
+def measure(lead):
+    replay = make_replay()
+    cf = StubCrazyflie()
+    starts = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        qcf = QualisysCrazyflie('cf', 'stub://0', World(expanse=10), qtm_ip=replay, crazyflie=cf,
+                                extpos_lead=lead)
+        # Host time at replay time 0, from frames passed on without delay
+        clock = QtmWrapper('cf', lambda pose: starts.append(
+            replay.received - replay.timestamp * 1e-6), qtm_ip=replay)
+        qcf.track()
+        replay.finished.wait()
+        time.sleep(0.1)
+        clock.close()
+        qcf.untrack()
+
+    arrivals = np.array(cf.extpos.arrivals)
+    truth = circle(arrivals[:, 0] - min(starts))
+    error = np.linalg.norm(arrivals[:, 1:] - truth, axis=1) * 1000
+    label = 'off' if lead is None else lead if isinstance(lead, str) else f'{lead * 1000:.0f} ms'
+    print(f'{label:>6} | error mean: {error.mean():6.2f} mm | p95: {np.percentile(error, 95):6.2f} mm | '
+          f'max: {error.max():6.2f} mm | measured lead: {qcf.measured_lead * 1000:5.2f} ms')
+
+
+print(f'{speed} m/s, {qtm_delay * 1000:.0f} ms QTM delay, {radio_delay * 1000:.0f} ms radio delay')
+for lead in leads:
+    measure(lead)
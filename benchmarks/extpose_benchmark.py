@@ -0,0 +1,66 @@
+"""
+qfly | Qualisys Drone SDK Benchmark: Extpose
+
+Compares the per-frame cost of streaming position only (extpos)
+against full 6DOF pose (extpose) in QualisysCrazyflie,
+with the radio replaced by a stub, as well as the cost of
+batch quaternion conversion for a whole frame.
+"""
+
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+# Import qfly from this checkout, whether installed or not
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from qfly import Pose, QualisysCrazyflie, World, utils
+
+
+# SETTINGS
+frame_count = 100000  # Frames per measurement
+body_count = 100  # Bodies for batch conversion
+
+
+class StubExtpos:
+    """Stands in for cflib's Extpos, dropping all packets."""
+
+    def send_extpos(self, x, y, z):
+        pass
+
+    def send_extpose(self, x, y, z, qx, qy, qz, qw):
+        pass
+
+
+class StubCrazyflie:
+    """Stands in for cflib's Crazyflie."""
+
+    extpos = StubExtpos()
+
+
+def measure(label, func, number):
+    elapsed = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f'{label:>28} | {elapsed * 1e9:8.1f} ns')
+
+
+qcf = QualisysCrazyflie('Crazyflie', 'radio://0/80/2M/E7E7E7E7E7', World())
+qcf.cf = StubCrazyflie()
+
+# A rotation of 30 degrees around Z
+c, s = np.cos(np.radians(30)), np.sin(np.radians(30))
+pose = Pose(0.1, 0.2, 0.3, rotmatrix=[[c, -s, 0], [s, c, 0], [0, 0, 1]])
+
+qcf.extpose = False
+measure('_set_pose (position only)', lambda: qcf._set_pose(pose), frame_count)
+qcf.extpose = True
+measure('_set_pose (full pose)', lambda: qcf._set_pose(pose), frame_count)
+measure('rotmatrix_to_quaternion', lambda: utils.rotmatrix_to_quaternion(pose.rotmatrix),
+        frame_count)
+
+rotations = np.tile(np.array(pose.rotmatrix), (body_count, 1, 1))
+elapsed = min(timeit.repeat(lambda: utils.rotmatrices_to_quaternions(rotations),
+                            number=1000, repeat=5)) / 1000
+print(f'{"rotmatrices_to_quaternions":>28} | {elapsed * 1e9 / body_count:8.1f} ns/body '
+      f'({body_count} bodies)')
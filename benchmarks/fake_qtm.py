@@ -0,0 +1,165 @@
+"""
+qfly | Qualisys Drone SDK Benchmark Helper: Fake QTM
+
+Local stand-in for the QTM real time server, streaming synthetic 6D frames
+over TCP at a given rate and body count, as QTM would.
+
+The server runs in a process of its own, so that its CPU time
+is not counted against qfly. It listens on QTM's default port,
+so QTM itself must not be running on the same machine.
+
+Body i is at x = i mm, and carries its frame number as its y coordinate
+in mm. Receivers can thus tell which frame a pose came from,
+and compare receive times against send times from sent_times().
+Both are taken with time.perf_counter(), which is shared
+between processes on Linux.
+"""
+
+
+import asyncio
+import multiprocessing
+import struct
+import time
+
+import numpy as np
+
+
+PORT = 22223  # QTM's little-endian real time port
+
+# Packet types
+_ERROR = 0
+_COMMAND = 1
+_XML = 2
+_DATA = 3
+
+_HEADER = struct.Struct('<II')
+_DATA_HEADER = struct.Struct('<qII')
+_COMPONENT_HEADER = struct.Struct('<II')
+_6D_HEADER = struct.Struct('<ihh')
+_6D_COMPONENT = 5
+_BODY_DTYPE = np.dtype([('position', '<f4', (3,)), ('rotation', '<f4', (9,))])
+
+
+def body_name(index):
+    """
+    Name of a body streamed by the fake QTM server.
+    """
+    return f'body{index}'
+
+
+def frame_of(pose):
+    """
+    Frame number a pose streamed by the fake QTM server came from.
+    """
+    return round(pose.y * 1000)
+
+
+class FakeQtm:
+    """
+    Fake QTM server running in a separate process while in context.
+    """
+
+    def __init__(self, body_count, rate, host='127.0.0.1'):
+        self.body_count = body_count
+        self.rate = rate
+        self.host = host
+        self._pipe, child_pipe = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(host, body_count, rate, child_pipe), daemon=True)
+
+    def __enter__(self):
+        self._process.start()
+        # Wait until listening
+        self._pipe.recv()
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, tb=None):
+        self._process.join(5.0)
+        if self._process.is_alive():
+            self._process.terminate()
+
+    def sent_times(self, timeout=5.0):
+        """
+        Send time of each frame by frame number - 1, once streaming
+        has been stopped by the client.
+        """
+        if not self._pipe.poll(timeout):
+            raise TimeoutError('Fake QTM did not report send times')
+        return self._pipe.recv()
+
+
+def _serve(host, body_count, rate, pipe):
+    """
+    Process entry point.
+    """
+    asyncio.run(_serve_async(host, body_count, rate, pipe))
+
+
+async def _serve_async(host, body_count, rate, pipe):
+    """
+    Serve one client, then report send times.
+    """
+    done = asyncio.Event()
+    sent = []
+
+    xml = ('<QTM_Parameters_Ver_1.24><The_6D>'
+           + ''.join(f'<Body><Name>{body_name(i)}</Name></Body>' for i in range(body_count))
+           + '</The_6D></QTM_Parameters_Ver_1.24>').encode()
+
+    bodies = np.zeros(body_count, dtype=_BODY_DTYPE)
+    bodies['position'][:, 0] = np.arange(body_count)
+    bodies['position'][:, 2] = 1000.0
+    bodies['rotation'] = (1, 0, 0, 0, 1, 0, 0, 0, 1)
+    component_size = _COMPONENT_HEADER.size + _6D_HEADER.size + bodies.nbytes
+    data_size = _HEADER.size + _DATA_HEADER.size + component_size
+
+    def packet(kind, payload):
+        return _HEADER.pack(_HEADER.size + len(payload), kind) + payload
+
+    async def stream(writer):
+        period = 1.0 / rate
+        deadline = time.perf_counter()
+        frame = 0
+        while True:
+            frame += 1
+            bodies['position'][:, 1] = frame
+            t = time.perf_counter()
+            writer.write(_HEADER.pack(data_size, _DATA)
+                         + _DATA_HEADER.pack(int(t * 1e6), frame, 1)
+                         + _COMPONENT_HEADER.pack(component_size, _6D_COMPONENT)
+                         + _6D_HEADER.pack(body_count, 0, 0)
+                         + bodies.tobytes())
+            sent.append(t)
+            deadline += period
+            await asyncio.sleep(max(0.0, deadline - time.perf_counter()))
+
+    async def handle(reader, writer):
+        writer.write(packet(_COMMAND, b'QTM RT Interface connected\0'))
+        streaming = None
+        try:
+            while True:
+                size, kind = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+                command = (await reader.readexactly(size - _HEADER.size)).rstrip(b'\0')
+                command = command.decode().lower()
+                if command.startswith('version'):
+                    writer.write(packet(_COMMAND, f'Version set to {command.split()[1]}\0'.encode()))
+                elif command.startswith('getparameters'):
+                    writer.write(packet(_XML, xml + b'\0'))
+                elif command == 'streamframes stop':
+                    break
+                elif command.startswith('streamframes') and streaming is None:
+                    streaming = asyncio.ensure_future(stream(writer))
+                else:
+                    writer.write(packet(_ERROR, b'Unsupported command\0'))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        if streaming is not None:
+            streaming.cancel()
+        writer.close()
+        done.set()
+
+    server = await asyncio.start_server(handle, host, PORT)
+    pipe.send('listening')
+    async with server:
+        await done.wait()
+    pipe.send(np.array(sent))
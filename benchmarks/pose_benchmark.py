@@ -0,0 +1,101 @@
+"""
+qfly | Qualisys Drone SDK Benchmark: Pose
+
+Compares the cost of constructing and clamping Pose objects on the hot path
+against the previous dict-backed, mutable Pose implementation.
+Reports time per operation, allocated memory per frame and size per Pose.
+"""
+
+
+import os
+import sys
+import timeit
+import tracemalloc
+from collections import namedtuple
+
+# Import qfly from this checkout, whether installed or not
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from qfly import Pose, World
+
+
+# SETTINGS
+body_count = 10  # Bodies per frame
+frame_count = 10000  # Frames per measurement
+
+
+class LegacyPose:
+    """
+    Pose as implemented before it became immutable, for reference.
+    """
+
+    def __init__(self, x, y, z, roll=None, pitch=None, yaw=None, rotmatrix=None):
+        self.x = x
+        self.y = y
+        self.z = z
+
+        self.roll = roll
+        self.pitch = pitch
+        self.yaw = yaw
+        self.rotmatrix = rotmatrix
+
+    @classmethod
+    def from_qtm_6d(cls, qtm_6d):
+        qtm_rot = qtm_6d[1].matrix
+        rotmatrix = [[qtm_rot[0], qtm_rot[3], qtm_rot[6]],
+                     [qtm_rot[1], qtm_rot[4], qtm_rot[7]],
+                     [qtm_rot[2], qtm_rot[5], qtm_rot[8]]]
+        return cls(qtm_6d[0][0] / 1000,
+                   qtm_6d[0][1] / 1000,
+                   qtm_6d[0][2] / 1000,
+                   rotmatrix=rotmatrix)
+
+    def clamp(self, world):
+        self.x = max(world.origin.x - world.expanse + world.padding,
+                     min(self.x, world.origin.x + world.expanse - world.padding))
+        self.y = max(world.origin.y - world.expanse + world.padding,
+                     min(self.y, world.origin.y + world.expanse - world.padding))
+        self.z = max(0,
+                     min(self.z, world.origin.z + (2 * world.expanse) - world.padding))
+
+
+# Same shape as 6D data from the QTM SDK
+Position = namedtuple('Position', 'x y z')
+Rotation = namedtuple('Rotation', 'matrix')
+component_6d = [(Position(100.0 * i, 200.0, 300.0),
+                 Rotation((1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0)))
+                for i in range(body_count)]
+
+world = World()
+
+
+def decode_frame(cls):
+    return [cls.from_qtm_6d(body_6d) for body_6d in component_6d]
+
+
+def measure(cls):
+    # Time
+    decode_time = min(timeit.repeat(lambda: decode_frame(cls),
+                                    number=frame_count, repeat=5)) / frame_count
+    pose = cls(2.0, 2.0, 3.0)
+    clamp_time = min(timeit.repeat(lambda: pose.clamp(world),
+                                   number=frame_count, repeat=5)) / frame_count
+
+    # Memory
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    frames = [decode_frame(cls) for _ in range(100)]
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat
+                    in snapshot_after.compare_to(snapshot_before, 'filename'))
+    del frames
+
+    print(f'{cls.__name__:>12} | '
+          f'decode: {decode_time * 1e6:7.2f} us/frame | '
+          f'clamp: {clamp_time * 1e9:7.1f} ns | '
+          f'memory: {allocated / 100:8.0f} B/frame')
+
+
+print(f'{body_count} bodies per frame')
+measure(LegacyPose)
+measure(Pose)
@@ -0,0 +1,213 @@
+"""
+qfly | Qualisys Drone SDK Benchmark: Stream
+
+Measures the end-to-end cost of the mocap pipeline against a local fake QTM
+server streaming at several frame rates and body counts, for:
+
+  qtm_wrapper  QtmWrapper callbacks, i.e. receiving, decoding and
+               Pose.from_qtm_6d, per subscribed body
+  set_pose     QualisysCrazyflie._set_pose streaming poses to a stubbed
+               radio through the radio sender thread
+  setpoint     set_pose plus a control callback per body sending
+               safe_position_setpoint on every frame
+
+Reports frames per second and loss per body, latency percentiles from
+the fake QTM sending a frame to the callback or stubbed radio seeing it,
+and CPU time per body and frame. Also times Pose.from_qtm_6d alone.
+
+Results are saved as JSON. Pass an earlier results file to compare:
+
+    python stream_benchmark.py stream_benchmark.json
+"""
+
+
+import contextlib
+import io
+from importlib import metadata
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import timeit
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from cflib.utils.callbacks import Caller
+import numpy as np
+
+# Import qfly from this checkout, whether installed or not
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from qfly import Pose, QtmWrapper, QualisysCrazyflie, World
+from fake_qtm import FakeQtm, body_name, frame_of
+
+
+# SETTINGS
+rates = [100, 300]  # QTM frame rates (Unit: Hz)
+body_counts = [1, 10, 100]  # Bodies streamed and subscribed
+scenarios = ['qtm_wrapper', 'set_pose', 'setpoint']
+duration = 5.0  # Time per measurement (Unit: s)
+bodies_per_radio = 10  # Drones sharing a stubbed radio sender thread
+output = 'stream_benchmark.json'  # Results file
+baseline = sys.argv[1] if len(sys.argv) > 1 else None  # Earlier results file
+
+
+class StubExtpos:
+    """Stands in for cflib's Extpos, noting when packets go out."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def send_extpos(self, x, y, z):
+        self.events.append((round(y * 1000), time.perf_counter()))
+
+    def send_extpose(self, x, y, z, qx, qy, qz, qw):
+        self.send_extpos(x, y, z)
+
+
+class StubCommander:
+    """Stands in for cflib's Commander, noting when setpoints go out.
+    Setpoints carry their frame number as yaw."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def send_position_setpoint(self, x, y, z, yaw):
+        self.events.append((round(yaw), time.perf_counter()))
+
+    def send_stop_setpoint(self):
+        pass
+
+
+class StubCrazyflie:
+    """Stands in for cflib's Crazyflie."""
+
+    def __init__(self, extpos_events, setpoint_events):
+        self.extpos = StubExtpos(extpos_events)
+        self.commander = StubCommander(setpoint_events)
+        self.link_quality_updated = Caller()
+        self.link_statistics = self
+
+
+def subscribe(scenario, body_count, events):
+    """
+    Subscribe to all bodies for a scenario.
+    Returns function to unsubscribe.
+    """
+    world = World(expanse=1e6)
+    if scenario == 'qtm_wrapper':
+        wrappers = [QtmWrapper(body_name(i), lambda pose, e=events[i]: e.append(
+                        (frame_of(pose), time.perf_counter())))
+                    for i in range(body_count)]
+        return lambda: [w.close() for w in wrappers]
+
+    qcfs = []
+    controls = []
+    for i in range(body_count):
+        cf = StubCrazyflie([] if scenario == 'setpoint' else events[i], events[i])
+        qcf = QualisysCrazyflie(body_name(i), f'stub://{i // bodies_per_radio}/{i}',
+                                world, crazyflie=cf)
+        qcf.track()
+        qcfs.append(qcf)
+        if scenario == 'setpoint':
+            controls.append(QtmWrapper(body_name(i), lambda pose, qcf=qcf: (
+                qcf.safe_position_setpoint(Pose(pose.x, pose.y, 1.0, yaw=frame_of(pose))))))
+
+    def unsubscribe():
+        for control in controls:
+            control.close()
+        for qcf in qcfs:
+            qcf.untrack()
+    return unsubscribe
+
+
+def measure(scenario, rate, body_count):
+    events = [[] for _ in range(body_count)]
+    # Keep connection messages out of the results
+    with FakeQtm(body_count, rate) as fake_qtm, contextlib.redirect_stdout(io.StringIO()):
+        unsubscribe = subscribe(scenario, body_count, events)
+
+        # Warm up until every body has been seen
+        while not all(events):
+            time.sleep(0.01)
+        time.sleep(0.5)
+        for body_events in events:
+            body_events.clear()
+
+        t0, cpu0 = time.perf_counter(), time.process_time()
+        time.sleep(duration)
+        t1, cpu1 = time.perf_counter(), time.process_time()
+        measured = [list(body_events) for body_events in events]
+
+        unsubscribe()
+        sent = fake_qtm.sent_times()
+
+    frames_sent = int(np.count_nonzero((sent >= t0) & (sent < t1)))
+    received = np.array([len(body_events) for body_events in measured])
+    latency = np.array([t - sent[frame - 1]
+                        for body_events in measured for frame, t in body_events])
+    cpu = cpu1 - cpu0
+    return {'scenario': scenario,
+            'rate': rate,
+            'bodies': body_count,
+            'fps': float(received.mean() / (t1 - t0)),
+            'loss': float(max(0.0, 1 - received.mean() / max(frames_sent, 1))),
+            'latency_us': {name: float(np.percentile(latency, q) * 1e6)
+                           for name, q in [('p50', 50), ('p90', 90), ('p99', 99), ('max', 100)]},
+            'cpu_us_per_body_frame': float(cpu / max(received.sum(), 1) * 1e6),
+            'cpu_percent': float(cpu / (t1 - t0) * 100)}
+
+
+def print_result(result, reference=None):
+    latency = result['latency_us']
+    line = (f'{result["scenario"]:>12} | {result["rate"]:4d} Hz | {result["bodies"]:4d} bodies | '
+            f'{result["fps"]:6.1f} fps | loss: {result["loss"] * 100:5.2f} % | '
+            f'latency p50/p99: {latency["p50"]:7.0f} /{latency["p99"]:7.0f} us | '
+            f'CPU: {result["cpu_us_per_body_frame"]:6.1f} us/body/frame')
+    if reference is not None:
+        line += (f' | vs baseline: latency p99 '
+                 f'{latency["p99"] / reference["latency_us"]["p99"]:5.2f}x, CPU '
+                 f'{result["cpu_us_per_body_frame"] / reference["cpu_us_per_body_frame"]:5.2f}x')
+    print(line)
+
+
+# Same shape as 6D data from the QTM SDK
+Position = namedtuple('Position', 'x y z')
+Rotation = namedtuple('Rotation', 'matrix')
+body_6d = (Position(100.0, 200.0, 300.0),
+           Rotation((1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0)))
+from_qtm_6d = min(timeit.repeat(lambda: Pose.from_qtm_6d(body_6d),
+                                number=100000, repeat=5)) / 100000
+print(f'Pose.from_qtm_6d: {from_qtm_6d * 1e9:.1f} ns/body')
+
+reference = {}
+if baseline is not None:
+    with open(baseline) as f:
+        reference = {(r['scenario'], r['rate'], r['bodies']): r
+                     for r in json.load(f)['results']}
+
+logging.getLogger('qtm').setLevel(logging.WARNING)
+results = []
+for scenario in scenarios:
+    for rate in rates:
+        for body_count in body_counts:
+            result = measure(scenario, rate, body_count)
+            print_result(result, reference.get((scenario, rate, body_count)))
+            results.append(result)
+
+try:
+    version = metadata.version('qfly')
+except metadata.PackageNotFoundError:
+    version = None
+with open(output, 'w') as f:
+    json.dump({'benchmark': 'stream',
+               'qfly': version,
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'processor': platform.processor(),
+               'time': datetime.now(timezone.utc).isoformat(),
+               'settings': {'duration': duration, 'bodies_per_radio': bodies_per_radio},
+               'from_qtm_6d_ns': from_qtm_6d * 1e9,
+               'results': results}, f, indent=2)
+print(f'Results saved to {output}')
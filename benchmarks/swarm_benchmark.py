@@ -0,0 +1,108 @@
+"""
+qfly | Qualisys Drone SDK Benchmark: Swarm
+
+Flies growing simulated swarms through the full qfly control stack,
+to find the swarm size where the host stops keeping up.
+Needs no radio or QTM.
+
+For each swarm size, all drones are started together, take off and
+hover for a while, each sent a safe_position_setpoint per control tick
+by one Scheduler. Reports:
+
+  startup    time to connect and set up all drones
+  sim        simulation steps per second against the target frame rate,
+             and steps that fell a period or more behind
+  extpos     external position packets per drone and second, mean and
+             worst drone, against the frame rate
+  age        pose age from frame to radio send, median and 99th percentile
+  control    control ticks per second against the target rate,
+             and setpoint slots missed
+  cpu        host CPU time per second of flight
+
+The stack has stopped scaling where sim, extpos or control rates
+fall short of their targets, or pose age grows.
+"""
+
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+# Import qfly from this checkout, whether installed or not
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from qfly import ParallelContexts, Pose, QualisysCrazyflie, Scheduler, SimSwarm, World
+
+
+# SETTINGS
+drone_counts = [10, 50, 100, 200, 400]  # Swarm sizes
+radios = 4  # Radio sender threads shared by swarm
+frame_rate = 100  # Simulation and mocap frame rate (Unit: Hz)
+control_rate = 20  # Setpoint rate (Unit: Hz)
+hover_height = 1.0  # (Unit: m)
+takeoff_time = 3.0  # (Unit: s)
+hover_time = 5.0  # Time measured (Unit: s)
+world = World(expanse=20.0, speed_limit=1.0)
+
+
+def measure(drone_count):
+    swarm = SimSwarm([f'cf{i}' for i in range(drone_count)], rate=frame_rate, seed=1)
+    targets = [Pose(x, y, hover_height) for x, y, _ in swarm.position]
+
+    def hover(qcf, target, t):
+        qcf.safe_position_setpoint(target)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        qcfs = [QualisysCrazyflie(body, f'sim://{i % radios}/{i}', world,
+                                  qtm_ip=swarm, crazyflie=swarm.crazyflie(body))
+                for i, body in enumerate(swarm.bodies)]
+        t = time.perf_counter()
+        with ParallelContexts(*qcfs):
+            startup = time.perf_counter() - t
+
+            takeoff = Scheduler(rate=control_rate)
+            for qcf, target in zip(qcfs, targets):
+                takeoff.add(hover, qcf, target)
+            takeoff.run(duration=takeoff_time)
+
+            scheduler = Scheduler(rate=control_rate)
+            for qcf, target in zip(qcfs, targets):
+                scheduler.add(hover, qcf, target)
+            ticks0, late0 = swarm.ticks, swarm.late
+            extpos0 = swarm.extpos_count.copy()
+            t0, cpu0 = time.perf_counter(), time.process_time()
+            scheduler.run(duration=hover_time)
+            elapsed = time.perf_counter() - t0
+            cpu = time.process_time() - cpu0
+            extpos = (swarm.extpos_count - extpos0) / elapsed
+            sim_rate = (swarm.ticks - ticks0) / elapsed
+            late = swarm.late - late0
+            ages = np.concatenate([qcf.metrics.histograms['send'].values() for qcf in qcfs])
+            hovering = np.abs(swarm.position[:, 2] - hover_height).max()
+
+    return {'drones': drone_count,
+            'startup_s': startup,
+            'sim_rate': sim_rate,
+            'sim_late': late,
+            'extpos_mean': extpos.mean(),
+            'extpos_min': extpos.min(),
+            'age_ms': np.percentile(ages, [50, 99]) * 1000,
+            'control_rate': scheduler.ticks / elapsed,
+            'control_missed': scheduler.missed,
+            'cpu_per_s': cpu / elapsed,
+            'height_error_mm': hovering * 1000}
+
+
+for drone_count in drone_counts:
+    r = measure(drone_count)
+    print(f'{r["drones"]:4d} drones | startup: {r["startup_s"]:5.2f} s | '
+          f'sim: {r["sim_rate"]:5.1f}/{frame_rate} Hz, {r["sim_late"]:3d} late | '
+          f'extpos: {r["extpos_mean"]:5.1f} min {r["extpos_min"]:5.1f} Hz | '
+          f'age p50/p99: {r["age_ms"][0]:5.2f} /{r["age_ms"][1]:6.2f} ms | '
+          f'control: {r["control_rate"]:4.1f}/{control_rate} Hz, '
+          f'{r["control_missed"]:4d} missed | '
+          f'cpu: {r["cpu_per_s"]:4.2f} s/s | '
+          f'height error: {r["height_error_mm"]:5.1f} mm')
@@ -0,0 +1,108 @@
+"""
+qfly | Qualisys Drone SDK Benchmark: Trajectory
+
+Flies the same keyframed show with a simulated swarm twice:
+
+  streamed  safe_position_setpoint interpolating keyframes
+            for every drone on every control tick
+  onboard   trajectories compiled from the keyframes, uploaded
+            to each drone and started together
+
+Reports radio packets per drone and second of flight, by kind,
+bytes uploaded per drone, host CPU time spent controlling drones,
+and how far the furthest drone strays from its keyframed path.
+Only external positions keep streaming onboard.
+"""
+
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+# Import qfly from this checkout, whether installed or not
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from qfly import ParallelContexts, Pose, QualisysCrazyflie, SimSwarm, Trajectory, World
+from qfly.trajectory import start_together
+
+
+# SETTINGS
+drone_counts = [10, 50]  # Swarm sizes
+radios = 4  # Radio sender threads shared by swarm
+control_rate = 50  # Setpoint rate when streamed (Unit: Hz)
+keyframe_times = [0.0, 2.0, 4.0, 6.0, 8.0]  # (Unit: s)
+keyframe_offsets = [(0.0, 0.0, 0.0), (0.0, 0.0, 1.0), (0.4, 0.0, 1.0),
+                    (0.4, 0.4, 1.2), (0.0, 0.0, 0.5)]  # From home (Unit: m)
+world = World(expanse=5.0, speed_limit=1.0)
+
+
+def keyframes(home):
+    return np.asarray(keyframe_offsets) + (home[0], home[1], 0.0)
+
+
+def fly(swarm, qcfs, mode):
+    """
+    Fly show. Returns host CPU time spent controlling drones,
+    and largest distance of any drone from its path per tick.
+    """
+    trajectories = [Trajectory.from_keyframes(keyframe_times, keyframes(swarm.position[i]))
+                    for i in range(len(qcfs))]
+    cpu = 0.0
+    if mode == 'onboard':
+        for qcf, trajectory in zip(qcfs, trajectories):
+            if not qcf.upload_trajectory(trajectory):
+                raise RuntimeError(f'{qcf.cf_body_name} rejected trajectory')
+        cpu0 = time.process_time()
+        start_together(qcfs)
+        cpu += time.process_time() - cpu0
+
+    errors = []
+    t0 = time.perf_counter()
+    start = swarm.time
+    while (t := time.perf_counter() - t0) < keyframe_times[-1]:
+        if mode == 'streamed':
+            cpu0 = time.process_time()
+            for qcf, trajectory in zip(qcfs, trajectories):
+                x, y, z, yaw = trajectory.evaluate(t).tolist()
+                qcf.safe_position_setpoint(Pose(x, y, z, yaw=yaw))
+            cpu += time.process_time() - cpu0
+        planned = np.array([trajectory.evaluate(swarm.time - start)[:3]
+                            for trajectory in trajectories])
+        errors.append(np.linalg.norm(swarm.position - planned, axis=1).max())
+        time.sleep(max(0.0, 1.0 / control_rate - (time.perf_counter() - t0 - t)))
+    return cpu, np.array(errors), trajectories[0].size
+
+
+def measure(drone_count, mode):
+    swarm = SimSwarm([f'cf{i}' for i in range(drone_count)], seed=1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        qcfs = [QualisysCrazyflie(body, f'sim://{i % radios}/{i}', world,
+                                  qtm_ip=swarm, crazyflie=swarm.crazyflie(body))
+                for i, body in enumerate(swarm.bodies)]
+        with ParallelContexts(*qcfs):
+            extpos0 = swarm.extpos_count.copy()
+            setpoints0 = swarm.setpoint_count.copy()
+            t0 = swarm.time
+            cpu, errors, upload = fly(swarm, qcfs, mode)
+            elapsed = swarm.time - t0
+            extpos = (swarm.extpos_count - extpos0).mean() / elapsed
+            setpoints = (swarm.setpoint_count - setpoints0).mean() / elapsed
+    return {'drones': drone_count,
+            'mode': mode,
+            'extpos_per_s': extpos,
+            'setpoints_per_s': setpoints,
+            'upload_bytes': upload if mode == 'onboard' else 0,
+            'cpu_ms_per_s': cpu / elapsed * 1000,
+            'error_mm': {'mean': errors.mean() * 1000, 'max': errors.max() * 1000}}
+
+
+for drone_count in drone_counts:
+    for mode in ('streamed', 'onboard'):
+        r = measure(drone_count, mode)
+        print(f'{r["drones"]:4d} drones | {r["mode"]:>8} | '
+              f'extpos: {r["extpos_per_s"]:6.1f}/s | setpoints: {r["setpoints_per_s"]:5.1f}/s | '
+              f'upload: {r["upload_bytes"]:4d} B | control CPU: {r["cpu_ms_per_s"]:6.1f} ms/s | '
+              f'path error mean/max: {r["error_mm"]["mean"]:5.1f} /{r["error_mm"]["max"]:5.1f} mm')
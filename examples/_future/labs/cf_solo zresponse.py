@@ -10,13 +10,15 @@ from time import sleep, time
 import numpy as np
 import matplotlib.pyplot as plt
 
-from qfly import Pose, QualisysCrazyflie, World
+from qfly import FlightRecorder, Pose, QualisysCrazyflie, World
+from qfly.recorder import POSE, SETPOINT
 
 
 # SETTINGS
 cf_body_name = 'E7E7E7E704'  # QTM rigid body name
 cf_uri = 'radio://0/80/2M/E7E7E7E704'  # Crazyflie address
 cf_marker_ids = [41, 42, 43, 44]
+recording = 'zresponse'  # Flight recorder directory
 
 
 # Watch key presses with a global variable
@@ -41,11 +43,15 @@ listener.start()
 world = World()
 
 
+# Record poses and setpoints
+recorder = FlightRecorder(recording)
+
 # Prepare for liftoff
-with QualisysCrazyflie(cf_body_name,
-                       cf_uri,
-                       world,
-                       marker_ids=cf_marker_ids) as qcf:
+with recorder, QualisysCrazyflie(cf_body_name,
+                                 cf_uri,
+                                 world,
+                                 marker_ids=cf_marker_ids,
+                                 recorder=recorder) as qcf:
 
     # Let there be time
     t = time()
@@ -53,8 +59,6 @@ with QualisysCrazyflie(cf_body_name,
 
     print("Beginning maneuvers...")
 
-    log = []
-
     # MAIN LOOP WITH SAFETY CHECK
     while(qcf.is_safe()):
 
@@ -65,9 +69,6 @@ with QualisysCrazyflie(cf_body_name,
         # Mind the clock
         dt = time() - t
 
-        # Keep track of altitude
-        log.append(qcf.pose)
-
         # Take off and hover in the center of safe airspace for 5 seconds
         if dt < 20:
             print(f'[t={int(dt)}] Ascending...')
@@ -103,12 +104,13 @@ with QualisysCrazyflie(cf_body_name,
     qcf.land_in_place()
 
 # Plot z-axis response
-_t = range(len(log))
-_x = list(pose.x for pose in log)
-_y = list(pose.y for pose in log)
-_z = list(pose.z for pose in log)
+columns, bodies = FlightRecorder.load(recording)
+poses = columns['kind'] == POSE
+setpoints = columns['kind'] == SETPOINT
 fig, ax = plt.subplots()
-ax.scatter(_x, _y)
+ax.plot(columns['t'][poses], columns['z'][poses], label='pose')
+ax.plot(columns['t'][setpoints], columns['z'][setpoints], label='setpoint')
+ax.legend()
 
 
 plt.show()
@@ -7,9 +7,9 @@ ESC to land at any time.
 
 
 import pynput
-from time import sleep, time
+from time import sleep
 
-from qfly import Pose, QualisysCrazyflie, World, ParallelContexts, utils
+from qfly import Pose, QualisysCrazyflie, World, ParallelContexts, Scheduler, radio, utils
 
 import numpy as np
 
@@ -51,6 +51,10 @@ listener.start()
 world = World()
 
 
+# Fail fast if any drone is missing, with a single radio scan for the swarm
+radio.require_crazyflies(cf_uris)
+
+
 # Stack up context managers
 _qcfs = [QualisysCrazyflie(cf_body_name,
                            cf_uri,
@@ -59,81 +63,77 @@ _qcfs = [QualisysCrazyflie(cf_body_name,
          for cf_body_name, cf_uri, cf_marker_id
          in zip(cf_body_names, cf_uris, cf_marker_ids)]
 
-with ParallelContexts(*_qcfs) as qcfs:
-
-    # Let there be time
-    t = time()
-    dt = 0
-
-    print("Beginning maneuvers...")
-
-    # "fly" variable used for landing on demand
-    fly = True
 
-    # MAIN LOOP WITH SAFETY CHECK
-    while(fly and all(qcf.is_safe() for qcf in qcfs)):
+def fly(idx, qcf, dt):
+    """Set target for one drone, called by the scheduler at a fixed rate."""
+
+    # Take off and hover in the center of safe airspace
+    if dt < 3:
+        print(f'[t={int(dt)}] Maneuvering - Center...')
+        # Set target
+        x = np.interp(idx,
+                      [0,
+                       len(qcfs) - 1],
+                      [world.origin.x - world.expanse / 2,
+                          world.origin.x + world.expanse / 2])
+        target = Pose(x,
+                      world.origin.y,
+                      world.expanse)
+        # Engage
+        qcf.safe_position_setpoint(target)
+
+    # Move out half of the safe airspace in the X direction and circle around Z axis
+    elif dt < 30:
+        print(f'[t={int(dt)}] Maneuvering - Circle around Z...')
+        # Set target
+        phi = (dt * 90) % 360  # Calculate angle based on time
+        # Offset angle based on array
+        phi = phi + 360 * (idx / len(qcfs))
+        _x, _y = utils.pol2cart(0.5, phi)
+        target = Pose(world.origin.x + _x,
+                      world.origin.y + _y,
+                      world.expanse)
+        # Engage
+        qcf.safe_position_setpoint(target)
+
+    # Back to center
+    elif dt < 33:
+        print(f'[t={int(dt)}] Maneuvering - Center...')
+        # Set target
+        x = np.interp(idx,
+                      [0,
+                       len(qcfs) - 1],
+                      [world.origin.x - world.expanse / 2,
+                          world.origin.x + world.expanse / 2])
+        target = Pose(x,
+                      world.origin.y,
+                      world.expanse)
+        # Engage
+        qcf.safe_position_setpoint(target)
+
+    else:
+        return False
+
+
+def stop(dt):
+    """Stop the scheduler on Esc or when any drone is unsafe."""
+    return (last_key_pressed == pynput.keyboard.Key.esc
+            or not all(qcf.is_safe() for qcf in qcfs))
 
-        # Land with Esc
-        if last_key_pressed == pynput.keyboard.Key.esc:
-            break
 
-        # Mind the clock
-        dt = time() - t
+with ParallelContexts(*_qcfs) as qcfs:
 
-        # Cycle all drones
-        for idx, qcf in enumerate(qcfs):
+    print("Beginning maneuvers...")
 
-            # Take off and hover in the center of safe airspace
-            if dt < 3:
-                print(f'[t={int(dt)}] Maneuvering - Center...')
-                # Set target
-                x = np.interp(idx,
-                              [0,
-                               len(qcfs) - 1],
-                              [world.origin.x - world.expanse / 2,
-                                  world.origin.x + world.expanse / 2])
-                target = Pose(x,
-                              world.origin.y,
-                              world.expanse)
-                # Engage
-                qcf.safe_position_setpoint(target)
-                sleep(0.02)
-
-            # Move out half of the safe airspace in the X direction and circle around Z axis
-            elif dt < 30:
-                print(f'[t={int(dt)}] Maneuvering - Circle around Z...')
-                # Set target
-                phi = (dt * 90) % 360  # Calculate angle based on time
-                # Offset angle based on array
-                phi = phi + 360 * (idx / len(qcfs))
-                _x, _y = utils.pol2cart(0.5, phi)
-                target = Pose(world.origin.x + _x,
-                              world.origin.y + _y,
-                              world.expanse)
-                # Engage
-                qcf.safe_position_setpoint(target)
-                sleep(0.02)
-
-            # Back to center
-            elif dt < 33:
-                print(f'[t={int(dt)}] Maneuvering - Center...')
-                # Set target
-                x = np.interp(idx,
-                              [0,
-                               len(qcfs) - 1],
-                              [world.origin.x - world.expanse / 2,
-                                  world.origin.x + world.expanse / 2])
-                target = Pose(x,
-                              world.origin.y,
-                              world.expanse)
-                # Engage
-                qcf.safe_position_setpoint(target)
-                sleep(0.02)
-
-            else:
-                fly = False
-
-     # Land
+    # MAIN LOOP WITH SAFETY CHECK
+    # Every drone gets a setpoint 50 times per second, regardless of swarm size
+    scheduler = Scheduler(rate=50)
+    for idx, qcf in enumerate(qcfs):
+        scheduler.add(fly, idx, qcf)
+    scheduler.run(until=stop)
+    print(scheduler)
+
+    # Land
     while (qcf.pose.z > 0.1):
         for idx, qcf in enumerate(qcfs):
             qcf.land_in_place()
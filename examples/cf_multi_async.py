@@ -0,0 +1,116 @@
+"""
+qfly | Qualisys Drone SDK Example Script: Multi Crazyflie with asyncio
+
+Drones take off and fly circles around Z axis, like cf_multi.py,
+but all drones and the QTM stream share one asyncio event loop.
+Each drone runs its own control task, awaiting its setpoints.
+ESC to land at any time.
+"""
+
+
+import asyncio
+
+import pynput
+
+from qfly import Pose, QualisysCrazyflie, World, ParallelContexts, radio, utils
+
+
+# SETTINGS
+# QTM rigid body names
+cf_body_names = [
+    'Crazyflie1',
+    'Crazyflie2'
+]
+# Crazyflie addresses
+cf_uris = [
+    'radio://0/80/2M/E7E7E7E701',
+    'radio://0/80/2M/E7E7E7E702'
+]
+# Crazyflie marker ids
+cf_marker_ids = [
+    [11, 12, 13, 14],
+    [21, 22, 23, 24]
+]
+rate = 50  # Setpoints per second per drone
+
+
+# Watch key presses with a global variable
+last_key_pressed = None
+
+
+# Set up keyboard callback
+def on_press(key):
+    """React to keyboard."""
+    global last_key_pressed
+    last_key_pressed = key
+
+
+# Listen to the keyboard
+listener = pynput.keyboard.Listener(on_press=on_press)
+listener.start()
+
+
+# Set up world - the World object comes with sane defaults
+world = World()
+
+
+async def fly(idx, qcf, qcfs):
+    """Fly one drone until done, Esc, or any drone is unsafe."""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    tick = 0
+
+    while (last_key_pressed != pynput.keyboard.Key.esc
+           and all(qcf.is_safe() for qcf in qcfs)):
+        dt = loop.time() - start
+
+        # Take off and hover in the center of safe airspace
+        if dt < 3:
+            target = Pose(world.origin.x, world.origin.y, world.expanse)
+        # Circle around Z axis
+        elif dt < 30:
+            phi = (dt * 90) % 360 + 360 * (idx / len(qcfs))
+            _x, _y = utils.pol2cart(0.5, phi)
+            target = Pose(world.origin.x + _x,
+                          world.origin.y + _y,
+                          world.expanse)
+        # Back to center
+        elif dt < 33:
+            target = Pose(world.origin.x, world.origin.y, world.expanse)
+        else:
+            break
+
+        # Engage, waiting for the radio to send the setpoint
+        await qcf.safe_position_setpoint_async(target)
+
+        # Keep a fixed rate using absolute deadlines
+        tick += 1
+        await asyncio.sleep(max(0, start + tick / rate - loop.time()))
+
+    # Land
+    while qcf.pose.z > 0.1:
+        qcf.land_in_place()
+        await asyncio.sleep(1 / rate)
+
+
+async def main():
+    # Fail fast if any drone is missing, with a single radio scan for the swarm
+    await asyncio.to_thread(radio.require_crazyflies, cf_uris)
+
+    # Stack up context managers
+    _qcfs = [QualisysCrazyflie(cf_body_name,
+                               cf_uri,
+                               world,
+                               marker_ids=cf_marker_id)
+             for cf_body_name, cf_uri, cf_marker_id
+             in zip(cf_body_names, cf_uris, cf_marker_ids)]
+
+    async with ParallelContexts(*_qcfs) as qcfs:
+
+        print("Beginning maneuvers...")
+
+        await asyncio.gather(*(fly(idx, qcf, qcfs)
+                               for idx, qcf in enumerate(qcfs)))
+
+
+asyncio.run(main())
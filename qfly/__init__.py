@@ -11,10 +11,20 @@
 """
 
 
+from .choreography import Timeline
 from .crazyflie import QualisysCrazyflie
 from .deck import QualisysDeck
-from .pose import Pose
-from .qtm import QtmWrapper
+from .history import PoseHistory
+from .metrics import LatencyMetrics
+from .pose import Pose, PredictedPose
+from .predictor import ConstantVelocityPredictor, KalmanPredictor, Predictor
+from .qtm import PoseSource, QtmStream, QtmWrapper
+from .radio import ExtposThrottle
+from .recorder import FlightRecorder
+from .replay import ReplaySource
+from .scheduler import Scheduler
+from .sim import SimCrazyflie, SimSwarm
+from .trajectory import Trajectory
 from .traqr import QualisysTraqr
 from .world import World
 from .parallel_contexts import ParallelContexts
\ No newline at end of file
@@ -0,0 +1,290 @@
+from bisect import bisect_right
+
+import numpy as np
+
+from qfly.pose import Pose
+from qfly.trajectory import (Trajectory, evaluate_polynomials, hermite_coefficients,
+                             monotone_velocities, spline_velocities)
+from qfly.world import OUTSIDE_X, OUTSIDE_Y, OUTSIDE_Z, TOO_FAST_XY, TOO_FAST_Z
+
+
+# Interpolation between keyframes, by name
+INTERPOLATIONS = ('linear', 'ease_in', 'ease_out', 'ease_in_out', 'monotone', 'spline')
+
+
+class Timeline:
+    """
+    Keyframed choreography of a swarm, compiled into dense arrays
+    so that the targets of all drones at a time come from one
+    vectorized evaluation, however many drones there are.
+
+    Keyframes are shared in time: every drone has a position and yaw
+    at every keyframe time. Between keyframes, targets are interpolated
+    by one of INTERPOLATIONS:
+
+      linear       constant speed, stopping abruptly
+      ease_in      accelerating from rest
+      ease_out     decelerating to rest
+      ease_in_out  accelerating and decelerating, at rest at every keyframe
+      monotone     smooth, never overshooting keyframes on any axis
+      spline       smoothest, with continuous acceleration, may overshoot
+
+    Every interpolation compiles to one cubic polynomial per drone and
+    segment, so drones can also fly their part onboard, see trajectory().
+
+    Typical usage, flying drones around a circle::
+
+        offsets = np.arange(len(qcfs)) * 2 * np.pi / len(qcfs)
+        phi = np.radians(np.arange(0, 361, 30))[:, None] + offsets
+        positions = np.stack([np.cos(phi) * 0.5, np.sin(phi) * 0.5,
+                              np.ones_like(phi)], axis=-1).swapaxes(0, 1)
+        timeline = Timeline(np.arange(len(phi)), positions, interpolation='spline')
+        scheduler = Scheduler(rate=50)
+        scheduler.add(timeline.send, qcfs)
+        scheduler.run()
+
+    Attributes
+    ----------
+    times : numpy.ndarray
+        Keyframe times, of shape (keyframes,).
+        (Unit: s)
+    keyframes : numpy.ndarray
+        Keyframe x, y, z and yaw of each drone, of shape (drones, keyframes, 4).
+        (Unit: m, degrees)
+    coefficients : numpy.ndarray
+        Cubic polynomial coefficients of each segment and drone in time since
+        start of segment, constant term first, of shape (segments, drones, 4, 4).
+    """
+
+    def __init__(self, times, positions, yaws=None, interpolation='linear'):
+        """
+        Construct Timeline object
+
+        Parameters
+        ----------
+        times : array_like
+            Increasing keyframe times, from start of timeline.
+            (Unit: s)
+        positions : array_like
+            Keyframe positions of each drone, of shape (drones, keyframes, 3).
+            (Unit: m)
+        yaws : array_like (optional)
+            Keyframe yaws of each drone, of shape (drones, keyframes).
+            0 by default.
+            (Unit: degrees)
+        interpolation : str or [str] (optional)
+            One of INTERPOLATIONS, or one per segment between keyframes.
+        """
+        self.times = np.asarray(times, dtype=float)
+        positions = np.asarray(positions, dtype=float)
+        if yaws is None:
+            yaws = np.zeros(positions.shape[:2])
+        self.keyframes = np.concatenate([positions, np.asarray(yaws, dtype=float)[..., None]],
+                                        axis=-1)
+        if len(self.times) < 2 or np.any(np.diff(self.times) <= 0):
+            raise ValueError('Keyframes need at least two increasing times')
+        if self.keyframes.shape[1] != len(self.times):
+            raise ValueError(f'{self.keyframes.shape[1]} keyframes per drone '
+                             f'for {len(self.times)} keyframe times')
+
+        segments = len(self.times) - 1
+        if isinstance(interpolation, str):
+            interpolation = [interpolation] * segments
+        if len(interpolation) != segments:
+            raise ValueError(f'{len(interpolation)} interpolations for {segments} segments')
+        for name in set(interpolation):
+            if name not in INTERPOLATIONS:
+                raise ValueError(f'Unknown interpolation {name}, use one of {INTERPOLATIONS}')
+        self.interpolation = list(interpolation)
+        self.coefficients = self._compile()
+        # Segment lookup on a list beats numpy for one time at a time
+        self._times = self.times.tolist()
+
+    @classmethod
+    def from_drones(cls, keyframes, interpolation='linear'):
+        """
+        Construct Timeline from keyframes of each drone at times of its own.
+        Keyframes are merged onto the union of all keyframe times,
+        with drones moving linearly between their own keyframes,
+        and holding before their first and after their last.
+
+        Parameters
+        ----------
+        keyframes : [[(float, Pose)]]
+            Time and target of each keyframe, for each drone.
+            (Unit: s)
+        interpolation : str (optional)
+            One of INTERPOLATIONS.
+        """
+        times = np.unique(np.concatenate([[t for t, _ in drone] for drone in keyframes]))
+        values = np.empty((len(keyframes), len(times), 4))
+        for index, drone in enumerate(keyframes):
+            drone = sorted(drone, key=lambda keyframe: keyframe[0])
+            drone_times = [t for t, _ in drone]
+            for axis in range(3):
+                values[index, :, axis] = np.interp(times, drone_times,
+                                                   [pose[axis] for _, pose in drone])
+            values[index, :, 3] = np.interp(times, drone_times,
+                                            [pose.yaw or 0.0 for _, pose in drone])
+        return cls(times, values[..., :3], values[..., 3], interpolation)
+
+    def _compile(self):
+        """
+        Polynomial coefficients of each segment, by its interpolation.
+        """
+        times = self.times
+        # Keyframes first, so that helpers vectorize over drones and axes
+        values = self.keyframes.swapaxes(0, 1)
+        h = np.diff(times)[:, None, None]
+        delta = np.diff(values, axis=0)
+        coefficients = np.zeros((len(times) - 1,) + values.shape[1:] + (4,))
+
+        for name in set(self.interpolation):
+            if name in ('monotone', 'spline'):
+                velocities = (monotone_velocities if name == 'monotone'
+                              else spline_velocities)(times, values)
+                compiled = hermite_coefficients(times, values, velocities)
+            elif name == 'ease_in_out':
+                compiled = hermite_coefficients(times, values, np.zeros_like(values))
+            else:
+                compiled = np.zeros_like(coefficients)
+                compiled[..., 0] = values[:-1]
+                if name == 'linear':
+                    compiled[..., 1] = delta / h
+                elif name == 'ease_in':
+                    compiled[..., 2] = delta / (h * h)
+                else:
+                    compiled[..., 1] = 2 * delta / h
+                    compiled[..., 2] = -delta / (h * h)
+            chosen = np.array([interpolation == name for interpolation in self.interpolation])
+            coefficients[chosen] = compiled[chosen]
+        return coefficients
+
+    @property
+    def duration(self):
+        """
+        Time of last keyframe.
+        (Unit: s)
+        """
+        return float(self.times[-1])
+
+    def evaluate(self, t, out=None):
+        """
+        Targets of all drones at a time, held before the first keyframe
+        and after the last. Returns array of shape (drones, 4)
+        of x, y, z and yaw.
+
+        Parameters
+        ----------
+        t : float
+            Time since start of timeline.
+            (Unit: s)
+        out : numpy.ndarray (optional)
+            Array of shape (drones, 4) to write targets to.
+        """
+        times = self._times
+        t = min(max(t, times[0]), times[-1])
+        segment = min(bisect_right(times, t) - 1, len(times) - 2)
+        coefficients = self.coefficients[segment]
+        u = t - times[segment]
+        if out is None:
+            out = np.empty(coefficients.shape[:2])
+        # Horner's method over all drones and axes at once
+        np.multiply(coefficients[..., 3], u, out=out)
+        for k in (2, 1, 0):
+            out += coefficients[..., k]
+            if k:
+                out *= u
+        return out
+
+    def sample(self, t, derivative=0):
+        """
+        Targets, or their derivative, of all drones at many times.
+        Returns array of shape (times, drones, 4).
+
+        Parameters
+        ----------
+        t : array_like
+            Times since start of timeline.
+            (Unit: s)
+        derivative : int (optional)
+            Derivative to evaluate, e.g. 1 for velocity.
+        """
+        times = self.times
+        t = np.clip(np.asarray(t, dtype=float), times[0], times[-1])
+        segment = np.minimum(np.searchsorted(times, t, side='right') - 1, len(times) - 2)
+        return evaluate_polynomials(self.coefficients[segment],
+                                    (t - times[segment])[:, None, None], derivative)
+
+    def trajectory(self, index):
+        """
+        Part of one drone as a Trajectory, to upload to the drone.
+
+        Parameters
+        ----------
+        index : int
+            Index of drone.
+        """
+        return Trajectory(np.diff(self.times), self.coefficients[:, index])
+
+    def send(self, qcfs, t, world=None):
+        """
+        Send targets at a time to drones as geofenced setpoints.
+        Returns False once past the last keyframe, to stop a Scheduler.
+
+        Parameters
+        ----------
+        qcfs : [QualisysCrazyflie]
+            Drones, in the order of keyframes.
+        t : float
+            Time since start of timeline.
+            (Unit: s)
+        world : World (optional)
+            World object defining airspace rules.
+            Defaults to each drone's own world.
+        """
+        targets = self.evaluate(t)
+        if world is not None:
+            world.clamp(targets[:, :3], out=targets[:, :3])
+        for qcf, (x, y, z, yaw) in zip(qcfs, targets.tolist()):
+            qcf.safe_position_setpoint(Pose(x, y, z, yaw=yaw), world)
+        return t <= self.duration
+
+    def check(self, world, resolution=0.01):
+        """
+        Check choreography against airspace rules, by sampling it.
+        Returns a list of violations, empty if none.
+        Setpoints are geofenced when sent, so a choreography that leaves
+        safe airspace is flattened against its bounds rather than flown.
+
+        Parameters
+        ----------
+        world : World
+            World object defining airspace rules.
+        resolution : float (optional)
+            Time between samples.
+            (Unit: s)
+        """
+        t = np.arange(self.times[0], self.times[-1] + resolution, resolution)
+        codes = world.check_path(self.sample(t)[..., :3], self.sample(t, derivative=1)[..., :3])
+        violations = []
+
+        outside = codes & (OUTSIDE_X | OUTSIDE_Y | OUTSIDE_Z) != 0
+        if outside.any():
+            first = np.argmax(outside.any(axis=1))
+            violations.append(f'Drones {np.flatnonzero(outside[first]).tolist()} '
+                              f'outside safe volume at {t[first]:.2f} s')
+
+        fast = codes & (TOO_FAST_XY | TOO_FAST_Z) != 0
+        if fast.any():
+            first = np.argmax(fast.any(axis=1))
+            violations.append(f'Drones {np.flatnonzero(fast[first]).tolist()} over speed '
+                              f'limit of {world.speed_limit} m/s at {t[first]:.2f} s')
+        return violations
+
+    def __len__(self):
+        return len(self.keyframes)
+
+    def __str__(self):
+        return (f'timeline of {len(self.keyframes)} drones over {len(self.times)} keyframes, '
+                f'{self.duration:.2f} s')
@@ -1,27 +1,48 @@
-from threading import Thread
+import asyncio
+import math
+import queue
 import time
 import traceback
 
 from cflib.crazyflie.log import LogConfig
-from cflib.crazyflie.syncLogger import SyncLogger
+from cflib.crazyflie.mem import MemoryElement
 
-import cflib.crtp
-from cflib.crazyflie import Crazyflie
 from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
 
 import qfly
 
 
-class QualisysCrazyflie(Thread):
+class QualisysCrazyflie:
     """
     Wrapper for Crazyflie drone to fly with Qualisys motion capture systems
 
+    Use as a context manager, either with `with` or,
+    sharing the application's event loop with the QTM stream,
+    with `async with`.
+
     Attributes
     ----------
     cf_body_name : str
         Name of Crazyflie's rigid body in QTM
     cf_uri : str
         Crazyflie radio address
+    extpose : bool
+        Whether full 6DOF pose is streamed to drone, or position only
+    extpos_throttle : ExtposThrottle
+        Rate cap and counters for pose packets streamed to drone
+    extpos_lead : float or str
+        Time poses streamed to drone are predicted forward by,
+        'auto' for measured pose age, or None for off
+    measured_lead : float
+        Lead measured for extpos_lead 'auto'
+        (Unit: s)
+    timings : dict
+        Time spent in each phase of connecting, by phase name
+        (Unit: s)
+    metrics : LatencyMetrics
+        Age of poses from QTM to radio, and frame loss
+    history : PoseHistory
+        Latest measured poses, timed by QTM timestamp
     pose : Pose
         Pose object keeping track of whereabouts
     world : World
@@ -33,7 +54,16 @@ class QualisysCrazyflie(Thread):
                  cf_uri,
                  world,
                  marker_ids=[1, 2, 3, 4],
-                 qtm_ip="127.0.0.1"):
+                 qtm_ip="127.0.0.1",
+                 extpose=False,
+                 extpos_rate=None,
+                 extpos_min_rate=None,
+                 radio_thread=True,
+                 toc_cache=True,
+                 recorder=None,
+                 crazyflie=None,
+                 predictor=None,
+                 extpos_lead=None):
         """
         Construct QualisysCrazyflie object.
 
@@ -48,18 +78,51 @@ class QualisysCrazyflie(Thread):
         marker_ids : [int] (optional)
             ID numbers to be assigned to active markers
             in order of front, right, back, left.
-        qtm_ip : str (optional)
-            IP address of QTM host.
+        qtm_ip : str or PoseSource (optional)
+            IP address of QTM host, or another source of poses,
+            e.g. a ReplaySource.
+        extpose : bool (optional)
+            Stream full 6DOF pose (position and orientation) to drone
+            instead of position only.
+        extpos_rate : float (optional)
+            Max rate of pose packets streamed to drone.
+            Unlimited by default, i.e. every mocap frame is sent.
+            (Unit: Hz)
+        extpos_min_rate : float (optional)
+            If given, the pose packet rate adapts to radio link quality
+            between extpos_min_rate and extpos_rate.
+            (Unit: Hz)
+        radio_thread : bool (optional)
+            Hand pose packets and setpoints to a shared sender thread
+            per radio dongle, instead of sending them from the
+            calling thread. Keeps radio I/O from blocking mocap
+            and control loops.
+        toc_cache : bool or str (optional)
+            Cache log and param TOCs on disk to speed up connecting.
+            True for qfly's shared cache, a directory path, or False.
+        recorder : FlightRecorder (optional)
+            Recorder to log poses, setpoints and tracking loss to.
+        crazyflie : Crazyflie (optional)
+            Crazyflie object to drive instead of connecting over radio,
+            e.g. a simulated drone from SimSwarm.crazyflie().
+        predictor : Predictor (optional)
+            Predictor to keep streaming extrapolated poses to the drone
+            through short tracking gaps, e.g. a ConstantVelocityPredictor.
+        extpos_lead : float or str (optional)
+            Predict poses streamed to drone forward in time by this much,
+            to make up for their age on arrival. 'auto' to use the age
+            measured by metrics, from QTM timestamp to radio send,
+            in excess of the best case. Off by default.
+            (Unit: s)
         """
 
         print(f'[{cf_body_name}@{cf_uri}] Initializing...')
 
-        cflib.crtp.init_drivers()
-
         self.cf_body_name = cf_body_name
         self.cf_uri = cf_uri
         self.world = world
         self.marker_ids = marker_ids
+        self.extpose = extpose
 
         self.pose = None
         self.anchor = None
@@ -67,49 +130,188 @@ class QualisysCrazyflie(Thread):
         self.qtm = None
         self.qtm_ip = qtm_ip
 
-        self.cf = Crazyflie(ro_cache=None, rw_cache=None)
+        self.radio_thread = radio_thread
+        self._mailbox = None
+        # Uploaded trajectories and worlds checked against, by ID
+        self._trajectories = {}
+
+        self.recorder = recorder
+        if recorder is not None:
+            self._recorder_body = recorder.body_id(cf_body_name)
+
+        self.predictor = predictor
+        self.history = qfly.PoseHistory() if predictor is None else predictor.history
+
+        self.extpos_lead = extpos_lead
+        # Predicts from the measured poses in history, never updated itself
+        self._lead_predictor = qfly.ConstantVelocityPredictor(
+            max_gap=math.inf, window=5, history=self.history)
+        self._measured_lead = 0.0
+        self._lead_frames = 0
+
+        self.timings = {}
+        self.metrics = qfly.metrics.LatencyMetrics()
+
+        if crazyflie is None:
+            qfly.radio.init_drivers()
+            crazyflie = qfly.radio.make_crazyflie(toc_cache)
+        self.cf = crazyflie
         self.scf = SyncCrazyflie(self.cf_uri, cf=self.cf)
 
+        self.extpos_throttle = qfly.radio.ExtposThrottle(extpos_rate, extpos_min_rate)
+        # Older cflib versions report link quality on Crazyflie itself
+        link_statistics = getattr(self.cf, 'link_statistics', self.cf)
+        link_statistics.link_quality_updated.add_callback(
+            self.extpos_throttle.on_link_quality)
+
         print(f'[{self.cf_body_name}@{self.cf_uri}] Connecting...')
 
     def __enter__(self):
         """
         Enter QualisysCrazyflie context
         """
+        self.qtm = None
+        try:
+            self._open()
+            self.track()
+            self.setup()
+        except BaseException:
+            # Nothing calls __exit__ for a context that failed to enter
+            self._report_abort()
+            if self.qtm is not None:
+                self.qtm.close()
+            self._close()
+            raise
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, tb=None):
+        """
+        Exit QualisysCrazyflie context
+        """
+        self._report_exit(exc_type, exc_value, tb)
+        self.untrack()
+        self._close()
 
+    async def __aenter__(self):
+        """
+        Enter QualisysCrazyflie context asynchronously.
+        Radio I/O runs in worker threads, while poses are
+        handled on the running event loop.
+        """
+        self.qtm = None
+        try:
+            await asyncio.to_thread(self._open)
+            self.track(asyncio.get_running_loop())
+            await asyncio.to_thread(self.setup)
+        except BaseException:
+            self._report_abort()
+            if self.qtm is not None:
+                await self.qtm.aclose()
+            await asyncio.to_thread(self._close)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type=None, exc_value=None, tb=None):
+        """
+        Exit QualisysCrazyflie context asynchronously
+        """
+        self._report_exit(exc_type, exc_value, tb)
+        await self.qtm.aclose()
+        await asyncio.to_thread(self._close)
+
+    def _open(self):
+        """
+        Open radio link and set connect-time parameters.
+        """
+        t = time.perf_counter()
         self.scf.open_link()
+        self.timings['link'] = time.perf_counter() - t
+
+        if self.radio_thread:
+            self._mailbox = qfly.radio.RadioSender.mailbox(self.cf_uri)
 
         print(f'[{self.cf_body_name}@{self.cf_uri}] Connected...')
 
-        # Set active marker IDs
+        # Set all parameters in one batch
         print(
             f'[{self.cf_body_name}@{self.cf_uri}] Setting active marker IDs: {self.marker_ids}')
-        self.cf.param.set_value('activeMarker.front', self.marker_ids[0])
-        self.cf.param.set_value('activeMarker.right', self.marker_ids[1])
-        self.cf.param.set_value('activeMarker.back', self.marker_ids[2])
-        self.cf.param.set_value('activeMarker.left', self.marker_ids[3])
+        print(
+            f'[{self.cf_body_name}@{self.cf_uri}] Speed limit: {self.world.speed_limit} m/s')
+        t = time.perf_counter()
+        self.set_params({
+            # Set active marker IDs
+            'activeMarker.front': self.marker_ids[0],
+            'activeMarker.right': self.marker_ids[1],
+            'activeMarker.back': self.marker_ids[2],
+            'activeMarker.left': self.marker_ids[3],
+            # Turn off LED to conserve battery
+            'ring.effect': 0,
+            # Slow down
+            **self._speed_limit_params(self.world.speed_limit)})
+        self.timings['params'] = time.perf_counter() - t
+        print(
+            f'[{self.cf_body_name}@{self.cf_uri}] Parameters set in {self.timings["params"]:.3f} s')
 
-        # Turn off LED to conserve battery
-        self.set_led_ring(0)
+    def track(self, loop=None):
+        """
+        Subscribe to poses of drone's rigid body and stream them to drone.
 
-        # Slow down
-        self.set_speed_limit(self.world.speed_limit)
+        Entering the context does this once the drone is connected.
+        Call directly only to stream to a Crazyflie that needs no
+        connecting, e.g. a stub, and call untrack() when done.
 
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop (optional)
+            Event loop to run the QTM stream on, if not running yet.
+        """
+        if self.radio_thread and self._mailbox is None:
+            self._mailbox = qfly.radio.RadioSender.mailbox(self.cf_uri)
+        if self.predictor is not None:
+            self.predictor.reset()
+        self.history.clear()
         self.qtm = qfly.QtmWrapper(
             self.cf_body_name,
             lambda pose: self._set_pose(pose),
-            qtm_ip=self.qtm_ip)
+            qtm_ip=self.qtm_ip,
+            loop=loop,
+            recorder=self.recorder,
+            metrics=self.metrics,
+            predictor=self.predictor,
+            history=self.history)
 
         print(
             f'[{self.cf_body_name}@{self.cf_uri}] Connecting to QTM at {self.qtm.qtm_ip}...')
 
-        self.setup()
+    def untrack(self):
+        """
+        Unsubscribe from poses, and flush pose packets still waiting.
+        """
+        self.qtm.close()
+        if self._mailbox is not None:
+            self._mailbox.close()
+            self._mailbox = None
 
-        return self
+    @property
+    def measured_lead(self):
+        """
+        Lead poses are predicted forward by with extpos_lead set to 'auto',
+        from pose age measured by metrics. Refreshed every tenth of
+        metrics' window, and 0 until measured.
+        (Unit: s)
+        """
+        return self._measured_lead
 
-    def __exit__(self, exc_type=None, exc_value=None, tb=None):
+    def _report_abort(self):
         """
-        Exit QualisysCrazyflie context
+        Report failing to enter context.
+        """
+        print(
+            f'[{self.cf_body_name}@{self.cf_uri}] Failed to start, disconnecting...')
+
+    def _report_exit(self, exc_type, exc_value, tb):
+        """
+        Report exiting context, and exception if any.
         """
         print(
             f'[{self.cf_body_name}@{self.cf_uri}] Exiting...')
@@ -117,7 +319,14 @@ class QualisysCrazyflie(Thread):
             print(
                 f'[{self.cf_body_name}@{self.cf_uri}] Encountered exception on exit...')
             traceback.print_exception(exc_type, exc_value, tb)
-        self.qtm.close()
+
+    def _close(self):
+        """
+        Flush waiting packets and close radio link.
+        """
+        if self._mailbox is not None:
+            self._mailbox.close()
+            self._mailbox = None
         self.scf.close_link()
 
     def is_safe(self, world=None):
@@ -138,13 +347,15 @@ class QualisysCrazyflie(Thread):
                 TRACKING LOST FOR {str(self.world.tracking_tolerance)} FRAMES!''')
             return False
         # Is the drone inside the safe volume?
+        lo = world.safe_min
+        hi = world.safe_max
         if not (
             # x direction
-            world.origin.x - world.expanse < self.pose.x < world.origin.x + world.expanse
+            lo[0] < self.pose.x < hi[0]
             # y direction
-            and world.origin.y - world.expanse < self.pose.y < world.origin.y + world.expanse
+            and lo[1] < self.pose.y < hi[1]
             # z direction
-                and 0 < self.pose.z < world.origin.z + (2 * world.expanse)):
+                and lo[2] < self.pose.z < hi[2]):
             # Respond
             print(f'''[{self.cf_body_name}@{self.cf_uri}] !!! SAFETY VIOLATION !!!
                 DRONE OUTSIDE SAFE VOLUME AT ({str(self.pose)})!''')
@@ -198,7 +409,7 @@ class QualisysCrazyflie(Thread):
 
         # Engage
         if target.z < z_floor:
-            self.cf.commander.send_stop_setpoint()
+            self._post('commander', self.cf.commander.send_stop_setpoint)
         else:
             # print(
             #     f'[{self.cf_body_name}@{self.cf_uri}] Descending from {_z_cm} cm to {z_floor} cm...')
@@ -218,7 +429,7 @@ class QualisysCrazyflie(Thread):
 
         if self.pose.distance_to(target) < 0.1:
             self.anchor = None
-            self.cf.commander.send_stop_setpoint()
+            self._post('commander', self.cf.commander.send_stop_setpoint)
         else:
             self.safe_position_setpoint(target)
 
@@ -266,7 +477,7 @@ class QualisysCrazyflie(Thread):
             self.safe_position_setpoint(target)
             time.sleep(timestep)
             z_cm = z_cm - decrement
-        self.cf.commander.send_stop_setpoint()
+        self._post('commander', self.cf.commander.send_stop_setpoint)
 
     def rise_in_place(self, z=1):
         """
@@ -304,13 +515,172 @@ class QualisysCrazyflie(Thread):
         # Sane defaults
         if world is None:
             world = self.world
-        if target.yaw == None:
-            target.yaw = 0
+        yaw = 0 if target.yaw is None else target.yaw
+        # Keep inside safe airspace
+        target = target.clamp(world)
+        if self.recorder is not None:
+            self._record_setpoint(target, yaw)
+        # Engage
+        self._post('commander', self.cf.commander.send_position_setpoint,
+                   target.x, target.y, target.z, yaw)
+
+    async def safe_position_setpoint_async(self, target, world=None):
+        """
+        Sets a geofenced absolute position setpoint like
+        safe_position_setpoint() and waits until it has been sent.
+        Returns True if sent, or False if superseded by a newer setpoint.
+
+        Parameters
+        ----------
+        target : Pose
+            Pose object bearting target coordinate and yaw.
+            Yaw defaults to 0 if not supplied.
+        world : World (optional)
+            World object defining airspace rules.
+            Defaults to QualisysCrazyflie object's own world.
+        """
+        # Sane defaults
+        if world is None:
+            world = self.world
+        yaw = 0 if target.yaw is None else target.yaw
         # Keep inside safe airspace
-        target.clamp(world)
+        target = target.clamp(world)
+        if self.recorder is not None:
+            self._record_setpoint(target, yaw)
         # Engage
-        self.cf.commander.send_position_setpoint(
-            target.x, target.y, target.z, target.yaw)
+        return await self._post_async('commander', self.cf.commander.send_position_setpoint,
+                                      target.x, target.y, target.z, yaw)
+
+    def _record_setpoint(self, target, yaw):
+        """
+        Log setpoint to recorder.
+
+        Parameters
+        ----------
+        target : Pose
+            Geofenced target.
+        yaw : float
+            Target yaw.
+            (Unit: degrees)
+        """
+        self.recorder.record(qfly.recorder.SETPOINT, self._recorder_body,
+                             target.x, target.y, target.z, yaw,
+                             self.qtm._stream.framenumber, self.qtm.tracking_loss)
+
+    def upload_trajectory(self, trajectory, trajectory_id=1, offset=0, world=None):
+        """
+        Check trajectory against airspace rules, upload it to drone's
+        trajectory memory and define it for the high-level commander.
+        Returns True if uploaded, or False if rejected or failed.
+
+        Parameters
+        ----------
+        trajectory : Trajectory
+            Trajectory to fly.
+        trajectory_id : int (optional)
+            ID to start trajectory by.
+        offset : int (optional)
+            Address in trajectory memory, to keep several trajectories.
+            (Unit: bytes)
+        world : World (optional)
+            World object defining airspace rules.
+            Defaults to QualisysCrazyflie object's own world.
+        """
+        if world is None:
+            world = self.world
+        violations = trajectory.check(world)
+        if violations:
+            print(f'''[{self.cf_body_name}@{self.cf_uri}] !!! TRAJECTORY REJECTED !!!
+                {"; ".join(violations)}!''')
+            return False
+
+        mems = self.cf.mem.get_mems(MemoryElement.TYPE_TRAJ)
+        if not mems:
+            print(f'[{self.cf_body_name}@{self.cf_uri}] No trajectory memory! Update firmware?')
+            return False
+        mem = mems[0]
+        if offset + trajectory.size > mem.size:
+            print(f'[{self.cf_body_name}@{self.cf_uri}] Trajectory of {trajectory.size} bytes '
+                  f'does not fit in {mem.size} bytes of trajectory memory at {offset}!')
+            return False
+
+        print(f'[{self.cf_body_name}@{self.cf_uri}] Uploading {trajectory}...')
+        t = time.perf_counter()
+        mem.trajectory = trajectory.pieces()
+        if not mem.write_data_sync(start_addr=offset):
+            print(f'[{self.cf_body_name}@{self.cf_uri}] Trajectory upload failed!')
+            return False
+        if self.set_params({'commander.enHighLevel': 1}):
+            return False
+        self.cf.high_level_commander.define_trajectory(
+            trajectory_id, offset, len(trajectory.durations))
+        self._trajectories[trajectory_id] = (trajectory, world)
+        self.timings['trajectory'] = time.perf_counter() - t
+        print(
+            f'[{self.cf_body_name}@{self.cf_uri}] Trajectory {trajectory_id} uploaded in {self.timings["trajectory"]:.3f} s')
+        return True
+
+    def check_trajectory(self, trajectory_id=1, time_scale=1.0, relative=False):
+        """
+        Check uploaded trajectory against airspace rules as it would
+        be flown, e.g. faster or from the drone's current position,
+        than checked on upload. Returns a list of violations, empty if none.
+
+        Parameters
+        ----------
+        trajectory_id : int (optional)
+            ID the trajectory was uploaded under.
+        time_scale : float (optional)
+            Time stretch factor, e.g. 2.0 to fly at half speed.
+        relative : bool (optional)
+            Fly trajectory relative to current position.
+        """
+        if trajectory_id not in self._trajectories:
+            return [f'Trajectory {trajectory_id} not uploaded']
+        trajectory, world = self._trajectories[trajectory_id]
+        offset = None
+        if relative:
+            pose = self.pose
+            if pose is None:
+                return ['Position unknown']
+            # The drone shifts the trajectory to start where it is
+            x, y, z = trajectory.evaluate(0.0)[:3].tolist()
+            offset = (pose.x - x, pose.y - y, pose.z - z)
+        return trajectory.check(world, time_scale=time_scale, offset=offset)
+
+    def start_trajectory(self, trajectory_id=1, time_scale=1.0, relative=False):
+        """
+        Start flying an uploaded trajectory onboard.
+        The drone holds its last position once done.
+        Setpoints sent meanwhile take over from the trajectory.
+        Returns True if started, or False if the trajectory
+        as flown breaks airspace rules, see check_trajectory().
+
+        Parameters
+        ----------
+        trajectory_id : int (optional)
+            ID the trajectory was uploaded under.
+        time_scale : float (optional)
+            Time stretch factor, e.g. 2.0 to fly at half speed.
+        relative : bool (optional)
+            Fly trajectory relative to current position.
+        """
+        violations = self.check_trajectory(trajectory_id, time_scale, relative)
+        if violations:
+            print(f'''[{self.cf_body_name}@{self.cf_uri}] !!! TRAJECTORY NOT STARTED !!!
+                {"; ".join(violations)}!''')
+            return False
+        self._post('high_level', self._start_trajectory, trajectory_id, time_scale, relative)
+        return True
+
+    def _start_trajectory(self, trajectory_id, time_scale, relative):
+        """
+        Hand control from setpoints to the high-level commander
+        and start trajectory.
+        """
+        self.cf.commander.send_notify_setpoint_stop()
+        self.cf.high_level_commander.start_trajectory(
+            trajectory_id, time_scale, relative_position=relative)
 
     def set_speed_limit(self, speed_limit):
         """
@@ -323,70 +693,141 @@ class QualisysCrazyflie(Thread):
             (Unit: m/s)
         """
         print(f'[{self.cf_body_name}@{self.cf_uri}] Speed limit: {speed_limit} m/s')
-        self.cf.param.set_value('posCtlPid.xyVelMax', speed_limit)
-        self.cf.param.set_value('posCtlPid.zVelMax', speed_limit)
+        self.set_params(self._speed_limit_params(speed_limit))
+
+    def _speed_limit_params(self, speed_limit):
+        """
+        Parameter values for speed limit.
+
+        Parameters
+        ----------
+        speed_limit : float
+            Speed limit.
+            (Unit: m/s)
+        """
+        return {'posCtlPid.xyVelMax': speed_limit,
+                'posCtlPid.zVelMax': speed_limit}
 
-    def setup(self):
+    def set_params(self, values):
+        """
+        Set many drone parameters at once, sending all writes
+        back to back and waiting for acknowledgements together.
+        Returns dict of parameters that could not be set, with reasons.
+
+        Parameters
+        ----------
+        values : dict
+            Values by complete parameter name, e.g. {'ring.effect': 0}.
+        """
+        failures = qfly.radio.set_params(self.cf, values)
+        for name, reason in failures.items():
+            print(f'[{self.cf_body_name}@{self.cf_uri}] Could not set {name}: {reason}!')
+        return failures
+
+    def setup(self, log_period=100, window=10, threshold=0.0003, timeout=10.0):
         """
         Executes engineering boilerplate to initialize drone.
         Assumes most drone parameters at factory defaults.
         If in doubt, inspect drone parameters
         using Bitcraze client and documentation.
-        """
-        print(f'[{self.cf_body_name}@{self.cf_uri}] Setting up drone...')
 
-        # Choose estimator
-        self.cf.param.set_value('stabilizer.estimator', '2')
+        Waits for the position estimate to converge, i.e. for the
+        standard deviation of each Kalman position variance over a
+        sliding window to drop below threshold.
+        Raises TimeoutError if that takes longer than timeout,
+        whether or not samples keep arriving, or ConnectionError
+        if the link is lost while waiting.
 
-        # Black magic
-        self.cf.param.set_value('locSrv.extQuatStdDev', 0.2)
+        Parameters
+        ----------
+        log_period : int (optional)
+            Time between Kalman variance samples.
+            (Unit: ms)
+        window : int (optional)
+            Number of latest samples considered.
+        threshold : float (optional)
+            Max standard deviation of each variance within window.
+        timeout : float (optional)
+            Max time to wait for convergence.
+            (Unit: s)
+        """
+        print(f'[{self.cf_body_name}@{self.cf_uri}] Setting up drone...')
 
-        # Reset estimator
-        self.cf.param.set_value('kalman.resetEstimation', '1')
+        self.set_params({
+            # Choose estimator
+            'stabilizer.estimator': 2,
+            # Black magic
+            'locSrv.extQuatStdDev': 0.2,
+            # Reset estimator
+            'kalman.resetEstimation': 1})
         time.sleep(0.1)
-        self.cf.param.set_value('kalman.resetEstimation', '0')
+        self.set_params({'kalman.resetEstimation': 0})
 
         # Stabilize
         print(
             f'[{self.cf_body_name}@{self.cf_uri}] Stabilizing...')
 
-        log_config = LogConfig(name='Kalman Variance', period_in_ms=500)
+        log_config = LogConfig(name='Kalman Variance', period_in_ms=log_period)
         log_config.add_variable('kalman.varPX', 'float')
         log_config.add_variable('kalman.varPY', 'float')
         log_config.add_variable('kalman.varPZ', 'float')
 
-        var_y_history = [1000] * 10
-        var_x_history = [1000] * 10
-        var_z_history = [1000] * 10
+        detector = qfly.utils.ConvergenceDetector(3, window=window, threshold=threshold)
 
-        threshold = 0.001
+        # Read samples from a queue rather than with SyncLogger,
+        # so that the deadline holds while no samples arrive
+        samples = queue.Queue()
 
-        with SyncLogger(self.scf, log_config) as logger:
-            for log_entry in logger:
-                data = log_entry[1]
+        def on_data(timestamp, data, logconf):
+            samples.put(data)
 
-                var_x_history.append(data['kalman.varPX'])
-                var_x_history.pop(0)
-                var_y_history.append(data['kalman.varPY'])
-                var_y_history.pop(0)
-                var_z_history.append(data['kalman.varPZ'])
-                var_z_history.pop(0)
+        def on_disconnect(link_uri):
+            samples.put(None)
 
-                min_x = min(var_x_history)
-                max_x = max(var_x_history)
-                min_y = min(var_y_history)
-                max_y = max(var_y_history)
-                min_z = min(var_z_history)
-                max_z = max(var_z_history)
+        t = time.perf_counter()
+        deadline = t + timeout
+        self.cf.log.add_config(log_config)
+        log_config.data_received_cb.add_callback(on_data)
+        self.cf.disconnected.add_callback(on_disconnect)
+        try:
+            log_config.start()
+            while True:
+                try:
+                    data = samples.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    raise TimeoutError(
+                        f'[{self.cf_body_name}@{self.cf_uri}] '
+                        f'Kalman estimate did not converge in {timeout} s!') from None
+                if data is None:
+                    raise ConnectionError(
+                        f'[{self.cf_body_name}@{self.cf_uri}] '
+                        'Link lost while waiting for Kalman estimate to converge!')
+
+                converged = detector.add(data['kalman.varPX'],
+                                         data['kalman.varPY'],
+                                         data['kalman.varPZ'])
 
                 print(f'[{self.cf_body_name}@{self.cf_uri}] ' +
-                      "Kalman variance | X: {:8.4f}  Y: {:8.4f}  Z: {:8.4f}".format(
-                          max_x - min_x, max_y - min_y, max_z - min_z))
+                      "Kalman variance spread | X: {:8.4f}  Y: {:8.4f}  Z: {:8.4f}".format(
+                          *detector.spreads))
 
-                if (max_x - min_x) < threshold and (
-                        max_y - min_y) < threshold and (
-                        max_z - min_z) < threshold:
+                if converged:
                     break
+                if time.perf_counter() > deadline:
+                    raise TimeoutError(
+                        f'[{self.cf_body_name}@{self.cf_uri}] '
+                        f'Kalman estimate did not converge in {timeout} s!')
+        finally:
+            log_config.data_received_cb.remove_callback(on_data)
+            self.cf.disconnected.remove_callback(on_disconnect)
+            if self.cf.is_connected():
+                log_config.stop()
+                log_config.delete()
+
+        elapsed = time.perf_counter() - t
+        self.timings['convergence'] = elapsed
+        print(
+            f'[{self.cf_body_name}@{self.cf_uri}] Converged in {elapsed:.2f} s')
 
     def set_led_ring(self, val):
         """
@@ -398,20 +839,44 @@ class QualisysCrazyflie(Thread):
             LED ring effect ID. See Bitcraze documentation:
             https://www.bitcraze.io/documentation/repository/crazyflie-firmware/master/api/params/#ring
         """
-        self.cf.param.set_value('ring.effect', val)
+        self.set_params({'ring.effect': val})
 
-    def set_speed_limit(self, speed_limit):
+    def _post(self, kind, func, *args):
         """
-        Set speed limit.
+        Send packet to drone, through the radio's sender thread if enabled.
 
         Parameters
         ----------
-        speed_limit : float
-            Limit for horizontal (xy) and vertical (z) speed. (unit: m/s)
+        kind : str
+            Packet kind, one of Mailbox.KINDS.
+        func : function(*args)
+            Function sending the packet.
+        *args
+            Arguments to func.
         """
-        print(f'[{self.cf_body_name}@{self.cf_uri}] Speed limit: {speed_limit} m/s')
-        self.cf.param.set_value('posCtlPid.xyVelMax', speed_limit)
-        self.cf.param.set_value('posCtlPid.zVelMax', speed_limit)
+        if self._mailbox is None:
+            func(*args)
+        else:
+            self._mailbox.post(kind, func, *args)
+
+    async def _post_async(self, kind, func, *args):
+        """
+        Send packet to drone and wait until it has been sent.
+        Returns True if sent, or False if superseded or failed.
+
+        Parameters
+        ----------
+        kind : str
+            Packet kind, one of Mailbox.KINDS.
+        func : function(*args)
+            Function sending the packet.
+        *args
+            Arguments to func.
+        """
+        if self._mailbox is None:
+            await asyncio.to_thread(func, *args)
+            return True
+        return await self._mailbox.post_async(kind, func, *args)
 
     def _set_pose(self, pose):
         """
@@ -423,17 +888,54 @@ class QualisysCrazyflie(Thread):
             Pose object containing coordinates
         """
         self.pose = pose
+        if self.extpos_lead is not None:
+            pose = self._lead(pose)
         # Send to Crazyflie
-        if self.cf is not None:
-            self.cf.extpos.send_extpos(pose.x, pose.y, pose.z)
-            # qw = qfly.utils.sqrt(
-            #     1 + pose.rotmatrix[0][0] + pose.rotmatrix[1][1] + pose.rotmatrix[2][2]) / 2
-            # qx = qfly.utils.sqrt(
-            #     1 + pose.rotmatrix[0][0] - pose.rotmatrix[1][1] - pose.rotmatrix[2][2]) / 2
-            # qy = qfly.utils.sqrt(
-            #     1 - pose.rotmatrix[0][0] + pose.rotmatrix[1][1] - pose.rotmatrix[2][2]) / 2
-            # qz = qfly.utils.sqrt(
-            #     1 - pose.rotmatrix[0][0] - pose.rotmatrix[1][1] + pose.rotmatrix[2][2]) / 2
-            # ql = qfly.utils.sqrt(qx ** 2 + qy ** 2 + qz ** 2 + qw ** 2)
-            # self.cf.extpos.send_extpose(
-            #     pose.x, pose.y, pose.z, qx / ql, qy / ql, qz / ql, qw / ql)
+        if self.cf is not None and self.extpos_throttle.admit():
+            received = self.metrics.received
+            if self.extpose and pose.rotmatrix is not None:
+                qx, qy, qz, qw = qfly.utils.rotmatrix_to_quaternion(pose.rotmatrix)
+                self._post('extpos', self._send_pose, received, self.cf.extpos.send_extpose,
+                           pose.x, pose.y, pose.z, qx, qy, qz, qw)
+            else:
+                self._post('extpos', self._send_pose, received, self.cf.extpos.send_extpos,
+                           pose.x, pose.y, pose.z)
+
+    def _lead(self, pose):
+        """
+        Predict pose forward by extpos_lead from its frame time.
+
+        Parameters
+        ----------
+        pose : Pose
+            Latest pose, measured or predicted.
+        """
+        t = self.metrics.time
+        lead = self.extpos_lead
+        if lead == 'auto':
+            # Percentiles are costly, refresh them now and then
+            self._lead_frames -= 1
+            if self._lead_frames <= 0:
+                self._lead_frames = self.metrics.size // 10
+                ages = [self.metrics.percentile(stage, 50) for stage in ('qtm', 'send')]
+                self._measured_lead = sum(age for age in ages if age == age)
+            lead = self._measured_lead
+        predicted = self._lead_predictor.predict(t + lead)
+        return pose if predicted is None else predicted
+
+    def _send_pose(self, received, send, *args):
+        """
+        Send pose packet to drone and time it.
+
+        Parameters
+        ----------
+        received : float
+            Time the pose's frame was received.
+            (Unit: s)
+        send : function(*args)
+            Function sending the packet.
+        *args
+            Arguments to send.
+        """
+        send(*args)
+        self.metrics.on_send(received)
@@ -1,18 +1,20 @@
-from threading import Thread
+import asyncio
 import traceback
 
-import cflib.crtp
-from cflib.crazyflie import Crazyflie
 from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
 
 import qfly
 
 
-class QualisysDeck(Thread):
+class QualisysDeck:
     """
     Wrapper for Active Marker Deck-equipped Crazyflie drone
     used as a tracker without flying
 
+    Use as a context manager, either with `with` or,
+    sharing the application's event loop with the QTM stream,
+    with `async with`.
+
     Attributes
     ----------
     cf_body_name : str
@@ -27,7 +29,9 @@ class QualisysDeck(Thread):
                  cf_body_name,
                  cf_uri,
                  marker_ids=[1, 2, 3, 4],
-                 qtm_ip="127.0.0.1"):
+                 qtm_ip="127.0.0.1",
+                 toc_cache=True,
+                 recorder=None):
         """
         Construct QualisysDeck object
 
@@ -37,27 +41,34 @@ class QualisysDeck(Thread):
             Name of Crazyflie's rigid body in QTM
         cf_uri : str
             Crazyflie radio address
-        qtm_ip : str
-            IP address of QTM host.
+        qtm_ip : str or PoseSource
+            IP address of QTM host, or another source of poses,
+            e.g. a ReplaySource.
         marker_ids : [int]
             ID numbers to be assigned to active markers
             in order of front, right, back, left
+        toc_cache : bool or str
+            Cache log and param TOCs on disk to speed up connecting.
+            True for qfly's shared cache, a directory path, or False.
+        recorder : FlightRecorder (optional)
+            Recorder to log poses and tracking loss to.
         """
 
         print(f'[{cf_body_name}@{cf_uri}] Initializing...')
 
-        cflib.crtp.init_drivers()
+        qfly.radio.init_drivers()
 
         self.cf_body_name = cf_body_name
         self.cf_uri = cf_uri
         self.marker_ids = marker_ids
 
         self.pose = None
+        self.recorder = recorder
 
         self.qtm = None
         self.qtm_ip = qtm_ip
 
-        self.cf = Crazyflie(ro_cache=None, rw_cache=None)
+        self.cf = qfly.radio.make_crazyflie(toc_cache)
         self.scf = SyncCrazyflie(self.cf_uri, cf=self.cf)
 
         print(f'[{self.cf_body_name}@{self.cf_uri}] Connecting...')
@@ -66,35 +77,78 @@ class QualisysDeck(Thread):
         """
         Enter QualisysDeck context
         """
+        self._open()
+        self._track()
+        return self
 
+    def __exit__(self, exc_type=None, exc_value=None, tb=None):
+        """
+        Exit QualisysDeck context
+        """
+        self._report_exit(exc_type, exc_value, tb)
+        self.qtm.close()
+        self.scf.close_link()
+
+    async def __aenter__(self):
+        """
+        Enter QualisysDeck context asynchronously.
+        Radio I/O runs in a worker thread, while poses are
+        handled on the running event loop.
+        """
+        await asyncio.to_thread(self._open)
+        self._track(asyncio.get_running_loop())
+        return self
+
+    async def __aexit__(self, exc_type=None, exc_value=None, tb=None):
+        """
+        Exit QualisysDeck context asynchronously
+        """
+        self._report_exit(exc_type, exc_value, tb)
+        await self.qtm.aclose()
+        await asyncio.to_thread(self.scf.close_link)
+
+    def _open(self):
+        """
+        Open radio link and set connect-time parameters.
+        """
         self.scf.open_link()
 
         print(f'[{self.cf_body_name}@{self.cf_uri}] Connected...')
 
-        # Set active marker IDs
+        # Set all parameters in one batch
         print(
             f'[{self.cf_body_name}@{self.cf_uri}] Setting active marker IDs: {self.marker_ids}')
-        self.cf.param.set_value('activeMarker.front', self.marker_ids[0])
-        self.cf.param.set_value('activeMarker.right', self.marker_ids[1])
-        self.cf.param.set_value('activeMarker.back', self.marker_ids[2])
-        self.cf.param.set_value('activeMarker.left', self.marker_ids[3])
-
-        # Turn off LED to conserve battery
-        self.set_led_ring(0)
+        self.set_params({
+            # Set active marker IDs
+            'activeMarker.front': self.marker_ids[0],
+            'activeMarker.right': self.marker_ids[1],
+            'activeMarker.back': self.marker_ids[2],
+            'activeMarker.left': self.marker_ids[3],
+            # Turn off LED to conserve battery
+            'ring.effect': 0})
+
+    def _track(self, loop=None):
+        """
+        Subscribe to poses of deck's rigid body.
 
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop (optional)
+            Event loop to run the QTM stream on, if not running yet.
+        """
         self.qtm = qfly.QtmWrapper(
             self.cf_body_name,
             lambda pose: self._set_pose(pose),
-            qtm_ip=self.qtm_ip)
+            qtm_ip=self.qtm_ip,
+            loop=loop,
+            recorder=self.recorder)
 
         print(
             f'[{self.cf_body_name}@{self.cf_uri}] Connecting to QTM at {self.qtm.qtm_ip}...')
 
-        return self
-
-    def __exit__(self, exc_type=None, exc_value=None, tb=None):
+    def _report_exit(self, exc_type, exc_value, tb):
         """
-        Exit QualisysCrazyflie context
+        Report exiting context, and exception if any.
         """
         print(
             f'[{self.cf_body_name}@{self.cf_uri}] Exiting...')
@@ -102,8 +156,6 @@ class QualisysDeck(Thread):
             print(
                 f'[{self.cf_body_name}@{self.cf_uri}] Encountered exception on exit...')
             traceback.print_exception(exc_type, exc_value, tb)
-        self.qtm.close()
-        self.scf.close_link()
 
     def set_led_ring(self, val):
         """
@@ -115,7 +167,23 @@ class QualisysDeck(Thread):
             LED ring effect ID. See Bitcraze documentation:
             https://www.bitcraze.io/documentation/repository/crazyflie-firmware/master/api/params/#ring
         """
-        self.cf.param.set_value('ring.effect', val)
+        self.set_params({'ring.effect': val})
+
+    def set_params(self, values):
+        """
+        Set many drone parameters at once, sending all writes
+        back to back and waiting for acknowledgements together.
+        Returns dict of parameters that could not be set, with reasons.
+
+        Parameters
+        ----------
+        values : dict
+            Values by complete parameter name, e.g. {'ring.effect': 0}.
+        """
+        failures = qfly.radio.set_params(self.cf, values)
+        for name, reason in failures.items():
+            print(f'[{self.cf_body_name}@{self.cf_uri}] Could not set {name}: {reason}!')
+        return failures
 
     def _set_pose(self, pose):
         """
@@ -0,0 +1,197 @@
+import time
+
+import numpy as np
+
+from qfly.pose import Pose
+
+
+class PoseHistory:
+    """
+    Time-indexed history of the latest poses of one rigid body,
+    in fixed-size arrays.
+
+    Appending a pose overwrites the oldest one and costs the same
+    however long the history is, so a history can be kept for every
+    body on every frame. Queries work on the arrays with numpy.
+    Controllers, predictors and safety checks can share one history
+    instead of each keeping their own lists of poses.
+
+    QtmWrapper appends measured poses as they arrive, timed by
+    QTM timestamp. Queries can be made from other threads: appends
+    are sequence-locked, so a query retries rather than mixing poses
+    from before and after an append.
+
+    Attributes
+    ----------
+    size : int
+        Number of latest poses kept.
+    count : int
+        Number of poses appended in total.
+    pose : Pose
+        Latest pose, or None if empty.
+    time : float
+        Time of latest pose, or None if empty.
+        (Unit: s)
+    """
+
+    def __init__(self, size=256):
+        """
+        Construct PoseHistory object
+
+        Parameters
+        ----------
+        size : int (optional)
+            Number of latest poses kept.
+        """
+        self.size = size
+        self.count = 0
+        self.pose = None
+        self.time = None
+
+        self._times = np.zeros(size)
+        self._positions = np.zeros((size, 3))
+        self._poses = [None] * size
+        # Odd while an append or clear is under way
+        self._sequence = 0
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def append(self, pose, t):
+        """
+        Add latest pose. Safe to call from one thread at a time.
+
+        Parameters
+        ----------
+        pose : Pose
+            Valid pose.
+        t : float
+            Time of pose.
+            (Unit: s)
+        """
+        self._sequence += 1
+        i = self.count % self.size
+        self._times[i] = t
+        position = self._positions[i]
+        position[0] = pose[0]
+        position[1] = pose[1]
+        position[2] = pose[2]
+        self._poses[i] = pose
+        self.count += 1
+        self.pose = pose
+        self.time = t
+        self._sequence += 1
+
+    def clear(self):
+        """
+        Forget all poses.
+        """
+        self._sequence += 1
+        self.count = 0
+        self.pose = None
+        self.time = None
+        self._sequence += 1
+
+    def latest(self, n=None):
+        """
+        Times and positions of latest poses, oldest first.
+        Returns a copy of each, as arrays of shape (n,) and (n, 3).
+
+        Parameters
+        ----------
+        n : int (optional)
+            Number of poses. All kept poses by default.
+        """
+        times, positions, _ = self._read(self.size if n is None else n)
+        return times, positions
+
+    def _read(self, n, poses=False):
+        """
+        Copy latest poses consistently, retrying if an append
+        started or finished meanwhile. Returns times, positions
+        and, if asked for, Pose objects, oldest first.
+
+        Parameters
+        ----------
+        n : int
+            Max number of poses.
+        poses : bool (optional)
+            Whether to copy Pose objects too.
+        """
+        while True:
+            sequence = self._sequence
+            if sequence % 2:
+                # Let the appending thread finish
+                time.sleep(0)
+                continue
+            count = self.count
+            indices = np.arange(count - min(n, count, self.size), count) % self.size
+            times, positions = self._times[indices], self._positions[indices]
+            kept = [self._poses[i] for i in indices.tolist()] if poses else None
+            if self._sequence == sequence:
+                return times, positions, kept
+
+    def pose_at(self, t):
+        """
+        Pose at a time, interpolated linearly between kept poses.
+        Orientation is that of the nearest kept pose.
+        Returns None if t is outside the kept history.
+
+        Parameters
+        ----------
+        t : float
+            Time.
+            (Unit: s)
+        """
+        times, positions, poses = self._read(self.size, poses=True)
+        if len(times) == 0 or not times[0] <= t <= times[-1]:
+            return None
+        after = min(int(np.searchsorted(times, t)), len(times) - 1)
+        before = max(after - 1, 0)
+        span = times[after] - times[before]
+        share = (t - times[before]) / span if span > 0 else 1.0
+        x, y, z = (positions[before] + share * (positions[after] - positions[before])).tolist()
+        pose = poses[after if share >= 0.5 else before]
+        return Pose(x, y, z, pose.roll, pose.pitch, pose.yaw, pose.rotmatrix)
+
+    def velocity(self, window=2):
+        """
+        Velocity estimate over latest poses, or None if there are
+        too few. Finite difference of the last two poses by default,
+        or slope of a least squares line through a longer window,
+        which filters out noise at the cost of lag.
+
+        Parameters
+        ----------
+        window : int (optional)
+            Number of latest poses to use, at least 2.
+        """
+        times, positions = self.latest(window)
+        if len(times) < 2:
+            return None
+        if len(times) == 2:
+            dt = times[1] - times[0]
+            return (positions[1] - positions[0]) / dt if dt > 0 else None
+        times = times - times.mean()
+        spread = times @ times
+        if spread == 0:
+            return None
+        return times @ (positions - positions.mean(axis=0)) / spread
+
+    def acceleration(self, window=3):
+        """
+        Acceleration estimate over latest poses, or None if there are
+        too few. Second finite difference of the last three poses
+        by default, or curvature of a least squares parabola
+        through a longer window.
+
+        Parameters
+        ----------
+        window : int (optional)
+            Number of latest poses to use, at least 3.
+        """
+        times, positions = self.latest(window)
+        if len(times) < 3 or len(np.unique(times)) < 3:
+            return None
+        times = times - times[-1]
+        return 2 * np.polyfit(times, positions, 2)[0]
@@ -0,0 +1,276 @@
+import math
+import time
+
+import numpy as np
+
+
+class RollingHistogram:
+    """
+    Latest samples of a quantity, for percentiles and histograms
+    over a rolling window.
+
+    Adding a sample overwrites the oldest one in a fixed-size ring,
+    which is cheap enough to do for every body on every frame.
+    Statistics are computed when queried.
+
+    Attributes
+    ----------
+    size : int
+        Number of latest samples kept.
+    count : int
+        Number of samples added in total.
+    """
+
+    def __init__(self, size=1000):
+        """
+        Construct RollingHistogram object
+
+        Parameters
+        ----------
+        size : int (optional)
+            Number of latest samples kept.
+        """
+        self.size = size
+        self.count = 0
+        self._samples = [math.nan] * size
+
+    def add(self, value):
+        """
+        Add a sample. Safe to call from one thread at a time.
+
+        Parameters
+        ----------
+        value : float
+            Sample.
+        """
+        self._samples[self.count % self.size] = value
+        self.count += 1
+
+    def values(self):
+        """
+        Samples in window, oldest first.
+        """
+        start = self.count % self.size
+        samples = np.array(self._samples[start:] + self._samples[:start])
+        return samples[~np.isnan(samples)]
+
+    def percentile(self, q):
+        """
+        Percentile of samples in window, or NaN if there are none.
+
+        Parameters
+        ----------
+        q : float or [float]
+            Percentile(s) between 0 and 100.
+        """
+        values = self.values()
+        if len(values) == 0:
+            return np.full(np.shape(q), math.nan)[()]
+        return np.percentile(values, q)
+
+    def histogram(self, bins=10):
+        """
+        Histogram of samples in window.
+        Returns counts and bin edges, as numpy.histogram().
+
+        Parameters
+        ----------
+        bins : int or [float] (optional)
+            Number of bins, or bin edges.
+        """
+        return np.histogram(self.values(), bins=bins)
+
+    def summary(self):
+        """
+        Dict of sample count, mean, median, 90th and 99th percentile
+        and max of samples in window.
+        """
+        values = self.values()
+        if len(values) == 0:
+            return {'count': 0, 'mean': math.nan, 'p50': math.nan,
+                    'p90': math.nan, 'p99': math.nan, 'max': math.nan}
+        p50, p90, p99, top = np.percentile(values, [50, 90, 99, 100])
+        return {'count': len(values), 'mean': float(values.mean()),
+                'p50': float(p50), 'p90': float(p90), 'p99': float(p99), 'max': float(top)}
+
+
+class LatencyMetrics:
+    """
+    Age of poses along the path from QTM to the drone, and frame loss,
+    for one tracked body.
+
+    Stages are timed from when a frame is received by the host:
+
+      qtm     QTM timestamp to receipt, i.e. QTM processing and network
+              transit in excess of the fastest frame seen recently
+      decode  receipt to the pose being passed on to the subscriber
+      send    receipt to the pose being sent over the radio
+
+    QTM timestamps run on QTM's own clock. Their offset from the host
+    clock is estimated as the smallest difference seen recently,
+    so the qtm stage leaves out whatever delay every frame has.
+
+    Frames missing from the sequence of frame numbers are counted as lost.
+
+    Typical usage::
+
+        with QualisysCrazyflie(...) as qcf:
+            ...
+            print(qcf.metrics.summary())
+
+    Attributes
+    ----------
+    histograms : dict
+        RollingHistogram of each stage by name, in s.
+    frame : int
+        Latest QTM frame number.
+    timestamp : int
+        QTM timestamp of latest frame, or None if unknown.
+        (Unit: us)
+    received : float
+        Host time latest frame was received.
+        (Unit: s)
+    frames : int
+        Number of frames received.
+    dropped : int
+        Number of frames missing from the sequence.
+    """
+
+    STAGES = ('qtm', 'decode', 'send')
+
+    def __init__(self, size=1000, clock=time.perf_counter):
+        """
+        Construct LatencyMetrics object
+
+        Parameters
+        ----------
+        size : int (optional)
+            Number of latest samples kept per stage and for loss rate.
+        clock : function() (optional)
+            Monotonic clock, the same as QTM streams use.
+            (Unit: s)
+        """
+        self.size = size
+        self.histograms = {stage: RollingHistogram(size) for stage in self.STAGES}
+        self.frame = None
+        self.timestamp = None
+        self.received = None
+        self.frames = 0
+        self.dropped = 0
+
+        self._clock = clock
+        self._gaps = RollingHistogram(size)
+        # Smallest clock offset in the current and the previous window
+        self._offset = math.inf
+        self._previous_offset = math.inf
+        self._offset_samples = 0
+
+    def on_frame(self, frame, timestamp, received):
+        """
+        Note arrival of a frame, just before passing it on.
+
+        Parameters
+        ----------
+        frame : int
+            QTM frame number.
+        timestamp : int
+            QTM timestamp, or None if unknown.
+            (Unit: us)
+        received : float
+            Host time frame was received.
+            (Unit: s)
+        """
+        decoded = self._clock()
+        last = self.frame
+        self.frame = frame
+        self.timestamp = timestamp
+        self.received = received
+        self.frames += 1
+
+        gap = 0 if last is None or frame <= last else frame - last - 1
+        self.dropped += gap
+        self._gaps.add(gap)
+
+        self.histograms['decode'].add(decoded - received)
+        if timestamp is not None:
+            offset = received - timestamp * 1e-6
+            if self._offset_samples == self.size:
+                # Forget old minima, in case the clocks drift apart
+                self._previous_offset, self._offset = self._offset, math.inf
+                self._offset_samples = 0
+            self._offset = min(self._offset, offset)
+            self._offset_samples += 1
+            self.histograms['qtm'].add(offset - min(self._offset, self._previous_offset))
+
+    def on_send(self, received):
+        """
+        Note a pose being sent to the drone.
+
+        Parameters
+        ----------
+        received : float
+            Host time the pose's frame was received, or None if unknown.
+            (Unit: s)
+        """
+        if received is not None:
+            self.histograms['send'].add(self._clock() - received)
+
+    @property
+    def time(self):
+        """
+        Time of latest frame, by QTM timestamp if known,
+        or else by host time received.
+        (Unit: s)
+        """
+        if self.timestamp is None:
+            return self.received
+        return self.timestamp * 1e-6
+
+    @property
+    def loss_rate(self):
+        """
+        Share of frames missing from the sequence, over latest frames.
+        """
+        gaps = self._gaps.values()
+        missing = gaps.sum()
+        return float(missing / (missing + len(gaps))) if len(gaps) else 0.0
+
+    def percentile(self, stage, q):
+        """
+        Percentile of latency of a stage over latest frames.
+
+        Parameters
+        ----------
+        stage : str
+            One of STAGES.
+        q : float or [float]
+            Percentile(s) between 0 and 100.
+        """
+        return self.histograms[stage].percentile(q)
+
+    def histogram(self, stage, bins=10):
+        """
+        Histogram of latency of a stage over latest frames.
+        Returns counts and bin edges in s, as numpy.histogram().
+
+        Parameters
+        ----------
+        stage : str
+            One of STAGES.
+        bins : int or [float] (optional)
+            Number of bins, or bin edges.
+            (Unit: s)
+        """
+        return self.histograms[stage].histogram(bins)
+
+    def summary(self):
+        """
+        Dict of latency statistics by stage, see RollingHistogram.summary(),
+        and of frame counts and loss rate under 'loss'.
+        """
+        summary = {stage: histogram.summary()
+                   for stage, histogram in self.histograms.items()}
+        summary['loss'] = {'frames': self.frames,
+                           'dropped': self.dropped,
+                           'rate': self.loss_rate}
+        return summary
@@ -1,13 +1,16 @@
 # Based on: https://code.activestate.com/recipes/577352-starting-several-context-managers-concurrently/
 
-from __future__ import with_statement
-
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import sys
 import threading
+import time
 import traceback
 
+from qfly.radio import radio_of
+
 
-__all__ = ["MultipleError", "parallel"]
+__all__ = ["MultipleError", "ParallelContexts"]
 
 
 class ParallelContexts(object):
@@ -17,39 +20,102 @@ class ParallelContexts(object):
 
     Typical usage::
 
-        with parallel(Foo(), Bar()) as managers:
+        with ParallelContexts(Foo(), Bar()) as managers:
             foo, bar = managers
             foo.do_something()
             bar.do_something()
 
+    Asynchronous context managers can be started and stopped
+    concurrently on the running event loop instead::
+
+        async with ParallelContexts(Foo(), Bar()) as managers:
+            ...
+
+    Startup can be bounded and staged, e.g. to start at most 4 drones
+    at a time, one per radio dongle, giving each 30 seconds::
+
+        with ParallelContexts(*qcfs, max_workers=4,
+                              group_by=ParallelContexts.by_radio,
+                              timeout=30) as qcfs:
+            ...
+
+    If any manager fails or times out, managers that have not started
+    yet are skipped and managers that did start are stopped again
+    before MultipleError is raised. A manager that finishes starting
+    after its timeout is stopped as soon as it does.
+
+    After starting, ``timings`` holds a dict per manager with the time
+    spent queued and entering, merged with the manager's own
+    ``timings`` attribute, if any, e.g. QualisysCrazyflie's phases.
+
     """
 
-    def __init__(self, *managers):
+    def __init__(self, *managers, max_workers=None, group_by=None, timeout=None):
+        """
+        Parameters
+        ----------
+        *managers
+            Context managers to start and stop.
+        max_workers : int (optional)
+            Max number of groups starting at the same time.
+            Unlimited by default.
+        group_by : function(manager) (optional)
+            Key of the group a manager belongs to, or None for
+            a group of its own. Managers in the same group start
+            one after another. See ParallelContexts.by_radio.
+        timeout : float (optional)
+            Max time for each manager to start.
+            (Unit: s)
+        """
         self.managers = managers
+        self.max_workers = max_workers
+        self.group_by = group_by
+        self.timeout = timeout
+        self.timings = [{} for _ in managers]
+        self._entered = [False] * len(managers)
+        self._lock = threading.Lock()
+        # Tasks stopping asynchronous managers that started too late
+        self._late = set()
+
+    @staticmethod
+    def by_radio(mgr):
+        """Group managers by the radio dongle of their Crazyflie, if any.
+
+        """
+        cf_uri = getattr(mgr, 'cf_uri', None)
+        return None if cf_uri is None else radio_of(cf_uri)
 
     def __enter__(self):
         errors = []
-        threads = []
+        groups = self._groups()
+        failed = threading.Event()
+        start = time.perf_counter()
 
-        for mgr in self.managers:
-            t = threading.Thread(target=run,
-                                 args=(mgr.__enter__, tuple(), errors))
-            t.start()
-            threads.append(t)
-        for thread in threads:
-            thread.join()
+        with ThreadPoolExecutor(max_workers=self.max_workers or len(groups) or 1) as pool:
+            futures = [pool.submit(self._enter_group, group, start, errors, failed)
+                       for group in groups]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(exc_info_of(e))
 
         if errors:
-            err = MultipleError(errors)
-            raise err
+            # Keep startup errors along with any from stopping again
+            try:
+                self.__exit__(None, None, None)
+            except MultipleError as e:
+                errors.extend(e.errors)
+            raise MultipleError(errors)
 
+        self._report()
         return self.managers
 
     def __exit__(self, *exc_info):
         errors = []
         threads = []
 
-        for mgr in self.managers:
+        for mgr in self._entered_managers():
             t = threading.Thread(target=run,
                                  args=(mgr.__exit__, exc_info, errors))
             t.start()
@@ -61,6 +127,164 @@ class ParallelContexts(object):
         if errors:
             raise MultipleError(errors)
 
+    async def __aenter__(self):
+        errors = []
+        groups = self._groups()
+        workers = asyncio.Semaphore(self.max_workers or len(groups) or 1)
+        start = time.perf_counter()
+
+        async def enter_group(group):
+            async with workers:
+                for index in group:
+                    if errors:
+                        return
+                    await self._aenter_one(index, start, errors)
+
+        await asyncio.gather(*(enter_group(group) for group in groups))
+
+        if errors:
+            try:
+                await self.__aexit__(None, None, None)
+            except MultipleError as e:
+                errors.extend(e.errors)
+            raise MultipleError(errors)
+
+        self._report()
+        return self.managers
+
+    async def __aexit__(self, *exc_info):
+        results = await asyncio.gather(
+            *(mgr.__aexit__(*exc_info) for mgr in self._entered_managers()),
+            return_exceptions=True)
+
+        errors = [exc_info_of(result) for result in results
+                  if isinstance(result, BaseException)]
+        if errors:
+            raise MultipleError(errors)
+
+    def _groups(self):
+        """Indices of managers, in groups that start one after another.
+
+        """
+        if self.group_by is None:
+            return [[index] for index in range(len(self.managers))]
+        groups = {}
+        for index, mgr in enumerate(self.managers):
+            key = self.group_by(mgr)
+            groups.setdefault((None, index) if key is None else key, []).append(index)
+        return list(groups.values())
+
+    def _enter_group(self, group, start, errors, failed):
+        """Start managers of one group in turn, until any manager fails.
+
+        """
+        for index in group:
+            if failed.is_set():
+                return
+            if not self._enter_one(index, start, errors):
+                failed.set()
+
+    def _enter_one(self, index, start, errors):
+        """Start one manager, giving up after timeout. Returns True if started.
+
+        """
+        mgr = self.managers[index]
+        t = time.perf_counter()
+        self.timings[index]['queued'] = t - start
+        state = {}
+
+        def enter():
+            try:
+                mgr.__enter__()
+                error = None
+            except:
+                error = sys.exc_info()
+            with self._lock:
+                state['error'] = error
+                abandoned = state.get('abandoned', False)
+            # Stop managers that finish starting after their timeout
+            if abandoned and error is None:
+                run(mgr.__exit__, (None, None, None), [])
+
+        # Start in a thread of its own, which can be abandoned if stuck
+        thread = threading.Thread(target=enter, daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+
+        with self._lock:
+            if 'error' not in state:
+                state['abandoned'] = True
+                state['error'] = self._timeout_error(mgr)
+        self._record(index, t)
+
+        if state['error'] is not None:
+            errors.append(state['error'])
+            return False
+        self._entered[index] = True
+        return True
+
+    async def _aenter_one(self, index, start, errors):
+        """Start one asynchronous manager, giving up after timeout.
+
+        """
+        mgr = self.managers[index]
+        t = time.perf_counter()
+        self.timings[index]['queued'] = t - start
+        # Not cancelled on timeout, which would not stop work the manager
+        # runs in threads, but left to finish starting and then stopped
+        task = asyncio.ensure_future(mgr.__aenter__())
+        done, _ = await asyncio.wait((task,), timeout=self.timeout)
+        if not done:
+            errors.append(self._timeout_error(mgr))
+            late = asyncio.ensure_future(self._astop_late(mgr, task))
+            self._late.add(late)
+            late.add_done_callback(self._late.discard)
+        elif task.exception() is not None:
+            errors.append(exc_info_of(task.exception()))
+        else:
+            self._entered[index] = True
+        self._record(index, t)
+
+    async def _astop_late(self, mgr, task):
+        """Stop an asynchronous manager once it finishes starting after its timeout.
+
+        """
+        try:
+            await task
+        except Exception:
+            return
+        await run_async(mgr.__aexit__, (None, None, None), [])
+
+    def _timeout_error(self, mgr):
+        """Error for a manager that did not start in time, as ``sys.exc_info()``.
+
+        """
+        return exc_info_of(TimeoutError(
+            f'{label_of(mgr)} did not start within {self.timeout} s'))
+
+    def _record(self, index, t):
+        """Keep time spent entering a manager and its own phase timings.
+
+        """
+        timings = self.timings[index]
+        timings['enter'] = time.perf_counter() - t
+        timings.update(getattr(self.managers[index], 'timings', {}))
+
+    def _entered_managers(self):
+        """Managers that were started, in order.
+
+        """
+        return [mgr for mgr, entered in zip(self.managers, self._entered) if entered]
+
+    def _report(self):
+        """Print phase timings of each manager.
+
+        """
+        for mgr, timings in zip(self.managers, self.timings):
+            phases = " | ".join(f"{phase}: {elapsed:.3f} s"
+                                for phase, elapsed in timings.items())
+            print(f"[{label_of(mgr)}] Started | {phases}")
+
 
 class MultipleError(Exception):
 
@@ -78,10 +302,38 @@ class MultipleError(Exception):
 
 
 def run(func, args, errors):
-    """Helper for ``parallel``.
+    """Helper for ``ParallelContexts``.
 
     """
     try:
         func(*args)
     except:
-        errors.append(sys.exc_info())
\ No newline at end of file
+        errors.append(sys.exc_info())
+
+
+async def run_async(func, args, errors):
+    """Helper for ``ParallelContexts``, awaiting a coroutine function.
+
+    """
+    try:
+        await func(*args)
+    except Exception as e:
+        errors.append(exc_info_of(e))
+
+
+def exc_info_of(exc):
+    """Helper for ``ParallelContexts``, in the format of ``sys.exc_info()``.
+
+    """
+    return type(exc), exc, exc.__traceback__
+
+
+def label_of(mgr):
+    """Helper for ``ParallelContexts``, naming a manager like its own log lines.
+
+    """
+    if hasattr(mgr, 'cf_body_name') and hasattr(mgr, 'cf_uri'):
+        return f'{mgr.cf_body_name}@{mgr.cf_uri}'
+    if hasattr(mgr, 'traqr_body_name'):
+        return f'TRAQR {mgr.traqr_body_name}'
+    return type(mgr).__name__
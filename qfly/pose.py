@@ -1,20 +1,38 @@
+from operator import itemgetter
+
 from qfly import utils
 
 
-class Pose:
+class Pose(tuple):
     """
     Full pose data with euler angles or rotation matrix.
+
+    Pose objects are immutable and can be shared between threads.
+    Methods that modify a pose, like clamp(), return a new Pose.
+
+    Attributes
+    ----------
+    predicted : bool
+        Whether pose was extrapolated rather than measured,
+        see PredictedPose.
     """
 
-    def __init__(self, x, y, z, roll=None, pitch=None, yaw=None, rotmatrix=None):
-        self.x = x
-        self.y = y
-        self.z = z
+    __slots__ = ()
+
+    predicted = False
+
+    x = property(itemgetter(0), doc="x coordinate (Unit: m)")
+    y = property(itemgetter(1), doc="y coordinate (Unit: m)")
+    z = property(itemgetter(2), doc="z coordinate (Unit: m)")
+    roll = property(itemgetter(3), doc="Roll angle (Unit: degrees)")
+    pitch = property(itemgetter(4), doc="Pitch angle (Unit: degrees)")
+    yaw = property(itemgetter(5), doc="Yaw angle (Unit: degrees)")
+    rotmatrix = property(itemgetter(6), doc="Row-major 3x3 rotation matrix")
 
-        self.roll = roll
-        self.pitch = pitch
-        self.yaw = yaw
-        self.rotmatrix = rotmatrix
+    def __new__(cls, x, y, z, roll=None, pitch=None, yaw=None, rotmatrix=None):
+        if rotmatrix is not None:
+            rotmatrix = tuple(tuple(row) for row in rotmatrix)
+        return tuple.__new__(cls, (x, y, z, roll, pitch, yaw, rotmatrix))
 
     @classmethod
     def from_qtm_6d(cls, qtm_6d):
@@ -26,18 +44,37 @@ class Pose:
         qtm_6d
             6D pose data from QTM component
         """
+        qtm_pos = qtm_6d[0]
         qtm_rot = qtm_6d[1].matrix
-        rotmatrix = [[qtm_rot[0], qtm_rot[3], qtm_rot[6]],
-                     [qtm_rot[1], qtm_rot[4], qtm_rot[7]],
-                     [qtm_rot[2], qtm_rot[5], qtm_rot[8]]]
-        return cls(qtm_6d[0][0] / 1000,
-                   qtm_6d[0][1] / 1000,
-                   qtm_6d[0][2] / 1000,
-                   rotmatrix=rotmatrix)
+        # Skip argument handling in __new__, this runs for every body on every frame
+        return tuple.__new__(cls, (qtm_pos[0] / 1000,
+                                   qtm_pos[1] / 1000,
+                                   qtm_pos[2] / 1000,
+                                   None,
+                                   None,
+                                   None,
+                                   ((qtm_rot[0], qtm_rot[3], qtm_rot[6]),
+                                    (qtm_rot[1], qtm_rot[4], qtm_rot[7]),
+                                    (qtm_rot[2], qtm_rot[5], qtm_rot[8]))))
+
+    def replace(self, **changes):
+        """
+        Returns copy of pose with some attributes changed.
+
+        Parameters
+        ----------
+        **changes
+            New values for x, y, z, roll, pitch, yaw or rotmatrix.
+        """
+        fields = dict(x=self[0], y=self[1], z=self[2],
+                      roll=self[3], pitch=self[4], yaw=self[5],
+                      rotmatrix=self[6])
+        fields.update(changes)
+        return Pose(**fields)
 
     def clamp(self, world):
         """
-        Geofences pose within safe airspace
+        Returns copy of pose geofenced within safe airspace
         defined by world parameter.
 
         Parameters
@@ -45,12 +82,12 @@ class Pose:
         world : World
             World object defining airspace rules.
         """
-        self.x = max(world.origin.x - world.expanse + world.padding,
-                     min(self.x, world.origin.x + world.expanse - world.padding))
-        self.y = max(world.origin.y - world.expanse + world.padding,
-                     min(self.y, world.origin.y + world.expanse - world.padding))
-        self.z = max(0,
-                     min(self.z, world.origin.z + (2 * world.expanse) - world.padding))
+        lo = world.clamp_min
+        hi = world.clamp_max
+        x = max(lo[0], min(self[0], hi[0]))
+        y = max(lo[1], min(self[1], hi[1]))
+        z = max(lo[2], min(self[2], hi[2]))
+        return tuple.__new__(Pose, (x, y, z) + self[3:])
 
     def distance_to(self, other_pose):
         """
@@ -73,7 +110,26 @@ class Pose:
         """
         return self.x == self.x and self.y == self.y and self.z == self.z
 
+    def __getnewargs__(self):
+        return tuple(self)
+
+    def __repr__(self):
+        return (f'{type(self).__name__}(x={self.x!r}, y={self.y!r}, z={self.z!r}, '
+                f'roll={self.roll!r}, pitch={self.pitch!r}, yaw={self.yaw!r}, '
+                f'rotmatrix={self.rotmatrix!r})')
+
     def __str__(self):
         # return "x: {:6.2f} y: {:6.2f} z: {:6.2f} Roll: {:6.2f} Pitch: {:6.2f} Yaw: {:6.2f}".format(
         # self.x, self.y, self.z, self.roll, self.pitch, self.yaw)
         return f'x: {self.x} y: {self.y} z: {self.z} yaw: {self.yaw}'
+
+
+class PredictedPose(Pose):
+    """
+    Pose extrapolated from earlier poses to bridge a gap in tracking,
+    e.g. by a ConstantVelocityPredictor.
+    """
+
+    __slots__ = ()
+
+    predicted = True
@@ -0,0 +1,220 @@
+from qfly.history import PoseHistory
+from qfly.pose import PredictedPose
+
+
+class Predictor:
+    """
+    Base class of dead reckoning predictors, which extrapolate the pose
+    of one rigid body from its latest measured poses, to bridge short
+    gaps in tracking, e.g. brief occlusions.
+
+    Pass a predictor to QtmWrapper or QualisysCrazyflie to have
+    frames without a valid pose filled in with PredictedPose objects.
+    Gaps longer than max_gap are left unfilled. Tracking loss is
+    counted either way, so safety checks still trip on long gaps.
+
+    Measured poses are kept in a PoseHistory, which update() appends to.
+    Several predictors may predict from one history, as long as only
+    one of them is updated. Subclasses implement _extrapolate(),
+    and may filter poses as they come in by overriding _update().
+
+    Attributes
+    ----------
+    max_gap : float
+        Longest time since last measured pose to predict for.
+        (Unit: s)
+    history : PoseHistory
+        Measured poses predicted from.
+    """
+
+    def __init__(self, max_gap=0.1, history=None):
+        """
+        Construct Predictor object
+
+        Parameters
+        ----------
+        max_gap : float (optional)
+            Longest time since last measured pose to predict for.
+            (Unit: s)
+        history : PoseHistory (optional)
+            Measured poses to predict from, e.g. shared with a drone.
+            New by default.
+        """
+        self.max_gap = max_gap
+        self.history = PoseHistory() if history is None else history
+
+    def update(self, pose, t):
+        """
+        Take in a measured pose, appending it to history.
+
+        Parameters
+        ----------
+        pose : Pose
+            Valid measured pose.
+        t : float
+            Time of measurement.
+            (Unit: s)
+        """
+        self._update(pose, t)
+        self.history.append(pose, t)
+
+    def predict(self, t):
+        """
+        Predict pose at a time after the last measured pose.
+        Returns PredictedPose, or None if no pose has been measured
+        or the gap is longer than max_gap.
+
+        Parameters
+        ----------
+        t : float
+            Time to predict pose at.
+            (Unit: s)
+        """
+        pose = self.history.pose
+        if pose is None:
+            return None
+        dt = t - self.history.time
+        if not 0 <= dt <= self.max_gap:
+            return None
+        # Orientation is held
+        return tuple.__new__(PredictedPose, self._extrapolate(pose, dt) + pose[3:])
+
+    def reset(self):
+        """
+        Forget measured poses, e.g. after a long gap.
+        """
+        self.history.clear()
+
+    def _update(self, pose, t):
+        """
+        Update motion estimate with a measured pose,
+        before it is appended to history.
+        """
+        pass
+
+    def _extrapolate(self, pose, dt):
+        """
+        Extrapolate position from last measured pose.
+        Returns (x, y, z) tuple.
+
+        Parameters
+        ----------
+        pose : Pose
+            Last measured pose.
+        dt : float
+            Time since last measured pose.
+            (Unit: s)
+        """
+        raise NotImplementedError
+
+
+class ConstantVelocityPredictor(Predictor):
+    """
+    Predictor extrapolating from the last measured position
+    at the velocity of the latest measured positions,
+    see PoseHistory.velocity().
+    """
+
+    def __init__(self, max_gap=0.1, window=2, history=None):
+        """
+        Construct ConstantVelocityPredictor object
+
+        Parameters
+        ----------
+        max_gap : float (optional)
+            Longest time since last measured pose to predict for.
+            (Unit: s)
+        window : int (optional)
+            Number of latest poses to estimate velocity from.
+            More filter out noise, but lag behind changes of speed.
+        history : PoseHistory (optional)
+            Measured poses to predict from, e.g. shared with a drone.
+            New by default.
+        """
+        Predictor.__init__(self, max_gap, history)
+        self.window = window
+
+    def _extrapolate(self, pose, dt):
+        velocity = self.history.velocity(self.window)
+        if velocity is None:
+            return pose[:3]
+        vx, vy, vz = velocity.tolist()
+        return (pose[0] + vx * dt, pose[1] + vy * dt, pose[2] + vz * dt)
+
+
+class KalmanPredictor(Predictor):
+    """
+    Predictor filtering measured positions with a constant velocity
+    Kalman filter per axis, and extrapolating from the filtered state.
+    Less sensitive to mocap noise than ConstantVelocityPredictor.
+
+    All axes share noise levels and time steps,
+    so they share one 2x2 covariance matrix.
+
+    Attributes
+    ----------
+    position : (float, float, float)
+        Filtered position.
+        (Unit: m)
+    velocity : (float, float, float)
+        Filtered velocity.
+        (Unit: m/s)
+    """
+
+    def __init__(self, max_gap=0.1, acceleration=5.0, noise=0.001, history=None):
+        """
+        Construct KalmanPredictor object
+
+        Parameters
+        ----------
+        max_gap : float (optional)
+            Longest time since last measured pose to predict for.
+            (Unit: s)
+        acceleration : float (optional)
+            Standard deviation of unmodelled acceleration.
+            (Unit: m/s^2)
+        noise : float (optional)
+            Standard deviation of measured positions.
+            (Unit: m)
+        history : PoseHistory (optional)
+            Measured poses to predict from, e.g. shared with a drone.
+            New by default.
+        """
+        Predictor.__init__(self, max_gap, history)
+        self.acceleration = acceleration
+        self.noise = noise
+        self.position = (0.0, 0.0, 0.0)
+        self.velocity = (0.0, 0.0, 0.0)
+        self._covariance = None
+
+    def _update(self, pose, t):
+        r = self.noise ** 2
+        if self._covariance is None or self.history.time is None:
+            self.position = tuple(pose[:3])
+            self.velocity = (0.0, 0.0, 0.0)
+            self._covariance = (r, 0.0, 1.0)
+            return
+
+        # Predict
+        dt = max(0.0, t - self.history.time)
+        q = self.acceleration ** 2
+        pp, pv, vv = self._covariance
+        pp += 2 * dt * pv + dt * dt * vv + q * dt ** 4 / 4
+        pv += dt * vv + q * dt ** 3 / 2
+        vv += q * dt * dt
+        position = [p + v * dt for p, v in zip(self.position, self.velocity)]
+
+        # Correct
+        s = pp + r
+        kp, kv = pp / s, pv / s
+        innovation = [z - p for z, p in zip(pose[:3], position)]
+        self.position = tuple(p + kp * e for p, e in zip(position, innovation))
+        self.velocity = tuple(v + kv * e for v, e in zip(self.velocity, innovation))
+        self._covariance = ((1 - kp) * pp, (1 - kp) * pv, vv - kv * pv)
+
+    def _extrapolate(self, pose, dt):
+        return tuple(p + v * dt for p, v in zip(self.position, self.velocity))
+
+    def reset(self):
+        Predictor.reset(self)
+        self._covariance = None
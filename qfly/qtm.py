@@ -1,67 +1,453 @@
 import asyncio
 import math
 import os
-from threading import Thread
-import xml.etree.cElementTree as ET
+from threading import get_ident, Lock, Thread
+import time
+import xml.etree.ElementTree as ET
 
+import numpy as np
 import qtm
+from qtm import QRTEvent
+from qtm.packet import QRTComponentType, RT6DComponent
 
 from qfly import Pose
+from qfly.history import PoseHistory
+from qfly.metrics import LatencyMetrics
+from qfly.recorder import POSE
 
 
-class QtmWrapper(Thread):
+FRAME_DTYPE = np.dtype([('position', '<f8', (3,)),
+                        ('rotation', '<f8', (3, 3)),
+                        ('valid', '?'),
+                        ('frame', '<u4')])
+"""
+Record layout of decoded 6D frames, one record per rigid body:
+position in m, row-major rotation matrix, validity and QTM frame number.
+"""
+
+# Raw layout of one body in a QTM 6D component
+_RAW_6D_DTYPE = np.dtype([('position', '<f4', (3,)),
+                          ('rotation', '<f4', (9,))])
+
+
+# QTM events after which rigid body definitions may have changed
+_RELOAD_EVENTS = (QRTEvent.EventConnected,
+                  QRTEvent.EventCaptureStarted,
+                  QRTEvent.EventCalibrationStopped,
+                  QRTEvent.EventRTfromFileStarted,
+                  QRTEvent.EventCameraSettingsChanged)
+
+
+class PoseSource:
     """
-    Wrapper for opening and running an asynchronous QTM connection
-    that receives and responds to real time data packets.
-    
-    Designed for real time interactive applications, e.g. drone control.
-    Each entity being tracked should:
-    1) instantiate its own QtmWrapper,
-    2) be defined as a rigid body in QTM,
-    3) pass a callback function to its QtmWrapper which responds to pose data.
+    Source of real time rigid body poses that QtmWrapper objects
+    subscribe to, e.g. a live QTM stream or a recording.
+
+    Keeps the table of subscribers per body and passes each frame
+    on to them, either as Pose objects or as FRAME_DTYPE records.
+    Subclasses find body indices, call _set_body_index(),
+    and pass on frames, e.g. with _dispatch_frame().
+
+    A source is shared by all its subscribers and runs while
+    anyone uses it, see open() and release().
+
+    Attributes
+    ----------
+    framenumber : int
+        Frame number of the frame being passed on.
+    timestamp : int
+        QTM timestamp of the frame being passed on, or None if unknown.
+        (Unit: us)
+    received : float
+        Time the frame being passed on was received, by time.perf_counter().
+        (Unit: s)
     """
 
-    def __init__(self, body, on_pose, qtm_ip="127.0.0.1"):
+    def __init__(self):
         """
-        Construct QtmWrapper object
+        Construct PoseSource object
+        """
+        self.framenumber = 0
+        self.timestamp = None
+        self.received = None
+
+        self._refs = 0
+        self._refs_lock = Lock()
+        self._body_index = None
+        # Set while the body index table may be stale
+        self._reloading = False
+        self._subscribers = {}
+        self._frame_subscribers = ()
+        # Body routes, frame subscribers and what to decode for them,
+        # swapped in together so the packet callback sees them consistently
+        self._routing = ((), (), False, False)
+        self._frame = np.zeros(0, dtype=FRAME_DTYPE)
+        self._lock = Lock()
+
+    def open(self, loop=None):
+        """
+        Take one reference to the source, starting it if necessary.
+        Every call must be balanced by a call to release().
+
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop (optional)
+            Event loop to run the source on, if supported,
+            instead of a thread of its own.
+        """
+        with self._refs_lock:
+            self._refs += 1
+            if self._refs == 1:
+                self._start_source(loop)
+
+    def release(self):
+        """
+        Give up one reference to the source.
+        The source stops when its last user releases it.
+        Returns True if the source is stopping.
+        """
+        with self._refs_lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return False
+        self._stop_source()
+        return True
+
+    async def wait_closed(self):
+        """
+        Wait for a released source to stop.
+        """
+
+    def _start_source(self, loop):
+        """
+        Start passing on frames. Implemented by subclasses.
+
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop
+            Event loop to run on, or None for a thread of its own.
+        """
+        raise NotImplementedError
+
+    def _stop_source(self):
+        """
+        Stop passing on frames. Implemented by subclasses.
+        """
+        raise NotImplementedError
+
+    def subscribe(self, wrapper):
+        """
+        Start passing on poses of wrapper's body to wrapper.
+
+        Parameters
+        ----------
+        wrapper : QtmWrapper
+            Subscriber receiving poses of its body.
+        """
+        with self._lock:
+            wrappers = self._subscribers.get(wrapper.body, ())
+            self._subscribers[wrapper.body] = wrappers + (wrapper,)
+            self._update_routes(required=(wrapper.body,))
+            if self._body_index is not None:
+                self._print_index(wrapper.body)
+
+    def unsubscribe(self, wrapper):
+        """
+        Stop passing on poses to wrapper.
+
+        Parameters
+        ----------
+        wrapper : QtmWrapper
+            Subscriber to remove.
+        """
+        with self._lock:
+            wrappers = tuple(w for w in self._subscribers.get(wrapper.body, ())
+                             if w is not wrapper)
+            if wrappers:
+                self._subscribers[wrapper.body] = wrappers
+            else:
+                self._subscribers.pop(wrapper.body, None)
+            self._update_routes(required=())
+
+    def subscribe_frames(self, on_frame):
+        """
+        Start passing on every decoded 6D frame.
+
+        Parameters
+        ----------
+        on_frame : function(numpy.ndarray)
+            Callback receiving an array of FRAME_DTYPE records
+            indexed like the bodies in QTM. The array is reused
+            for the next frame, copy it to keep it around.
+        """
+        with self._lock:
+            self._frame_subscribers = self._frame_subscribers + (on_frame,)
+            self._update_routes(required=())
+
+    def unsubscribe_frames(self, on_frame):
+        """
+        Stop passing on decoded 6D frames.
+
+        Parameters
+        ----------
+        on_frame : function(numpy.ndarray)
+            Callback to remove.
+        """
+        with self._lock:
+            self._frame_subscribers = tuple(
+                f for f in self._frame_subscribers if f is not on_frame)
+            self._update_routes(required=())
+
+    def index_of(self, body):
+        """
+        Get QTM index of rigid body, or None if unknown.
 
         Parameters
         ----------
         body : string
-            Name of 6DOF rigid body being tracked.
-        on_pose : function(Pose)
-            Callback to trigger when pose packet is received.
+            Name of 6DOF rigid body.
+        """
+        body_index = self._body_index
+        return None if body_index is None else body_index.get(body)
+
+    def _set_body_index(self, body_index):
+        """
+        Swap in a new body index table and re-route subscribers.
+
+        Parameters
+        ----------
+        body_index : dict
+            Body name to index table.
+        """
+        with self._lock:
+            # Subscribed bodies must exist when first looked up
+            required = tuple(self._subscribers) if self._body_index is None else ()
+            changed = body_index != self._body_index
+            self._body_index = body_index
+            self._reloading = False
+            self._update_routes(required=required)
+            if changed:
+                for body in self._subscribers:
+                    self._print_index(body)
+
+    def _suspend_routes(self):
+        """
+        Register tracking loss for all subscribers until the next
+        call to _set_body_index(), as body indices may have changed.
+        """
+        with self._lock:
+            self._reloading = True
+            self._update_routes(required=())
+
+    def _update_routes(self, required):
+        """
+        Rebuild the table of body indices and their subscribers
+        used by the packet callback. Call with lock held.
+
+        Parameters
+        ----------
+        required : [str]
+            Bodies that must be defined in QTM, or else terminate.
+            Other missing bodies make their subscribers register tracking loss.
+        """
+        decode_frames = bool(self._frame_subscribers) or any(
+            w.batch for wrappers in self._subscribers.values() for w in wrappers)
+        decode_poses = any(
+            not w.batch for wrappers in self._subscribers.values() for w in wrappers)
+        routes = []
+        # Nothing is routed to bodies until their indices are known
+        subscribers = self._subscribers if self._body_index is not None else {}
+        for body, wrappers in subscribers.items():
+            # Stale indices could route poses of another body
+            index = None if self._reloading else self._body_index.get(body)
+            if index is None and not self._reloading:
+                # Quit if body not found
+                if body in required:
+                    print(f'[QTM] Rigid body "{body}" not found! Terminating...')
+                    os._exit(1)
+                print(f'[QTM] Rigid body "{body}" not defined! Registering tracking loss...')
+            routes.append((index,
+                           tuple(w for w in wrappers if not w.batch),
+                           tuple(w for w in wrappers if w.batch)))
+        # Swap in a new tuple so the packet callback never sees a partial table
+        self._routing = (tuple(routes), self._frame_subscribers, decode_poses, decode_frames)
+
+    def _print_index(self, body):
+        """
+        Report index of a subscribed body.
+        """
+        if body in self._body_index:
+            print(f'[QTM] Index for rigid body "{body}" is: {self._body_index[body]}')
+
+    def _dispatch_frame(self, frame):
+        """
+        Pass on a frame of decoded records to subscribers.
+
+        Parameters
+        ----------
+        frame : numpy.ndarray
+            FRAME_DTYPE records indexed like the bodies in the source.
+        """
+        self.received = time.perf_counter()
+        routes, frame_subscribers, _, _ = self._routing
+        if len(frame):
+            self.framenumber = int(frame['frame'][0])
+
+        for on_frame in frame_subscribers:
+            on_frame(frame)
+
+        for index, wrappers, records in routes:
+            record = None if index is None or index >= len(frame) else frame[index]
+            # Create Pose object once per body
+            if wrappers:
+                pose = None
+                if record is not None:
+                    x, y, z = record['position'].tolist()
+                    pose = Pose(x, y, z, rotmatrix=record['rotation'].tolist())
+                for wrapper in wrappers:
+                    wrapper._on_pose(pose)
+            for wrapper in records:
+                wrapper._on_record(record)
+
+
+class QtmStream(PoseSource, Thread):
+    """
+    Shared asynchronous QTM connection that receives real time 6D packets
+    and multiplexes them to every QtmWrapper subscribed to the same QTM host.
+
+    One QtmStream runs per QTM host, no matter how many bodies are tracked:
+    one thread, one event loop, one TCP connection and one 6D stream.
+    Asynchronous applications can instead run the stream on their own
+    event loop, so that poses are handled without any extra thread.
+    Each frame is decoded once and each body's pose is passed on
+    to all subscribers of that body.
+
+    Alternatively, the whole 6D component can be decoded in one go
+    into a preallocated NumPy array of FRAME_DTYPE records.
+    Batch subscribers receive views into that array,
+    which are only valid until the callback returns.
+
+    The body name to index table is parsed once per connection,
+    before any frame is passed on, and reloaded when QTM reports
+    events that may change body definitions.
+
+    QtmStream objects are not meant to be constructed directly.
+    Use QtmStream.acquire() and QtmStream.release(),
+    or simply instantiate a QtmWrapper.
+    """
+
+    _streams = {}
+    _streams_lock = Lock()
+
+    @classmethod
+    def acquire(cls, qtm_ip, loop=None):
+        """
+        Get the shared stream for a QTM host, starting it if necessary.
+        Every call must be balanced by a call to release().
+
+        Parameters
+        ----------
+        qtm_ip : string or PoseSource
+            IP address of QTM instance, or another source of poses.
+        loop : asyncio.AbstractEventLoop (optional)
+            Event loop to run a newly started stream on,
+            instead of a thread of its own.
+            A stream that is already running keeps running where it is.
+        """
+        # Sources other than QTM are shared as they are
+        if isinstance(qtm_ip, PoseSource):
+            qtm_ip.open(loop)
+            return qtm_ip
+        with cls._streams_lock:
+            stream = cls._streams.get(qtm_ip)
+            if stream is None:
+                stream = cls(qtm_ip)
+                cls._streams[qtm_ip] = stream
+                if loop is None:
+                    stream.start()
+                else:
+                    stream._task = asyncio.run_coroutine_threadsafe(
+                        stream._life_cycle(), loop)
+            stream._refs += 1
+            return stream
+
+    def __init__(self, qtm_ip="127.0.0.1"):
+        """
+        Construct QtmStream object
+
+        Parameters
+        ----------
         qtm_ip : string
             IP address of QTM instance.
         """
 
-        Thread.__init__(self)
+        PoseSource.__init__(self)
+        Thread.__init__(self, daemon=True)
 
-        self.body = body
         self.qtm_ip = qtm_ip
-        self.on_pose = on_pose
 
-        self.tracking_loss = 0
-
-        self._body_idx = None
         self._connection = None
         self._stay_open = True
+        self._loop = None
+        self._closing = None
+        self._task = None
+        # Latest body index reload, and how many were started
+        self._reload_task = None
+        self._reloads = 0
+
+    @property
+    def loop(self):
+        """
+        Event loop the stream runs on, or None if not started yet.
+        Subscriber callbacks are called from this loop.
+        """
+        return self._loop
+
+    def release(self):
+        """
+        Give up one reference to the shared stream.
+        The stream is closed when its last user releases it.
+        Returns True if the stream is closing.
+
+        A stream running in its own thread is closed before returning.
+        A stream running on an application event loop closes
+        in the background, see wait_closed().
+        """
+        with QtmStream._streams_lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return False
+            del QtmStream._streams[self.qtm_ip]
+        self._stay_open = False
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._closing.set)
+        if self._task is None:
+            self.join()
+        return True
 
-        self.start()
+    async def wait_closed(self):
+        """
+        Wait for a released stream running on an event loop to close.
+        """
+        if self._task is not None:
+            await asyncio.wrap_future(self._task)
 
     def run(self):
         """
-        Run QTM wrapper coroutine.
+        Run QTM stream coroutine.
         """
         asyncio.run(self._life_cycle())
 
     async def _life_cycle(self):
         """
-        QTM wrapper coroutine.
+        QTM stream coroutine.
         """
+        self._closing = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
         await self._connect()
-        while(self._stay_open):
-            await asyncio.sleep(1)
+        if self._stay_open:
+            await self._closing.wait()
         await self._close()
 
     async def _connect(self):
@@ -70,26 +456,16 @@ class QtmWrapper(Thread):
         """
         # Establish connection
         print('[QTM] Connecting to QTM at ' + self.qtm_ip)
-        self._connection = await qtm.connect(self.qtm_ip)
+        self._connection = await qtm.connect(self.qtm_ip,
+                                             on_event=self._on_event)
 
         # Quit if QTM unavailable
         if self._connection is None:
             print("[QTM] Could not connect to QTM! Terminating...")
             os._exit(1)
 
-        # Register index of body for 6D tracking
-        params_xml = await self._connection.get_parameters(parameters=['6d'])
-        xml = ET.fromstring(params_xml)
-        for index, body in enumerate(xml.findall("*/Body/Name")):
-            if body.text.strip() == self.body:
-                self._body_idx = index
-                print(
-                    f'[QTM] Index for rigid body "{self.body}" is: {self._body_idx}')
-
-        # Quit if body not found
-        if self._body_idx is None:
-            print(f'[QTM] Rigid body "{self.body}" not found! Terminating...')
-            os._exit(1)
+        # Register indices of all bodies for 6D tracking
+        await self._reload_body_index()
 
         # Assign 6D streaming callback
         try:
@@ -99,45 +475,411 @@ class QtmWrapper(Thread):
             print("[QTM] Frame stream TimeoutError! Terminating...")
             os._exit(1)
 
+    async def _reload_body_index(self, reload=None):
+        """
+        Fetch 6D parameters from QTM and update body index table.
+
+        Parameters
+        ----------
+        reload : int (optional)
+            Number of the reload started by an event, if any.
+            Reloads started since take precedence.
+        """
+        params_xml = await self._connection.get_parameters(parameters=['6d'])
+        body_index = self._parse_body_index(params_xml)
+        if reload is None or reload == self._reloads:
+            self._set_body_index(body_index)
+
+    @staticmethod
+    def _parse_body_index(params_xml):
+        """
+        Build body name to index table from 6D parameters XML.
+
+        Parameters
+        ----------
+        params_xml : bytes
+            6D parameters from QTM.
+        """
+        xml = ET.fromstring(params_xml)
+        body_index = {}
+        for index, body in enumerate(xml.findall("*/Body/Name")):
+            body_index[body.text.strip()] = index
+        return body_index
+
+    def _on_event(self, event):
+        """
+        Reload body index table when body definitions may have changed.
+
+        Parameters
+        ----------
+        event : QRTEvent
+            Event from QTM.
+        """
+        if event in _RELOAD_EVENTS and self._body_index is not None:
+            # Stop routing by the old table right away
+            self._suspend_routes()
+            self._reloads += 1
+            self._reload_task = asyncio.ensure_future(self._reload_body_index(self._reloads))
+            self._reload_task.add_done_callback(self._on_reloaded)
+
+    def _on_reloaded(self, task):
+        """
+        Report a failed body index reload.
+        Subscribers keep registering tracking loss until a later reload.
+
+        Parameters
+        ----------
+        task : asyncio.Task
+            Finished reload.
+        """
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            print(f'[QTM] Could not reload rigid bodies: {error!r}! Registering tracking loss...')
+
     def _on_packet(self, packet):
         """
-        Process 6D packet stream into Pose object and pass on.
+        Process 6D packet stream into Pose objects and/or a frame array
+        and pass them on to subscribers.
 
         Parameters
         ----------
         packet : QRTPacket
             Incoming packet from QTM
         """
-        # Extract 6D component from packet
-        header, component_6d = packet.get_6d()
+        self.received = time.perf_counter()
+        routes, frame_subscribers, decode_poses, decode_frames = self._routing
+        self.framenumber = packet.framenumber
+        self.timestamp = packet.timestamp
+
+        # Locate 6D component in packet
+        position = packet.components.get(QRTComponentType.Component6d)
+        body_count = 0
+        if position is not None:
+            body_count = RT6DComponent.format.unpack_from(packet.data, position)[0]
 
-        # Increment tracking loss if no component found
-        if component_6d is None:
+        # Register tracking loss if no component found
+        if body_count == 0:
             print('[QTM] Packet without 6D component! Moving on...')
-            self.tracking_loss += 1
+            for _, wrappers, records in routes:
+                for wrapper in wrappers:
+                    wrapper._on_pose(None)
+                for wrapper in records:
+                    wrapper._on_record(None)
             return
 
-        # Extract relevant body data from 6D component
-        body_6d = component_6d[self._body_idx]
-        # Create Pose object from 6D data
-        pose = Pose.from_qtm_6d(body_6d)
-        # Check validity and pass on
-        if pose.is_valid():
-            self.on_pose(pose)
-            self.tracking_loss = 0
-        else:
-            self.tracking_loss += 1
+        if decode_poses:
+            _, component_6d = packet.get_6d()
+        if decode_frames:
+            frame = self._decode_frame(packet, position, body_count)
+            for on_frame in frame_subscribers:
+                on_frame(frame)
+
+        for index, wrappers, records in routes:
+            missing = index is None or index >= body_count
+            # Create Pose object from 6D data once per body
+            if wrappers:
+                pose = None if missing else Pose.from_qtm_6d(component_6d[index])
+                for wrapper in wrappers:
+                    wrapper._on_pose(pose)
+            # Pass on view into frame array
+            if records:
+                record = None if missing else frame[index]
+                for wrapper in records:
+                    wrapper._on_record(record)
+
+    def _decode_frame(self, packet, position, body_count):
+        """
+        Decode whole 6D component into preallocated frame array.
+
+        Parameters
+        ----------
+        packet : QRTPacket
+            Incoming packet from QTM
+        position : int
+            Offset of 6D component in packet data.
+        body_count : int
+            Number of bodies in 6D component.
+        """
+        if len(self._frame) != body_count:
+            self._frame = np.zeros(body_count, dtype=FRAME_DTYPE)
+        frame = self._frame
+        raw = np.frombuffer(packet.data, dtype=_RAW_6D_DTYPE, count=body_count,
+                            offset=position + RT6DComponent.format.size)
+        # mm to m
+        np.divide(raw['position'], 1000, out=frame['position'], dtype=np.float64)
+        # QTM sends column-major rotation matrices
+        frame['rotation'] = raw['rotation'].reshape(body_count, 3, 3).transpose(0, 2, 1)
+        np.isfinite(frame['position']).all(axis=1, out=frame['valid'])
+        frame['frame'] = packet.framenumber
+        return frame
 
     async def _close(self):
         """
         End lifecycle by disconnecting from QTM machine.
         """
+        if self._reload_task is not None:
+            self._reload_task.cancel()
         await self._connection.stream_frames_stop()
         self._connection.disconnect()
 
+
+class QtmWrapper:
+    """
+    Subscription to real time pose data of one rigid body
+    streamed from a QTM instance.
+
+    Designed for real time interactive applications, e.g. drone control.
+    Each entity being tracked should:
+    1) instantiate its own QtmWrapper,
+    2) be defined as a rigid body in QTM,
+    3) pass a callback function to its QtmWrapper which responds to pose data.
+
+    All QtmWrapper objects pointed at the same QTM host
+    share a single QtmStream connection.
+
+    Asynchronous applications can iterate over poses instead
+    of, or in addition to, passing a callback::
+
+        async for pose in wrapper.poses():
+            ...
+
+    Every subscription times the frames it receives and counts
+    frames lost on the way from QTM, see metrics, and keeps the latest
+    measured poses, see history.
+    """
+
+    def __init__(self, body, on_pose=None, qtm_ip="127.0.0.1", batch=False, loop=None,
+                 recorder=None, metrics=None, predictor=None, history=None):
+        """
+        Construct QtmWrapper object
+
+        Parameters
+        ----------
+        body : string
+            Name of 6DOF rigid body being tracked.
+        on_pose : function(Pose) (optional)
+            Callback to trigger when pose packet is received.
+        qtm_ip : string or PoseSource
+            IP address of QTM instance, or another source of poses,
+            e.g. a ReplaySource.
+        batch : bool
+            If True, on_pose receives a FRAME_DTYPE record view
+            into the shared frame array instead of a Pose object.
+            The view is only valid until the callback returns.
+        loop : asyncio.AbstractEventLoop (optional)
+            Event loop to run the QTM stream on, if not running yet.
+            By default the stream runs in a thread of its own.
+        recorder : FlightRecorder (optional)
+            Recorder to log every pose and tracking loss to.
+        metrics : LatencyMetrics (optional)
+            Latency and frame loss metrics to update,
+            e.g. to share them with a drone. New ones by default.
+        predictor : Predictor (optional)
+            Predictor to fill in short tracking gaps with,
+            e.g. a ConstantVelocityPredictor. Poses only, not batch records.
+        history : PoseHistory (optional)
+            History to append measured poses to, timed by QTM timestamp,
+            e.g. to share it with a drone. The predictor's history
+            if a predictor is given, or else a new one.
+            Poses only, not batch records.
+        """
+
+        self.body = body
+        self.qtm_ip = qtm_ip
+        self.on_pose = on_pose
+        self.batch = batch
+        self.recorder = recorder
+
+        self.tracking_loss = 0
+        self.metrics = LatencyMetrics() if metrics is None else metrics
+        self.predictor = predictor
+        if history is None:
+            history = PoseHistory() if predictor is None else predictor.history
+        self.history = history
+
+        self._iterators = ()
+        if recorder is not None:
+            self._recorder_body = recorder.body_id(body)
+
+        self._stream = QtmStream.acquire(qtm_ip, loop)
+        self._stream.subscribe(self)
+
+    def poses(self):
+        """
+        Get an asynchronous iterator over the poses of the tracked body.
+        Must be called from a running event loop.
+        """
+        return PoseIterator(self)
+
+    def _on_pose(self, pose):
+        """
+        Check validity of pose from QtmStream and pass on.
+
+        Parameters
+        ----------
+        pose : Pose
+            Pose of tracked body, or None if missing from packet.
+        """
+        stream = self._stream
+        self.metrics.on_frame(stream.framenumber, stream.timestamp, stream.received)
+        if pose is not None and pose.is_valid():
+            t = self.metrics.time
+            if self.predictor is not None:
+                self.predictor.update(pose, t)
+            if self.predictor is None or self.predictor.history is not self.history:
+                self.history.append(pose, t)
+            if self.on_pose is not None:
+                self.on_pose(pose)
+            for iterator in self._iterators:
+                iterator._push(pose)
+            self.tracking_loss = 0
+        else:
+            self.tracking_loss += 1
+            if self.predictor is not None:
+                predicted = self.predictor.predict(self.metrics.time)
+                if predicted is not None:
+                    if self.on_pose is not None:
+                        self.on_pose(predicted)
+                    for iterator in self._iterators:
+                        iterator._push(predicted)
+        if self.recorder is not None:
+            if pose is None:
+                self._record(math.nan, math.nan, math.nan, None)
+            else:
+                self._record(pose[0], pose[1], pose[2], pose[6])
+
+    def _on_record(self, record):
+        """
+        Check validity of frame record from QtmStream and pass on.
+
+        Parameters
+        ----------
+        record : numpy.void
+            FRAME_DTYPE record of tracked body, or None if missing from packet.
+        """
+        stream = self._stream
+        self.metrics.on_frame(stream.framenumber, stream.timestamp, stream.received)
+        if record is not None and record['valid']:
+            if self.on_pose is not None:
+                self.on_pose(record)
+            if self._iterators:
+                # Views into the frame array do not outlive the callback
+                record = record.copy()
+                for iterator in self._iterators:
+                    iterator._push(record)
+            self.tracking_loss = 0
+        else:
+            self.tracking_loss += 1
+        if self.recorder is not None:
+            if record is None:
+                self._record(math.nan, math.nan, math.nan, None)
+            else:
+                self._record(*record['position'], record['rotation'])
+
+    def _record(self, x, y, z, rotmatrix):
+        """
+        Log pose and tracking loss to recorder.
+
+        Parameters
+        ----------
+        x : float
+            x coordinate. (Unit: m)
+        y : float
+            y coordinate. (Unit: m)
+        z : float
+            z coordinate. (Unit: m)
+        rotmatrix : 3x3 array
+            Row-major rotation matrix, or None if unknown.
+        """
+        yaw = math.nan
+        if rotmatrix is not None:
+            yaw = math.degrees(math.atan2(rotmatrix[1][0], rotmatrix[0][0]))
+        self.recorder.record(POSE, self._recorder_body, x, y, z, yaw,
+                             self._stream.framenumber, self.tracking_loss)
+
     def close(self):
         """
-        Stop QTM wrapper thread.
+        Stop receiving poses and release the shared QTM stream.
+        Returns True if the stream is closing.
         """
-        self._stay_open = False
-        self.join()
+        self._stream.unsubscribe(self)
+        for iterator in self._iterators:
+            iterator.close()
+        self._iterators = ()
+        return self._stream.release()
+
+    async def aclose(self):
+        """
+        Stop receiving poses and release the shared QTM stream,
+        waiting for it to close if this was its last user.
+        """
+        if self.close():
+            await self._stream.wait_closed()
+
+
+class PoseIterator:
+    """
+    Asynchronous iterator over the poses of one QtmWrapper.
+
+    Latest wins: if poses arrive faster than they are consumed,
+    the iterator yields the newest one and skips the rest,
+    so a slow consumer never falls behind the mocap stream.
+    Iteration ends when the iterator or its QtmWrapper is closed.
+
+    PoseIterator objects are not meant to be constructed directly.
+    Use QtmWrapper.poses().
+    """
+
+    def __init__(self, wrapper):
+        """
+        Construct PoseIterator object
+
+        Parameters
+        ----------
+        wrapper : QtmWrapper
+            Subscription to iterate over.
+        """
+        self._wrapper = wrapper
+        self._loop = asyncio.get_running_loop()
+        self._thread = get_ident()
+        self._ready = asyncio.Event()
+        self._pose = None
+        self._closed = False
+        wrapper._iterators = wrapper._iterators + (self,)
+
+    def _push(self, pose):
+        """
+        Make pose the next one to yield. Called from the QTM stream.
+
+        Parameters
+        ----------
+        pose : Pose
+            Latest pose of tracked body.
+        """
+        self._pose = pose
+        if get_ident() == self._thread:
+            self._ready.set()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+    def close(self):
+        """
+        End iteration and stop receiving poses,
+        e.g. when leaving an async for loop early.
+        """
+        wrapper = self._wrapper
+        wrapper._iterators = tuple(i for i in wrapper._iterators if i is not self)
+        self._closed = True
+        self._push(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self._ready.wait()
+        self._ready.clear()
+        if self._closed:
+            raise StopAsyncIteration
+        return self._pose
@@ -0,0 +1,573 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import struct
+from threading import Event, Lock, Thread
+import time
+import traceback
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.param import ParamTocElement, WRITE_CHANNEL
+from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
+
+from qfly import utils
+
+
+def radio_of(uri):
+    """
+    Get identifier of the radio dongle or link serving a Crazyflie,
+    e.g. "radio://0" for "radio://0/80/2M/E7E7E7E7E7".
+
+    Parameters
+    ----------
+    uri : str
+        Crazyflie radio address.
+    """
+    scheme, _, rest = uri.partition('://')
+    return f'{scheme}://{rest.split("/")[0]}'
+
+
+DEFAULT_ADDRESS = 0xE7E7E7E7E7
+
+_drivers_initialized = False
+_drivers_lock = Lock()
+
+_discovered = {}
+_discovered_lock = Lock()
+
+
+def init_drivers():
+    """
+    Initialize cflib link drivers, once per process.
+    Safe to call from any number of drones and threads.
+    """
+    global _drivers_initialized
+    with _drivers_lock:
+        if not _drivers_initialized:
+            cflib.crtp.init_drivers()
+            _drivers_initialized = True
+
+
+def _link_of(uri):
+    """
+    Get (channel, datarate, address) of a radio URI,
+    ignoring which dongle it is reached through.
+
+    Parameters
+    ----------
+    uri : str
+        Crazyflie radio address.
+    """
+    parts = uri.split('://', 1)[1].split('/')
+    channel = int(parts[1]) if len(parts) > 1 else 2
+    datarate = parts[2].upper() if len(parts) > 2 else '2M'
+    address = int(parts[3], 16) if len(parts) > 3 else DEFAULT_ADDRESS
+    return channel, datarate, address
+
+
+def discover(uris, max_age=60.0):
+    """
+    Find out which of the given Crazyflies answer on the radio.
+    Returns set of URIs that were found.
+
+    Each radio address is scanned once, all addresses in parallel,
+    and results are cached so that a swarm script scans once
+    rather than once per drone. Only radio URIs are scanned,
+    others are assumed present.
+
+    Parameters
+    ----------
+    uris : [str]
+        Crazyflie radio addresses.
+    max_age : float (optional)
+        Reuse scan results younger than this.
+        (Unit: s)
+    """
+    init_drivers()
+    now = time.monotonic()
+    with _discovered_lock:
+        fresh = {link for link, seen in _discovered.items() if now - seen < max_age}
+
+    radio_uris = [uri for uri in uris if uri.startswith('radio://')]
+    addresses = {_link_of(uri)[2] for uri in radio_uris
+                 if _link_of(uri) not in fresh}
+    if addresses:
+        with ThreadPoolExecutor(max_workers=len(addresses)) as pool:
+            scans = list(pool.map(cflib.crtp.scan_interfaces, addresses))
+        with _discovered_lock:
+            for found in scans:
+                for uri, _ in found:
+                    if uri.startswith('radio://'):
+                        _discovered[_link_of(uri)] = now
+            fresh = {link for link, seen in _discovered.items() if now - seen < max_age}
+
+    return {uri for uri in uris
+            if not uri.startswith('radio://') or _link_of(uri) in fresh}
+
+
+def require_crazyflies(uris, max_age=60.0):
+    """
+    Fail fast unless all given Crazyflies answer on the radio.
+    Raises ConnectionError naming the missing ones.
+
+    Parameters
+    ----------
+    uris : [str]
+        Crazyflie radio addresses.
+    max_age : float (optional)
+        Reuse scan results younger than this.
+        (Unit: s)
+    """
+    found = discover(uris, max_age=max_age)
+    missing = [uri for uri in uris if uri not in found]
+    if missing:
+        raise ConnectionError(f'Crazyflies not found: {", ".join(missing)}')
+
+
+def make_crazyflie(toc_cache=True):
+    """
+    Construct cflib Crazyflie object with a persistent TOC cache,
+    so that log and param TOCs are only downloaded over the radio
+    the first time a firmware build is seen.
+
+    Cached TOCs are stored by checksum, so a drone running different
+    firmware misses the cache and downloads its TOC again.
+
+    Parameters
+    ----------
+    toc_cache : bool or str (optional)
+        True to use qfly's shared cache directory,
+        a path to use another directory, or False for no cache.
+    """
+    if toc_cache is True:
+        toc_cache = utils.cache_dir('toc')
+    return Crazyflie(ro_cache=None, rw_cache=toc_cache or None)
+
+
+def set_params(cf, values, timeout=2.0):
+    """
+    Write many parameters to a Crazyflie at once.
+
+    All write packets are sent back to back and acknowledgements
+    are collected together, instead of one round trip per parameter.
+    Acknowledged values are recorded in cf.param and reported to
+    its update callbacks, as for cf.param.set_value().
+    Returns a dict of parameters that could not be set,
+    mapping parameter name to reason.
+
+    Parameters
+    ----------
+    cf : Crazyflie
+        Connected Crazyflie, with parameter TOC downloaded.
+    values : dict
+        Values by complete parameter name, e.g. {'ring.effect': 0}.
+    timeout : float (optional)
+        Max time to wait for acknowledgements.
+        (Unit: s)
+    """
+    use_v2 = cf.platform.get_protocol_version() >= 4
+    id_format = '<H' if use_v2 else '<B'
+    id_size = struct.calcsize(id_format)
+
+    failures = {}
+    pending = {}
+    packets = []
+    for name, value in values.items():
+        element = cf.param.toc.get_element_by_complete_name(name)
+        if not element:
+            failures[name] = 'not in param TOC'
+            continue
+        if element.access == ParamTocElement.RO_ACCESS:
+            failures[name] = 'read-only'
+            continue
+        if element.pytype in ('<f', '<d', '<e'):
+            value = float(value)
+        else:
+            value = int(value)
+        var_id = struct.pack(id_format, element.ident)
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.PARAM, WRITE_CHANNEL)
+        pk.data = var_id + struct.pack(element.pytype, value)
+        pending[var_id] = name
+        packets.append(pk)
+
+    done = Event()
+    lock = Lock()
+
+    def on_packet(pk):
+        if pk.channel != WRITE_CHANNEL:
+            return
+        with lock:
+            if pending.pop(bytes(pk.data[:id_size]), None) is None:
+                return
+            if not pending:
+                done.set()
+        # Record value and call update callbacks, as cflib does for its own writes
+        cf.param._param_updated(pk)
+
+    if packets:
+        cf.add_port_callback(CRTPPort.PARAM, on_packet)
+        try:
+            for pk in packets:
+                # Let cflib resend writes that go unanswered
+                cf.send_packet(pk, expected_reply=tuple(pk.data[:id_size]))
+            done.wait(timeout)
+        finally:
+            cf.remove_port_callback(CRTPPort.PARAM, on_packet)
+
+    with lock:
+        for name in pending.values():
+            failures[name] = 'no acknowledgement'
+    return failures
+
+
+class ExtposThrottle:
+    """
+    Latest-wins rate cap for external position packets sent to one drone.
+
+    Mocap frames arriving faster than the allowed rate are dropped,
+    so the next frame to go out is always the freshest one
+    instead of a queued, stale position.
+
+    If a minimum rate is given, the allowed rate adapts to radio link
+    quality as reported by cflib, which accounts for packet loss:
+    full rate on a good link, backing off towards the minimum rate
+    as the link degrades.
+
+    Attributes
+    ----------
+    rate : float
+        Currently allowed rate, or None if unlimited. (Unit: Hz)
+    link_quality : float
+        Smoothed link quality in percent, or None if unknown.
+    received : int
+        Number of frames offered.
+    sent : int
+        Number of frames let through.
+    dropped : int
+        Number of frames dropped.
+    """
+
+    def __init__(self,
+                 max_rate=None,
+                 min_rate=None,
+                 good_quality=90.0,
+                 bad_quality=50.0,
+                 smoothing=0.2,
+                 clock=time.perf_counter):
+        """
+        Construct ExtposThrottle object
+
+        Parameters
+        ----------
+        max_rate : float (optional)
+            Rate cap. No cap if None.
+            (Unit: Hz)
+        min_rate : float (optional)
+            Rate on a bad link. No adaptation if None.
+            (Unit: Hz)
+        good_quality : float (optional)
+            Link quality at and above which max_rate is allowed.
+            (Unit: %)
+        bad_quality : float (optional)
+            Link quality at and below which min_rate is allowed.
+            (Unit: %)
+        smoothing : float (optional)
+            Weight of newest link quality sample in moving average.
+        clock : function() (optional)
+            Monotonic clock.
+            (Unit: s)
+        """
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.good_quality = good_quality
+        self.bad_quality = bad_quality
+        self.smoothing = smoothing
+
+        self.rate = max_rate
+        self.link_quality = None
+
+        self.received = 0
+        self.sent = 0
+        self.dropped = 0
+
+        self._clock = clock
+        self._interval = 0.0 if max_rate is None else 1.0 / max_rate
+        self._next = 0.0
+
+    def admit(self):
+        """
+        Count a new frame and decide whether to send it.
+        """
+        self.received += 1
+        if self._interval:
+            now = self._clock()
+            if now < self._next:
+                self.dropped += 1
+                return False
+            # Keep to the grid unless we fell behind
+            self._next = max(self._next + self._interval, now)
+        self.sent += 1
+        return True
+
+    def on_link_quality(self, quality):
+        """
+        Adapt rate to link quality. Connect to cflib's
+        link_quality_updated callback.
+
+        Parameters
+        ----------
+        quality : float
+            Link quality.
+            (Unit: %)
+        """
+        if self.link_quality is None:
+            self.link_quality = quality
+        else:
+            self.link_quality += self.smoothing * (quality - self.link_quality)
+
+        if self.max_rate is None or self.min_rate is None:
+            return
+        span = self.good_quality - self.bad_quality
+        share = min(1.0, max(0.0, (self.link_quality - self.bad_quality) / span))
+        self.rate = self.min_rate + share * (self.max_rate - self.min_rate)
+        self._interval = 1.0 / self.rate
+
+    def __str__(self):
+        rate = 'unlimited' if self.rate is None else f'{self.rate:.0f} Hz'
+        return (f'extpos {rate} | '
+                f'received: {self.received} sent: {self.sent} dropped: {self.dropped}')
+
+
+class Mailbox:
+    """
+    Single-slot, latest-wins outbox for packets to one drone,
+    drained by the RadioSender of the drone's radio.
+
+    Each kind of packet has one slot. Posting overwrites
+    whatever is waiting in the slot, so a drone never
+    receives a stale position or setpoint.
+    High-level commands, e.g. starting a trajectory, have a slot
+    of their own, so that setpoints cannot drop them. Posting one
+    drops any setpoint waiting before it, which it would override.
+
+    Asynchronous applications can await a packet with post_async(),
+    which resolves once the packet has been sent or superseded.
+    """
+
+    KINDS = ('extpos', 'high_level', 'commander')
+    """Packet kinds in the order they are sent."""
+
+    SUPERSEDES = {'high_level': ('commander',)}
+    """Kinds of waiting packets dropped by posting a packet of a kind."""
+
+    def __init__(self, sender):
+        """
+        Construct Mailbox object
+
+        Parameters
+        ----------
+        sender : RadioSender
+            Sender draining this mailbox.
+        """
+        self._sender = sender
+        self._slots = {}
+
+    def post(self, kind, func, *args, done=None):
+        """
+        Queue a packet without blocking, replacing any
+        waiting packet of the same kind.
+
+        Parameters
+        ----------
+        kind : str
+            One of Mailbox.KINDS.
+        func : function(*args)
+            Function sending the packet, e.g. cf.extpos.send_extpos.
+        *args
+            Arguments to func.
+        done : function(bool) (optional)
+            Called from the sender thread with True once the packet
+            has been sent, or with False if sending failed.
+            Called with False right away if the packet is superseded.
+        """
+        # Popping is atomic, so either the sender or this call
+        # owns a replaced packet, never both
+        replaced = [self._slots.pop(k, None) for k in (kind,) + self.SUPERSEDES.get(kind, ())]
+        self._slots[kind] = (func, args, done)
+        self._sender._wakeup.set()
+        for packet in replaced:
+            if packet is not None and packet[2] is not None:
+                packet[2](False)
+
+    async def post_async(self, kind, func, *args):
+        """
+        Queue a packet like post() and wait until it has left.
+        Returns True if the packet was sent, or False if it failed
+        or was superseded by a newer packet of the same kind.
+
+        Parameters
+        ----------
+        kind : str
+            One of Mailbox.KINDS.
+        func : function(*args)
+            Function sending the packet, e.g. cf.extpos.send_extpos.
+        *args
+            Arguments to func.
+        """
+        loop = asyncio.get_running_loop()
+        sent = loop.create_future()
+
+        def resolve(ok):
+            if not sent.done():
+                sent.set_result(ok)
+
+        def done(ok):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(resolve, ok)
+
+        self.post(kind, func, *args, done=done)
+        return await sent
+
+    def close(self, timeout=0.5):
+        """
+        Wait for waiting packets to be sent and detach from sender.
+
+        Parameters
+        ----------
+        timeout : float (optional)
+            Max time to wait for waiting packets.
+            (Unit: s)
+        """
+        deadline = time.perf_counter() + timeout
+        while self._slots and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        self._sender.remove(self)
+        # Resolve packets that were never sent
+        for kind in Mailbox.KINDS:
+            packet = self._slots.pop(kind, None)
+            if packet is not None and packet[2] is not None:
+                packet[2](False)
+        self._sender.release()
+
+
+class RadioSender(Thread):
+    """
+    Thread that owns all outgoing packets on one radio dongle.
+
+    Drones on the same radio each get a Mailbox. Mocap and control
+    threads only post to mailboxes, which is non-blocking and O(1),
+    while this thread does the actual radio I/O.
+
+    RadioSender objects are not meant to be constructed directly.
+    Use RadioSender.mailbox() to get a Mailbox for a drone.
+    """
+
+    _senders = {}
+    _senders_lock = Lock()
+
+    @classmethod
+    def mailbox(cls, uri):
+        """
+        Get a new Mailbox for a drone, starting the sender
+        for its radio if necessary. Close the mailbox when done.
+
+        Parameters
+        ----------
+        uri : str
+            Crazyflie radio address.
+        """
+        radio = radio_of(uri)
+        with cls._senders_lock:
+            sender = cls._senders.get(radio)
+            if sender is None:
+                sender = cls(radio)
+                cls._senders[radio] = sender
+                sender.start()
+            sender._refs += 1
+        mailbox = Mailbox(sender)
+        sender.add(mailbox)
+        return mailbox
+
+    def __init__(self, radio):
+        """
+        Construct RadioSender object
+
+        Parameters
+        ----------
+        radio : str
+            Radio identifier, see radio_of().
+        """
+
+        Thread.__init__(self, daemon=True)
+
+        self.radio = radio
+
+        self._refs = 0
+        self._mailboxes = ()
+        self._lock = Lock()
+        self._wakeup = Event()
+        self._stay_open = True
+
+    def add(self, mailbox):
+        """
+        Start draining mailbox.
+
+        Parameters
+        ----------
+        mailbox : Mailbox
+            Mailbox of a drone on this radio.
+        """
+        with self._lock:
+            self._mailboxes = self._mailboxes + (mailbox,)
+
+    def remove(self, mailbox):
+        """
+        Stop draining mailbox.
+
+        Parameters
+        ----------
+        mailbox : Mailbox
+            Mailbox to remove.
+        """
+        with self._lock:
+            self._mailboxes = tuple(m for m in self._mailboxes if m is not mailbox)
+
+    def release(self):
+        """
+        Give up one reference to the sender.
+        The sender stops when its last user releases it.
+        """
+        with RadioSender._senders_lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return
+            del RadioSender._senders[self.radio]
+        self._stay_open = False
+        self._wakeup.set()
+        self.join()
+
+    def run(self):
+        """
+        Send waiting packets whenever something is posted.
+        """
+        while self._stay_open:
+            self._wakeup.wait(0.1)
+            self._wakeup.clear()
+            for mailbox in self._mailboxes:
+                slots = mailbox._slots
+                for kind in Mailbox.KINDS:
+                    packet = slots.pop(kind, None)
+                    if packet is None:
+                        continue
+                    func, args, done = packet
+                    try:
+                        func(*args)
+                    except Exception:
+                        print(f'[{self.radio}] Failed to send {kind} packet! Moving on...')
+                        traceback.print_exc()
+                        if done is not None:
+                            done(False)
+                        continue
+                    if done is not None:
+                        done(True)
@@ -0,0 +1,334 @@
+from itertools import count
+import json
+import math
+import os
+import struct
+from threading import Event, Lock, Thread
+import time
+
+import numpy as np
+
+
+# Record kinds
+POSE = 0
+SETPOINT = 1
+
+COLUMNS = (('t', '<f8'),
+           ('frame', '<u4'),
+           ('kind', 'u1'),
+           ('body', '<u2'),
+           ('x', '<f8'),
+           ('y', '<f8'),
+           ('z', '<f8'),
+           ('yaw', '<f8'),
+           ('tracking_loss', '<u4'))
+"""
+Columns of a recording: time in s, QTM frame number, record kind
+(POSE or SETPOINT), body ID, position in m, yaw in degrees
+(NaN if unknown) and tracking loss counter.
+"""
+
+# Layout of one ring buffer slot: sequence number followed by columns
+_SLOT_DTYPE = np.dtype([('seq', '<u8')] + list(COLUMNS))
+_SLOT = struct.Struct('<QdIBHddddI')
+# Sequence number of slots never filled
+_EMPTY = np.iinfo(np.uint64).max
+
+_NAN = math.nan
+
+
+class FlightRecorder:
+    """
+    Low-overhead recorder of poses, setpoints and tracking loss.
+
+    Recording a sample reserves the next slot of a preallocated
+    ring buffer and packs one fixed-size binary record into it.
+    That takes no lock and allocates nothing, so it costs a few
+    hundred nanoseconds on the calling thread. A writer thread
+    periodically scatters new records into one memory-mapped file
+    per column. The recording grows as needed and can be loaded
+    with FlightRecorder.load(), also while flying.
+
+    Records are numbered as they are reserved, so the writer only
+    copies slots that have been filled. If the writer falls more than
+    a whole ring behind, the oldest records are overwritten and counted
+    as dropped.
+
+    Typical usage::
+
+        with FlightRecorder('flight') as recorder:
+            with QualisysCrazyflie(..., recorder=recorder) as qcf:
+                ...
+        columns, bodies = FlightRecorder.load('flight')
+
+    Attributes
+    ----------
+    path : str
+        Directory holding the recording.
+    count : int
+        Number of records written to disk.
+    dropped : int
+        Number of records overwritten before being written to disk.
+    bodies : [str]
+        Body names by body ID.
+    """
+
+    def __init__(self, path, ring_size=65536, capacity=65536, interval=0.1,
+                 clock=time.perf_counter):
+        """
+        Construct FlightRecorder object
+
+        Parameters
+        ----------
+        path : str
+            Directory to hold the recording.
+            Files of an earlier recording in it are overwritten.
+        ring_size : int (optional)
+            Records held in memory. Rounded up to a power of two.
+        capacity : int (optional)
+            Records to preallocate on disk. Doubles when full.
+        interval : float (optional)
+            Time between writes to disk.
+            (Unit: s)
+        clock : function() (optional)
+            Monotonic clock.
+            (Unit: s)
+        """
+        self.path = path
+        self.interval = interval
+        self.count = 0
+        self.dropped = 0
+        self.bodies = []
+
+        ring_size = 1 << max(0, int(ring_size) - 1).bit_length()
+        self._clock = clock
+        self._pack = _SLOT.pack_into
+        self._slot_size = _SLOT.size
+        self._mask = ring_size - 1
+        self._ring = bytearray(ring_size * _SLOT.size)
+        # No slot is filled yet
+        np.frombuffer(self._ring, dtype=_SLOT_DTYPE)['seq'] = _EMPTY
+        self._sequence = count()
+        self._next = 0
+
+        self._lock = Lock()
+        self._wakeup = Event()
+        self._stay_open = True
+
+        os.makedirs(path, exist_ok=True)
+        self._start = (time.time(), clock())
+        self._capacity = 0
+        self._columns = {}
+        self._grow(capacity)
+        self._save_meta()
+
+        self._writer = Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+    def __enter__(self):
+        """
+        Enter FlightRecorder context
+        """
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, tb=None):
+        """
+        Exit FlightRecorder context
+        """
+        self.close()
+
+    def body_id(self, body):
+        """
+        Get ID of body name, assigning a new one if necessary.
+
+        Parameters
+        ----------
+        body : str
+            Name of rigid body.
+        """
+        with self._lock:
+            if body not in self.bodies:
+                self.bodies.append(body)
+            return self.bodies.index(body)
+
+    def record(self, kind, body, x, y, z, yaw=_NAN, frame=0, tracking_loss=0):
+        """
+        Record one sample. Safe to call from any thread.
+
+        Parameters
+        ----------
+        kind : int
+            POSE or SETPOINT.
+        body : int
+            Body ID, see body_id().
+        x : float
+            x coordinate.
+            (Unit: m)
+        y : float
+            y coordinate.
+            (Unit: m)
+        z : float
+            z coordinate.
+            (Unit: m)
+        yaw : float (optional)
+            Yaw angle.
+            (Unit: degrees)
+        frame : int (optional)
+            QTM frame number.
+        tracking_loss : int (optional)
+            Number of frames without tracking.
+        """
+        # Reserving a sequence number is atomic, and so is packing
+        seq = next(self._sequence)
+        self._pack(self._ring, (seq & self._mask) * self._slot_size, seq,
+                   self._clock(), frame, kind, body, x, y, z, yaw, tracking_loss)
+
+    def flush(self):
+        """
+        Write all recorded samples to disk.
+        """
+        with self._lock:
+            self._drain()
+
+    def close(self):
+        """
+        Write all recorded samples to disk and stop the writer.
+        """
+        self._stay_open = False
+        self._wakeup.set()
+        self._writer.join()
+        self.flush()
+        for column in self._columns.values():
+            column.flush()
+
+    @staticmethod
+    def load(path):
+        """
+        Load a recording as memory-mapped arrays.
+        Returns dict of arrays by column name, and list of body names.
+
+        Parameters
+        ----------
+        path : str
+            Directory holding the recording.
+        """
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        count = meta['count']
+        columns = {}
+        for name, dtype in meta['columns']:
+            if count == 0:
+                columns[name] = np.zeros(0, dtype=dtype)
+            else:
+                columns[name] = np.memmap(os.path.join(path, f'{name}.bin'),
+                                          dtype=dtype, mode='r', shape=(count,))
+        return columns, meta['bodies']
+
+    def _run(self):
+        """
+        Write new records to disk at regular intervals.
+        """
+        while self._stay_open:
+            self._wakeup.wait(self.interval)
+            with self._lock:
+                self._drain()
+
+    def _drain(self):
+        """
+        Copy filled slots, in order, from ring buffer to column files.
+        Call with lock held.
+        """
+        ring = np.frombuffer(self._ring, dtype=_SLOT_DTYPE)
+        start = self._next & self._mask
+        seq = ring['seq'][start]
+        if seq != self._next:
+            if seq == _EMPTY or seq < self._next:
+                # Nothing new yet
+                return
+            # Writer was lapped, skip to the oldest record still in the ring
+            oldest = int(ring['seq'][ring['seq'] != _EMPTY].max()) - self._mask
+            self.dropped += oldest - self._next
+            self._next = oldest
+            start = self._next & self._mask
+        # Oldest slots run to the end of the ring, then wrap around
+        for records in (ring[start:], ring[:start]):
+            expected = np.arange(self._next, self._next + len(records), dtype=np.uint64)
+            size = self._filled(records, expected)
+            # Snapshot before writing columns one by one, as recording goes on
+            # meanwhile, and keep what was not overwritten in between
+            records = records[:size].copy()
+            filled = self._filled(records, expected[:size])
+            self._write(records[:filled])
+            if filled < len(expected):
+                break
+        self._save_meta()
+
+    @staticmethod
+    def _filled(records, expected):
+        """
+        Number of leading slots holding the expected sequence numbers.
+
+        Parameters
+        ----------
+        records : numpy.ndarray
+            Ring buffer slots.
+        expected : numpy.ndarray
+            Sequence numbers expected in slots.
+        """
+        filled = records['seq'] == expected
+        return len(filled) if filled.all() else int(np.argmin(filled))
+
+    def _write(self, records):
+        """
+        Append records to column files.
+
+        Parameters
+        ----------
+        records : numpy.ndarray
+            Ring buffer slots in order.
+        """
+        size = len(records)
+        if self.count + size > self._capacity:
+            self._grow(max(2 * self._capacity, self.count + size))
+        for name, column in self._columns.items():
+            column[self.count:self.count + size] = records[name]
+        self.count += size
+        self._next += size
+
+    def _grow(self, capacity):
+        """
+        Resize column files and map them into memory.
+
+        Parameters
+        ----------
+        capacity : int
+            Records to make room for.
+        """
+        for name, dtype in COLUMNS:
+            column_path = os.path.join(self.path, f'{name}.bin')
+            column = self._columns.pop(name, None)
+            if column is not None:
+                column.flush()
+                del column
+            mode = 'r+' if self._capacity else 'w+'
+            with open(column_path, mode + 'b') as f:
+                f.truncate(capacity * np.dtype(dtype).itemsize)
+            self._columns[name] = np.memmap(column_path, dtype=dtype,
+                                            mode='r+', shape=(capacity,))
+        self._capacity = capacity
+
+    def _save_meta(self):
+        """
+        Describe recording in a JSON file next to the column files.
+        """
+        meta = {'columns': COLUMNS,
+                'count': self.count,
+                'bodies': list(self.bodies),
+                'kinds': {'POSE': POSE, 'SETPOINT': SETPOINT},
+                'start_time': self._start[0],
+                'start_clock': self._start[1]}
+        # Replace in one step, so readers never see a partly written file
+        path = os.path.join(self.path, 'meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
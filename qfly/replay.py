@@ -0,0 +1,205 @@
+import asyncio
+from threading import Event, Thread
+import time
+
+import numpy as np
+
+from qfly.qtm import FRAME_DTYPE, PoseSource
+from qfly.recorder import FlightRecorder, POSE
+
+
+class ReplaySource(PoseSource):
+    """
+    Source of recorded poses to use instead of a live QTM stream.
+
+    Pass a ReplaySource as qtm_ip to QualisysCrazyflie, QualisysDeck,
+    QualisysTraqr or QtmWrapper to run them without QTM, e.g. to
+    regression test or profile a control pipeline offline.
+    Frames are played back at real time, at a multiple of real time,
+    or as fast as possible, starting when the first subscriber opens
+    the source.
+
+    Typical usage::
+
+        replay = ReplaySource.from_recording('flight', speed=10)
+        with QualisysTraqr('Traqr', qtm_ip=replay) as traqr:
+            replay.finished.wait()
+
+    For lockstep tests, construct with autoplay=False
+    and advance one frame at a time with step().
+
+    Attributes
+    ----------
+    speed : float
+        Playback speed relative to real time,
+        or 0 for as fast as possible.
+    finished : threading.Event
+        Set when the last frame has been passed on.
+    index : int
+        Index of next frame to pass on.
+    """
+
+    def __init__(self, frames, bodies, times=None, rate=100.0, speed=1.0,
+                 autoplay=True, clock=time.perf_counter):
+        """
+        Construct ReplaySource object
+
+        Parameters
+        ----------
+        frames : numpy.ndarray
+            FRAME_DTYPE records, one row per frame, one column per body.
+        bodies : [str]
+            Names of bodies by column.
+        times : [float] (optional)
+            Time of each frame since start of recording.
+            Evenly spaced at rate by default.
+            (Unit: s)
+        rate : float (optional)
+            Frame rate, if times are not given.
+            (Unit: Hz)
+        speed : float (optional)
+            Playback speed relative to real time,
+            or 0 for as fast as possible.
+        autoplay : bool (optional)
+            Start playback when the first subscriber opens the source.
+        clock : function() (optional)
+            Monotonic clock.
+            (Unit: s)
+        """
+        PoseSource.__init__(self)
+
+        self.frames = np.asarray(frames, dtype=FRAME_DTYPE).reshape(len(frames), -1)
+        self.bodies = list(bodies)
+        if times is None:
+            times = np.arange(len(self.frames)) / rate
+        self.times = np.asarray(times, dtype=np.float64)
+        self.speed = speed
+        self.autoplay = autoplay
+        self.index = 0
+        self.finished = Event()
+
+        self._clock = clock
+        self._stay_open = True
+        self._thread = None
+        self._task = None
+
+    @classmethod
+    def from_recording(cls, path, **kwargs):
+        """
+        Construct ReplaySource from poses saved by a FlightRecorder.
+        Orientation is reconstructed from yaw, or left level if unknown.
+
+        Parameters
+        ----------
+        path : str
+            Directory holding the recording.
+        **kwargs
+            Arguments to ReplaySource, e.g. speed.
+        """
+        columns, bodies = FlightRecorder.load(path)
+        poses = np.asarray(columns['kind']) == POSE
+        t = np.asarray(columns['t'])[poses]
+        body = np.asarray(columns['body'])[poses]
+        position = np.stack([np.asarray(columns[axis])[poses] for axis in 'xyz'], axis=1)
+        yaw = np.radians(np.nan_to_num(np.asarray(columns['yaw'])[poses]))
+
+        # One row per QTM frame number, in recording order
+        numbers, first, row = np.unique(np.asarray(columns['frame'])[poses],
+                                        return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        row = rank[row]
+
+        frames = np.zeros((len(numbers), len(bodies)), dtype=FRAME_DTYPE)
+        frames['position'] = np.nan
+        frames['rotation'] = np.eye(3)
+        frames['frame'] = numbers[order, None]
+        frames['position'][row, body] = position
+        rotation = np.zeros((len(yaw), 3, 3))
+        rotation[:, 0, 0] = rotation[:, 1, 1] = np.cos(yaw)
+        rotation[:, 1, 0] = np.sin(yaw)
+        rotation[:, 0, 1] = -rotation[:, 1, 0]
+        rotation[:, 2, 2] = 1
+        frames['rotation'][row, body] = rotation
+        frames['valid'] = np.isfinite(frames['position']).all(axis=2)
+
+        times = t[first[order]] - t[first[order[0]]] if len(order) else None
+        return cls(frames, bodies, times=times, **kwargs)
+
+    def step(self):
+        """
+        Pass on next frame to subscribers.
+        Returns False if there are no frames left.
+        """
+        if self.index >= len(self.frames):
+            self.finished.set()
+            return False
+        # Recorded time stands in for the QTM timestamp
+        self.timestamp = int(self.times[self.index] * 1e6)
+        self._dispatch_frame(self.frames[self.index])
+        self.index += 1
+        if self.index == len(self.frames):
+            self.finished.set()
+        return True
+
+    def rewind(self):
+        """
+        Start over from first frame.
+        """
+        self.index = 0
+        self.finished.clear()
+
+    def _start_source(self, loop):
+        """
+        Register bodies and start playback.
+
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop
+            Event loop to play back on, or None for a thread of its own.
+        """
+        self._set_body_index({body: index for index, body in enumerate(self.bodies)})
+        if not self.autoplay:
+            return
+        self._stay_open = True
+        if loop is None:
+            self._thread = Thread(target=asyncio.run, args=(self._play(),), daemon=True)
+            self._thread.start()
+        else:
+            self._task = asyncio.run_coroutine_threadsafe(self._play(), loop)
+
+    def _stop_source(self):
+        """
+        Stop playback.
+        """
+        self._stay_open = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    async def wait_closed(self):
+        """
+        Wait for playback on an event loop to stop.
+        """
+        if self._task is not None:
+            await asyncio.wrap_future(self._task)
+
+    async def _play(self):
+        """
+        Playback coroutine, keeping frames on schedule
+        using absolute deadlines.
+        """
+        start = self._clock() - (self.times[self.index] / self.speed
+                                 if self.speed and self.index < len(self.times) else 0)
+        while self._stay_open:
+            if self.speed and self.index < len(self.times):
+                delay = start + self.times[self.index] / self.speed - self._clock()
+                await asyncio.sleep(max(0.0, delay))
+            else:
+                await asyncio.sleep(0)
+            if not self._stay_open or not self.step() or self.finished.is_set():
+                break
+
+    def __str__(self):
+        return f'replay of {len(self.frames)} frames'
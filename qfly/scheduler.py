@@ -0,0 +1,182 @@
+import time
+
+
+class Scheduler:
+    """
+    Run control callbacks at a fixed rate using absolute deadlines.
+
+    Every tick, each callback is run once in its own slot.
+    With spreading enabled, slots are evenly spaced across the period,
+    so that N drones get their setpoints at N evenly spaced instants
+    instead of in one burst. Deadlines are computed from the start time,
+    not from the previous wakeup, so loop work and OS jitter do not
+    accumulate into drift. If the loop falls behind by more than a period,
+    late ticks are skipped and counted as missed instead of being run
+    back to back.
+
+    Typical usage::
+
+        scheduler = Scheduler(rate=50)
+        for qcf in qcfs:
+            scheduler.add(fly, qcf)
+        scheduler.run(until=lambda t: not all(qcf.is_safe() for qcf in qcfs))
+
+    Attributes
+    ----------
+    rate : float
+        Target tick rate. (Unit: Hz)
+    period : float
+        Time between ticks. (Unit: s)
+    ticks : int
+        Number of ticks run.
+    missed : int
+        Number of slots that started a period or more late, or were skipped.
+    max_drift : float
+        Worst lateness of a slot relative to its deadline. (Unit: s)
+    """
+
+    def __init__(self, rate=50, spread=True, clock=time.perf_counter, sleep=time.sleep):
+        """
+        Construct Scheduler object
+
+        Parameters
+        ----------
+        rate : float (optional)
+            Target tick rate.
+            (Unit: Hz)
+        spread : bool (optional)
+            Spread callbacks evenly across the period.
+        clock : function() (optional)
+            Monotonic clock.
+            (Unit: s)
+        sleep : function(float) (optional)
+            Function to wait for the given time.
+            (Unit: s)
+        """
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.spread = spread
+
+        self._clock = clock
+        self._sleep = sleep
+        self._slots = []
+        self._running = False
+
+        self.ticks = 0
+        self.missed = 0
+        self.max_drift = 0.0
+        self._total_drift = 0.0
+        self._slot_runs = 0
+
+    def add(self, callback, *args):
+        """
+        Add callback to run once per tick.
+
+        Parameters
+        ----------
+        callback : function(*args, float)
+            Function receiving args followed by time since start of run.
+            (Unit: s)
+            Return False to stop the scheduler.
+        *args
+            Arguments to pass to callback, e.g. a QualisysCrazyflie.
+        """
+        self._slots.append((callback, args))
+
+    def run(self, until=None, duration=None):
+        """
+        Run callbacks at fixed rate until stopped.
+
+        Parameters
+        ----------
+        until : function(float) (optional)
+            Checked with time since start once per tick.
+            Return True to stop.
+        duration : float (optional)
+            Stop after this much time.
+            (Unit: s)
+        """
+        clock = self._clock
+        period = self.period
+        slots = list(self._slots)
+        offset = period / len(slots) if self.spread and slots else 0.0
+
+        start = clock()
+        tick = 0
+        self._running = True
+
+        while self._running:
+            t_tick = start + tick * period
+            t = t_tick - start
+            if duration is not None and t >= duration:
+                break
+            if until is not None and until(clock() - start):
+                break
+
+            for index, (callback, args) in enumerate(slots):
+                deadline = t_tick + index * offset
+                now = clock()
+                if now < deadline:
+                    self._sleep(deadline - now)
+                    now = clock()
+                self._record(now - deadline)
+                if callback(*args, now - start) is False:
+                    self._running = False
+                    break
+
+            if not slots:
+                # Nothing to run, so only wait for the next tick
+                now = clock()
+                if now < t_tick + period:
+                    self._sleep(t_tick + period - now)
+
+            self.ticks += 1
+            tick += 1
+
+            # Skip ticks that are already a full period overdue
+            behind = clock() - (start + tick * period)
+            if behind > period:
+                skipped = int(behind / period)
+                tick += skipped
+                self.missed += skipped * len(slots)
+
+        self._running = False
+
+    def stop(self):
+        """
+        Stop the scheduler after the current slot.
+        """
+        self._running = False
+
+    def _record(self, drift):
+        """
+        Keep statistics on lateness of a slot.
+
+        Parameters
+        ----------
+        drift : float
+            Lateness relative to deadline.
+            (Unit: s)
+        """
+        self._slot_runs += 1
+        self._total_drift += drift
+        if drift > self.max_drift:
+            self.max_drift = drift
+        if drift >= self.period:
+            self.missed += 1
+
+    @property
+    def mean_drift(self):
+        """
+        Average lateness of slots relative to their deadlines.
+        (Unit: s)
+        """
+        if self._slot_runs == 0:
+            return 0.0
+        return self._total_drift / self._slot_runs
+
+    def __str__(self):
+        return (f'{self.ticks} ticks at {self.rate} Hz | '
+                f'missed: {self.missed} | '
+                f'drift mean: {self.mean_drift * 1000:.3f} ms '
+                f'max: {self.max_drift * 1000:.3f} ms')
@@ -0,0 +1,759 @@
+import asyncio
+import math
+import struct
+from threading import Thread
+import time
+
+from cflib.crazyflie.mem import MemoryElement
+from cflib.crazyflie.param import ParamTocElement, WRITE_CHANNEL
+from cflib.crazyflie.toc import Toc
+from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
+from cflib.utils.callbacks import Caller
+import numpy as np
+
+from qfly.qtm import FRAME_DTYPE, PoseSource
+from qfly.trajectory import PIECE_COEFFICIENTS, PIECE_SIZE, Trajectory
+
+
+# Parameters known to simulated drones, with their types
+PARAMS = {'activeMarker.front': '<B',
+          'activeMarker.right': '<B',
+          'activeMarker.back': '<B',
+          'activeMarker.left': '<B',
+          'ring.effect': '<B',
+          'posCtlPid.xyVelMax': '<f',
+          'posCtlPid.zVelMax': '<f',
+          'stabilizer.estimator': '<B',
+          'locSrv.extQuatStdDev': '<f',
+          'kalman.resetEstimation': '<B',
+          'commander.enHighLevel': '<B'}
+
+# Log variables known to simulated drones
+LOG_VARIABLES = ('kalman.varPX', 'kalman.varPY', 'kalman.varPZ',
+                 'stateEstimate.x', 'stateEstimate.y', 'stateEstimate.z',
+                 'stateEstimate.vx', 'stateEstimate.vy', 'stateEstimate.vz',
+                 'stateEstimate.yaw')
+
+GRAVITY = 9.81
+
+# Size of trajectory memory of simulated drones
+TRAJECTORY_MEMORY_SIZE = 4096
+
+
+class SimSwarm(PoseSource):
+    """
+    Headless simulation of a swarm of Crazyflie drones
+    and the motion capture system tracking them.
+
+    All drones are stepped together, as point masses flying towards
+    their position setpoints within their speed limits, with one
+    vectorized update per frame. Each step is also passed on as a
+    mocap frame, so a SimSwarm is the pose source of its own drones.
+
+    Each drone is driven through a SimCrazyflie, a stand-in for cflib's
+    Crazyflie object. Pass both to QualisysCrazyflie to fly the full
+    qfly control stack without radios or QTM, e.g. to load test a
+    swarm of hundreds of drones on one machine::
+
+        swarm = SimSwarm([f'cf{i}' for i in range(100)])
+        qcfs = [QualisysCrazyflie(body, f'sim://0/{i}', world,
+                                  qtm_ip=swarm,
+                                  crazyflie=swarm.crazyflie(body))
+                for i, body in enumerate(swarm.bodies)]
+        with ParallelContexts(*qcfs):
+            ...
+
+    Drones can also fly trajectories uploaded to their
+    high-level commander, which take the place of setpoints.
+
+    Drones with the same first URI segment, e.g. "sim://0",
+    share a radio sender thread like drones on one dongle.
+
+    The simulation runs in real time from when the first drone connects
+    or the first subscriber opens the source. For lockstep tests,
+    construct with autoplay=False and advance with step().
+
+    Attributes
+    ----------
+    bodies : [str]
+        Names of rigid bodies, one per drone.
+    position : numpy.ndarray
+        True position of each drone.
+        (Unit: m)
+    velocity : numpy.ndarray
+        True velocity of each drone.
+        (Unit: m/s)
+    flying : numpy.ndarray
+        Whether each drone's motors are running.
+    extpos_count : numpy.ndarray
+        Number of external position packets received by each drone.
+    setpoint_count : numpy.ndarray
+        Number of setpoints received by each drone.
+    time : float
+        Simulated time since start.
+        (Unit: s)
+    ticks : int
+        Number of steps taken.
+    late : int
+        Number of real time steps started more than one period late,
+        i.e. where the simulation could not keep up.
+    """
+
+    # Time constant of Kalman variance settling with external positions
+    kalman_settle = 0.3
+    # Kalman position variance after reset
+    kalman_initial = 1.0
+    # Setpoint age after which the motors are cut, as by the firmware
+    watchdog = 2.0
+    # Time constant of velocity tracking
+    response = 0.2
+
+    def __init__(self, bodies, home=None, rate=100.0, noise=0.0005, dropout=0.0,
+                 speed_limit=1.0, autoplay=True, seed=None, clock=time.perf_counter):
+        """
+        Construct SimSwarm object
+
+        Parameters
+        ----------
+        bodies : [str]
+            Names of rigid bodies, one per drone.
+        home : numpy.ndarray (optional)
+            Starting position of each drone.
+            Drones start in a grid on the floor, 0.5 m apart, by default.
+            (Unit: m)
+        rate : float (optional)
+            Simulation and mocap frame rate.
+            (Unit: Hz)
+        noise : float (optional)
+            Standard deviation of mocap position noise.
+            (Unit: m)
+        dropout : float (optional)
+            Probability of a body not being tracked in a frame.
+        speed_limit : float (optional)
+            Speed limit until set by parameter.
+            (Unit: m/s)
+        autoplay : bool (optional)
+            Run in real time while the source is open.
+        seed : int (optional)
+            Seed for noise and dropouts, for repeatable runs.
+        clock : function() (optional)
+            Monotonic clock.
+            (Unit: s)
+        """
+        PoseSource.__init__(self)
+
+        self.bodies = list(bodies)
+        n = len(self.bodies)
+        if home is None:
+            side = max(1, math.ceil(math.sqrt(n)))
+            home = np.zeros((n, 3))
+            home[:, 0] = (np.arange(n) % side) * 0.5
+            home[:, 1] = (np.arange(n) // side) * 0.5
+        self.rate = rate
+        self.noise = noise
+        self.dropout = dropout
+        self.autoplay = autoplay
+
+        self.position = np.array(home, dtype=np.float64).reshape(n, 3)
+        self.velocity = np.zeros((n, 3))
+        self.yaw = np.zeros(n)
+        self.flying = np.zeros(n, dtype=bool)
+        self.extpos_count = np.zeros(n, dtype=np.int64)
+        self.setpoint_count = np.zeros(n, dtype=np.int64)
+        self.time = 0.0
+        self.ticks = 0
+        self.late = 0
+
+        self._target = self.position.copy()
+        self._target_yaw = np.zeros(n)
+        self._setpoint_time = np.full(n, -np.inf)
+        # Trajectory flown by drone index, with start time, time scale and offset
+        self._trajectories = {}
+        self._extpos_time = np.full(n, -np.inf)
+        self._speed_limit = np.full((n, 2), float(speed_limit))
+        self._variance = np.full((n, 3), self.kalman_initial)
+
+        self._rng = np.random.default_rng(seed)
+        self._clock = clock
+        self._crazyflies = {}
+        self._logging = ()
+        self._stay_open = True
+        self._thread = None
+        self._task = None
+
+    def crazyflie(self, body):
+        """
+        Get stand-in Crazyflie object of drone.
+
+        Parameters
+        ----------
+        body : str or int
+            Name of drone's rigid body, or its index.
+        """
+        index = body if isinstance(body, int) else self.bodies.index(body)
+        if index not in self._crazyflies:
+            self._crazyflies[index] = SimCrazyflie(self, index)
+        return self._crazyflies[index]
+
+    def step(self, dt=None):
+        """
+        Advance simulation by one step, pass on mocap frame
+        to subscribers and log data to drones' log configs.
+
+        Parameters
+        ----------
+        dt : float (optional)
+            Time step. One frame period by default.
+            (Unit: s)
+        """
+        if dt is None:
+            dt = 1.0 / self.rate
+        self.time += dt
+        self.ticks += 1
+
+        # The high-level commander feeds setpoints from trajectories
+        for index, (trajectory, start, time_scale, offset) in tuple(self._trajectories.items()):
+            target = trajectory.evaluate((self.time - start) / time_scale)
+            self._target[index] = target[:3] + offset
+            self._target_yaw[index] = target[3]
+            self._setpoint_time[index] = self.time
+            self.flying[index] = True
+
+        # Drones left without setpoints cut their motors
+        self.flying &= self.time - self._setpoint_time < self.watchdog
+
+        # Fly towards setpoints within speed limits
+        command = (self._target - self.position) / self.response
+        xy_speed = np.hypot(command[:, 0], command[:, 1])
+        command[:, :2] *= np.minimum(
+            1.0, self._speed_limit[:, :1] / np.maximum(xy_speed, 1e-9)[:, None])
+        command[:, 2] = np.clip(command[:, 2],
+                                -self._speed_limit[:, 1], self._speed_limit[:, 1])
+        gain = min(1.0, dt / self.response)
+        falling = self.velocity.copy()
+        falling[:, 2] -= GRAVITY * dt
+        self.velocity = np.where(self.flying[:, None],
+                                 self.velocity + (command - self.velocity) * gain,
+                                 falling)
+        self.position += self.velocity * dt
+        self.yaw = np.where(self.flying, self._target_yaw, self.yaw)
+
+        # Land on the floor
+        grounded = self.position[:, 2] <= 0
+        self.position[grounded, 2] = 0
+        self.velocity[grounded] = 0
+
+        # Position estimates settle while external positions keep coming,
+        # and drift apart without
+        tracked = self.time - self._extpos_time < 0.1
+        settle = math.exp(-dt / self.kalman_settle)
+        self._variance = np.where(tracked[:, None],
+                                  self._variance * settle,
+                                  np.minimum(self._variance + 0.01 * dt, 100.0))
+
+        # Simulated time stands in for the QTM timestamp
+        self.timestamp = int(self.time * 1e6)
+        self._dispatch_frame(self._make_frame())
+
+        for crazyflie in self._logging:
+            crazyflie._log_step()
+
+    def _make_frame(self):
+        """
+        Mocap frame of current positions, with noise and dropouts.
+        """
+        n = len(self.bodies)
+        frame = np.zeros(n, dtype=FRAME_DTYPE)
+        frame['position'] = self.position
+        if self.noise:
+            frame['position'] += self._rng.normal(0.0, self.noise, (n, 3))
+        cos, sin = np.cos(np.radians(self.yaw)), np.sin(np.radians(self.yaw))
+        rotation = frame['rotation']
+        rotation[:, 0, 0] = rotation[:, 1, 1] = cos
+        rotation[:, 1, 0] = sin
+        rotation[:, 0, 1] = -sin
+        rotation[:, 2, 2] = 1
+        frame['valid'] = True
+        if self.dropout:
+            lost = self._rng.random(n) < self.dropout
+            frame['valid'][lost] = False
+            frame['position'][lost] = np.nan
+        frame['frame'] = self.ticks
+        return frame
+
+    def _log_value(self, index, name):
+        """
+        Current value of a log variable of a drone.
+
+        Parameters
+        ----------
+        index : int
+            Index of drone.
+        name : str
+            Complete name of log variable, one of LOG_VARIABLES.
+        """
+        group, _, variable = name.partition('.')
+        if group == 'kalman':
+            return float(self._variance[index, 'XYZ'.index(variable[-1])])
+        if variable == 'yaw':
+            return float(self.yaw[index])
+        if variable.startswith('v'):
+            return float(self.velocity[index, 'xyz'.index(variable[-1])])
+        return float(self.position[index, 'xyz'.index(variable)])
+
+    def _set_param(self, index, name, value):
+        """
+        Apply parameter written to a drone.
+
+        Parameters
+        ----------
+        index : int
+            Index of drone.
+        name : str
+            Complete name of parameter, one of PARAMS.
+        value : int or float
+            New value.
+        """
+        if name == 'posCtlPid.xyVelMax':
+            self._speed_limit[index, 0] = value
+        elif name == 'posCtlPid.zVelMax':
+            self._speed_limit[index, 1] = value
+        elif name == 'kalman.resetEstimation' and value:
+            self._variance[index] = self.kalman_initial
+
+    def _set_logging(self, crazyflie, logging):
+        """
+        Add drone to or remove it from those delivering log data.
+
+        Parameters
+        ----------
+        crazyflie : SimCrazyflie
+            Drone.
+        logging : bool
+            Whether drone has log configs.
+        """
+        others = tuple(c for c in self._logging if c is not crazyflie)
+        self._logging = others + (crazyflie,) if logging else others
+
+    def _start_source(self, loop):
+        """
+        Register bodies and start simulation.
+
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop
+            Event loop to run on, or None for a thread of its own.
+        """
+        self._set_body_index({body: index for index, body in enumerate(self.bodies)})
+        if not self.autoplay:
+            return
+        self._stay_open = True
+        if loop is None:
+            self._thread = Thread(target=asyncio.run, args=(self._run(),), daemon=True)
+            self._thread.start()
+        else:
+            self._task = asyncio.run_coroutine_threadsafe(self._run(), loop)
+
+    def _stop_source(self):
+        """
+        Stop simulation.
+        """
+        self._stay_open = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    async def wait_closed(self):
+        """
+        Wait for simulation on an event loop to stop.
+        """
+        if self._task is not None:
+            await asyncio.wrap_future(self._task)
+
+    async def _run(self):
+        """
+        Simulation coroutine, keeping steps on schedule
+        using absolute deadlines.
+        """
+        period = 1.0 / self.rate
+        deadline = self._clock()
+        while self._stay_open:
+            self.step(period)
+            deadline += period
+            delay = deadline - self._clock()
+            if delay < -period:
+                # Fell behind, count it and pick up from now
+                self.late += 1
+                deadline = self._clock()
+            await asyncio.sleep(max(0.0, delay))
+
+    def __str__(self):
+        return f'simulation of {len(self.bodies)} drones'
+
+
+class SimCrazyflie:
+    """
+    Stand-in for cflib's Crazyflie object, driving one drone of a SimSwarm.
+
+    Supports what QualisysCrazyflie uses: connecting through
+    SyncCrazyflie, batched parameter writes, parameter access by name,
+    external position, position and stop setpoints, log configs
+    delivering data to callbacks, and trajectories uploaded to
+    trajectory memory and flown by the high-level commander.
+    Packets take effect immediately.
+
+    Attributes
+    ----------
+    swarm : SimSwarm
+        Simulation the drone belongs to.
+    index : int
+        Index of drone in swarm.
+    link_uri : str
+        Address the drone is connected at, or None.
+    """
+
+    def __init__(self, swarm, index):
+        """
+        Construct SimCrazyflie object
+
+        Parameters
+        ----------
+        swarm : SimSwarm
+            Simulation the drone belongs to.
+        index : int
+            Index of drone in swarm.
+        """
+        self.swarm = swarm
+        self.index = index
+        self.link_uri = None
+        # Log configs and param writes are handled here, not sent over a link
+        self.link = None
+
+        self.connected = Caller()
+        self.connection_failed = Caller()
+        self.disconnected = Caller()
+        self.fully_connected = Caller()
+        self.link_quality_updated = Caller()
+        self.link_statistics = self
+
+        self.commander = _SimCommander(self)
+        self.high_level_commander = _SimHighLevelCommander(self)
+        self.extpos = _SimExtpos(self)
+        self.param = _SimParam(self)
+        self.log = _SimLog(self)
+        self.mem = _SimMemory()
+        self.platform = self
+
+        self._port_callbacks = {}
+
+    def open_link(self, link_uri):
+        """
+        Connect to drone, starting the simulation if not running yet.
+
+        Parameters
+        ----------
+        link_uri : str
+            Address of drone.
+        """
+        self.link_uri = link_uri
+        self.swarm.open()
+        self.connected.call(link_uri)
+        self.fully_connected.call(link_uri)
+
+    def close_link(self):
+        """
+        Disconnect from drone.
+        """
+        if self.link_uri is None:
+            return
+        link_uri, self.link_uri = self.link_uri, None
+        self.log._clear()
+        self.swarm.release()
+        self.disconnected.call(link_uri)
+
+    def is_connected(self):
+        """
+        Whether link to drone is open.
+        """
+        return self.link_uri is not None
+
+    def get_protocol_version(self):
+        """
+        CRTP protocol version spoken by drone.
+        """
+        return 4
+
+    def add_port_callback(self, port, cb):
+        """
+        Call cb with every packet from drone on port.
+        """
+        self._port_callbacks[port] = self._port_callbacks.get(port, ()) + (cb,)
+
+    def remove_port_callback(self, port, cb):
+        """
+        Stop calling cb with packets from drone on port.
+        """
+        self._port_callbacks[port] = tuple(
+            c for c in self._port_callbacks.get(port, ()) if c is not cb)
+
+    def send_packet(self, pk, expected_reply=(), resend=False, timeout=0.2):
+        """
+        Send CRTP packet to drone. Parameter writes are applied
+        and acknowledged, other packets are ignored.
+        """
+        if pk.port != CRTPPort.PARAM or pk.channel != WRITE_CHANNEL:
+            return
+        data = bytes(pk.data)
+        ident, = struct.unpack_from('<H', data)
+        element = self.param.toc.get_element_by_id(ident)
+        if element is None:
+            return
+        value, = struct.unpack_from(element.pytype, data, 2)
+        self.swarm._set_param(self.index, f'{element.group}.{element.name}', value)
+        reply = CRTPPacket()
+        reply.set_header(CRTPPort.PARAM, WRITE_CHANNEL)
+        reply.data = data
+        for cb in self._port_callbacks.get(CRTPPort.PARAM, ()):
+            cb(reply)
+
+    def _log_step(self):
+        """
+        Deliver data to log configs that are due.
+        """
+        self.log._step()
+
+
+class _SimCommander:
+    """
+    Setpoints of a SimCrazyflie.
+    """
+
+    def __init__(self, cf):
+        self._cf = cf
+
+    def send_position_setpoint(self, x, y, z, yaw):
+        """
+        Fly towards absolute position with yaw in degrees.
+        """
+        swarm, index = self._cf.swarm, self._cf.index
+        swarm._trajectories.pop(index, None)
+        swarm._target[index] = (x, y, z)
+        swarm._target_yaw[index] = yaw
+        swarm._setpoint_time[index] = swarm.time
+        swarm.setpoint_count[index] += 1
+        swarm.flying[index] = True
+
+    def send_stop_setpoint(self):
+        """
+        Cut motors.
+        """
+        swarm, index = self._cf.swarm, self._cf.index
+        swarm._trajectories.pop(index, None)
+        swarm._setpoint_time[index] = swarm.time
+        swarm.setpoint_count[index] += 1
+        swarm.flying[index] = False
+
+    def send_notify_setpoint_stop(self, remain_valid_milliseconds=0):
+        """
+        Hand control to the high-level commander.
+        """
+        pass
+
+
+class _SimHighLevelCommander:
+    """
+    High-level commander of a SimCrazyflie, flying trajectories
+    defined in its trajectory memory.
+    """
+
+    def __init__(self, cf):
+        self._cf = cf
+        self._defined = {}
+
+    def define_trajectory(self, trajectory_id, offset, n_pieces, type=0):
+        """
+        Define trajectory of Poly4D pieces in trajectory memory.
+        """
+        data = np.frombuffer(self._cf.mem.trajectory_memory.data,
+                             dtype='<f4', count=n_pieces * PIECE_SIZE // 4, offset=offset)
+        data = data.reshape(n_pieces, -1).astype(np.float64)
+        coefficients = data[:, :4 * PIECE_COEFFICIENTS].reshape(n_pieces, 4, PIECE_COEFFICIENTS)
+        # Yaw is stored in radians
+        coefficients[:, 3] = np.degrees(coefficients[:, 3])
+        self._defined[trajectory_id] = Trajectory(data[:, -1], coefficients)
+
+    def start_trajectory(self, trajectory_id, time_scale=1.0, relative_position=False,
+                         relative_yaw=False, reversed=False, group_mask=0):
+        """
+        Start flying defined trajectory.
+        """
+        swarm, index = self._cf.swarm, self._cf.index
+        if not self._cf.param.values['commander.enHighLevel']:
+            return
+        trajectory = self._defined[trajectory_id]
+        offset = np.zeros(3)
+        if relative_position:
+            offset = swarm._target[index] - trajectory.evaluate(0.0)[:3]
+        swarm._trajectories[index] = (trajectory, swarm.time, time_scale, offset)
+
+    def stop(self, group_mask=0):
+        """
+        Cut motors.
+        """
+        self._cf.commander.send_stop_setpoint()
+
+
+class _SimExtpos:
+    """
+    External position input of a SimCrazyflie.
+    """
+
+    def __init__(self, cf):
+        self._cf = cf
+
+    def send_extpos(self, x, y, z):
+        """
+        Feed external position to estimator.
+        """
+        swarm, index = self._cf.swarm, self._cf.index
+        swarm._extpos_time[index] = swarm.time
+        swarm.extpos_count[index] += 1
+
+    def send_extpose(self, x, y, z, qx, qy, qz, qw):
+        """
+        Feed external pose to estimator.
+        """
+        self.send_extpos(x, y, z)
+
+
+class _SimParam:
+    """
+    Parameters of a SimCrazyflie.
+    """
+
+    def __init__(self, cf):
+        self._cf = cf
+        self.values = {}
+        self.toc = Toc()
+        for ident, (name, pytype) in enumerate(PARAMS.items()):
+            element = ParamTocElement(ident)
+            element.group, element.name = name.split('.')
+            element.pytype = pytype
+            element.access = ParamTocElement.RW_ACCESS
+            self.toc.add_element(element)
+            self.values[name] = 0
+
+    def set_value(self, complete_name, value):
+        """
+        Set parameter by complete name.
+        """
+        if complete_name not in PARAMS:
+            raise KeyError(f'{complete_name} not in param TOC')
+        value = float(value) if PARAMS[complete_name] == '<f' else int(value)
+        self._write(complete_name, value)
+
+    def get_value(self, complete_name):
+        """
+        Get parameter by complete name, as a string like cflib.
+        """
+        return str(self.values[complete_name])
+
+    def _write(self, name, value):
+        """
+        Store and apply parameter value.
+        """
+        self.values[name] = value
+        self._cf.swarm._set_param(self._cf.index, name, value)
+
+    def _param_updated(self, pk):
+        """
+        Store parameter value acknowledged by drone, like cflib.
+        """
+        data = bytes(pk.data)
+        element = self.toc.get_element_by_id(struct.unpack_from('<H', data)[0])
+        self.values[f'{element.group}.{element.name}'], = struct.unpack_from(
+            element.pytype, data, 2)
+
+
+class _SimMemory:
+    """
+    Memories of a SimCrazyflie, of which only trajectory memory.
+    """
+
+    def __init__(self):
+        self.trajectory_memory = _SimTrajectoryMemory()
+
+    def get_mems(self, type):
+        """
+        Get all memories of a type.
+        """
+        return (self.trajectory_memory,) if type == MemoryElement.TYPE_TRAJ else ()
+
+
+class _SimTrajectoryMemory:
+    """
+    Trajectory memory of a SimCrazyflie.
+    """
+
+    def __init__(self):
+        self.type = MemoryElement.TYPE_TRAJ
+        self.size = TRAJECTORY_MEMORY_SIZE
+        self.data = bytearray(TRAJECTORY_MEMORY_SIZE)
+        self.trajectory = []
+
+    def write_data_sync(self, start_addr=0x00):
+        """
+        Write trajectory pieces to memory.
+        """
+        data = b''.join(piece.pack() for piece in self.trajectory)
+        if start_addr + len(data) > self.size:
+            return False
+        self.data[start_addr:start_addr + len(data)] = data
+        return True
+
+
+class _SimLog:
+    """
+    Log configs of a SimCrazyflie, delivered from the simulation.
+    """
+
+    def __init__(self, cf):
+        self._cf = cf
+        self._configs = ()
+
+    def add_config(self, config):
+        """
+        Add log config, to be started and read through its data callbacks.
+        """
+        for variable in config.variables:
+            if variable.name not in LOG_VARIABLES:
+                raise KeyError(f'Variable {variable.name} not in TOC')
+        config.cf = self._cf
+        config.valid = True
+        config._next_time = self._cf.swarm.time
+        self._configs = self._configs + (config,)
+        self._cf.swarm._set_logging(self._cf, True)
+
+    def _step(self):
+        """
+        Deliver data to log configs that are due, dropping unread ones.
+        """
+        swarm, index = self._cf.swarm, self._cf.index
+        configs = tuple(c for c in self._configs if c.data_received_cb.callbacks)
+        if len(configs) < len(self._configs):
+            # Log readers are gone
+            self._configs = configs
+            swarm._set_logging(self._cf, bool(configs))
+        for config in configs:
+            if swarm.time + 1e-9 < config._next_time:
+                continue
+            config._next_time += config.period_in_ms / 1000.0
+            data = {v.name: swarm._log_value(index, v.name) for v in config.variables}
+            config.data_received_cb.call(int(swarm.time * 1000), data, config)
+
+    def _clear(self):
+        """
+        Drop all log configs.
+        """
+        self._configs = ()
+        self._cf.swarm._set_logging(self._cf, False)
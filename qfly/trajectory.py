@@ -0,0 +1,343 @@
+import math
+
+from cflib.crazyflie.mem import Poly4D
+import numpy as np
+
+from qfly.world import OUTSIDE_X, OUTSIDE_Y, OUTSIDE_Z, TOO_FAST_XY, TOO_FAST_Z
+
+
+# Bytes taken by one Poly4D piece in trajectory memory:
+# 8 coefficients for each of x, y, z and yaw, and duration, as float32
+PIECE_SIZE = 33 * 4
+
+# Coefficients per polynomial in a Poly4D piece, i.e. up to 7th degree
+PIECE_COEFFICIENTS = 8
+
+
+class Trajectory:
+    """
+    Piecewise polynomial flight path of one drone, for the drone to
+    fly on its own with the Crazyflie high-level commander.
+
+    Streaming setpoints costs a radio packet per drone per control tick.
+    A trajectory is uploaded once before flight and then started with
+    a single packet, so that only external positions keep streaming
+    while it is flown. Use it for choreographed swarm shows::
+
+        trajectory = Trajectory.from_keyframes(
+            [0, 2, 4], [(0, 0, 0.5), (1, 0, 1), (0, 0, 0.5)])
+        qcf.upload_trajectory(trajectory)
+        ...
+        start_together(qcfs)
+
+    Trajectories are checked against World bounds and speed limit
+    on upload, as they are not geofenced while flown.
+
+    Each piece holds a cubic polynomial in time since the start of
+    the piece for x, y, z and yaw. Yaw is in degrees, as elsewhere in
+    qfly, and converted to radians for the drone.
+
+    Attributes
+    ----------
+    durations : numpy.ndarray
+        Duration of each piece.
+        (Unit: s)
+    coefficients : numpy.ndarray
+        Polynomial coefficients of each piece, of shape (pieces, 4, 4),
+        for x, y, z and yaw, constant term first.
+        (Unit: m, degrees)
+    """
+
+    def __init__(self, durations, coefficients):
+        """
+        Construct Trajectory object
+
+        Parameters
+        ----------
+        durations : array_like
+            Duration of each piece.
+            (Unit: s)
+        coefficients : array_like
+            Polynomial coefficients of each piece, of shape (pieces, 4, degree + 1),
+            for x, y, z and yaw, constant term first. At most 7th degree.
+            (Unit: m, degrees)
+        """
+        self.durations = np.asarray(durations, dtype=float)
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self._starts = np.concatenate(([0.0], np.cumsum(self.durations)))
+
+    @classmethod
+    def from_keyframes(cls, times, positions, yaws=None, smooth=False):
+        """
+        Compile keyframes into a trajectory passing through each of them,
+        with one piece between consecutive keyframes.
+        The drone is at rest at the first and last keyframe.
+
+        Parameters
+        ----------
+        times : array_like
+            Increasing time of each keyframe, from the start of the trajectory.
+            (Unit: s)
+        positions : array_like
+            Position of each keyframe, of shape (keyframes, 3),
+            or Pose objects.
+            (Unit: m)
+        yaws : array_like (optional)
+            Yaw at each keyframe. Yaw of Pose keyframes, or 0, by default.
+            (Unit: degrees)
+        smooth : bool (optional)
+            If True, interpolate with a cubic spline, which keeps acceleration
+            continuous but may overshoot keyframes. By default, interpolate
+            monotonically, which never overshoots keyframes on any axis
+            and comes to rest at keyframes that hold or reverse direction.
+        """
+        times = np.asarray(times, dtype=float)
+        if yaws is None:
+            yaws = [getattr(position, 'yaw', None) or 0.0 for position in positions]
+        values = np.column_stack([np.asarray([tuple(p)[:3] for p in positions], dtype=float),
+                                  np.asarray(yaws, dtype=float)])
+        if len(times) < 2 or np.any(np.diff(times) <= 0):
+            raise ValueError('Keyframes need at least two increasing times')
+        velocities = (spline_velocities if smooth else monotone_velocities)(times, values)
+        return cls(np.diff(times), hermite_coefficients(times, values, velocities))
+
+    @property
+    def duration(self):
+        """
+        Total duration.
+        (Unit: s)
+        """
+        return float(self._starts[-1])
+
+    @property
+    def size(self):
+        """
+        Space taken in drone's trajectory memory.
+        (Unit: bytes)
+        """
+        return len(self.durations) * PIECE_SIZE
+
+    def evaluate(self, t, derivative=0):
+        """
+        Position and yaw at given times, held before start and after end.
+        Returns array of shape (..., 4) for x, y, z and yaw.
+
+        Parameters
+        ----------
+        t : float or array_like
+            Time since start of trajectory.
+            (Unit: s)
+        derivative : int (optional)
+            Derivative to evaluate, e.g. 1 for velocity.
+        """
+        t = np.clip(np.asarray(t, dtype=float), 0.0, self.duration)
+        piece = np.clip(np.searchsorted(self._starts, t, side='right') - 1,
+                        0, len(self.durations) - 1)
+        return evaluate_polynomials(self.coefficients[piece],
+                                    (t - self._starts[piece])[..., None], derivative)
+
+    def check(self, world, resolution=0.01, time_scale=1.0, offset=None):
+        """
+        Check trajectory against airspace rules, by sampling it,
+        as flown at a time scale and from an offset.
+        Returns a list of violations, empty if none.
+
+        Parameters
+        ----------
+        world : World
+            World object defining airspace rules.
+        resolution : float (optional)
+            Time between samples.
+            (Unit: s)
+        time_scale : float (optional)
+            Time stretch factor the trajectory is flown at,
+            e.g. 0.5 to fly at double speed.
+        offset : array_like (optional)
+            Shift of x, y, z the trajectory is flown at,
+            e.g. when flown relative to the drone's position.
+            (Unit: m)
+        """
+        t = np.linspace(0.0, self.duration,
+                        max(2, math.ceil(self.duration / resolution) + 1))
+        positions = self.evaluate(t)[:, :3]
+        if offset is not None:
+            positions += offset
+        velocities = self.evaluate(t, derivative=1)[:, :3] / time_scale
+        # Not geofenced in flight, so keep clear of the padding
+        codes = world.check_path(positions, velocities)
+        violations = []
+
+        outside = codes & (OUTSIDE_X | OUTSIDE_Y | OUTSIDE_Z) != 0
+        if outside.any():
+            first = np.argmax(outside)
+            violations.append(f'Outside safe volume at {t[first] * time_scale:.2f} s: '
+                              f'({", ".join(f"{v:.3f}" for v in positions[first])})')
+
+        speeds = np.column_stack([np.hypot(velocities[:, 0], velocities[:, 1]),
+                                  np.abs(velocities[:, 2])])
+        for axis, (name, code) in enumerate((('Horizontal', TOO_FAST_XY),
+                                             ('Vertical', TOO_FAST_Z))):
+            fast = codes & code != 0
+            if fast.any():
+                first = np.argmax(fast)
+                violations.append(f'{name} speed {speeds[:, axis].max():.2f} m/s over limit '
+                                  f'of {world.speed_limit} m/s from {t[first] * time_scale:.2f} s')
+        return violations
+
+    def pieces(self):
+        """
+        Pieces as cflib Poly4D objects, ready to write to trajectory memory.
+        """
+        coefficients = np.zeros((len(self.durations), 4, PIECE_COEFFICIENTS))
+        coefficients[:, :, :self.coefficients.shape[2]] = self.coefficients
+        # The drone takes yaw in radians
+        coefficients[:, 3] = np.radians(coefficients[:, 3])
+        return [Poly4D(duration, *(Poly4D.Poly(axis.tolist()) for axis in piece))
+                for duration, piece in zip(self.durations.tolist(), coefficients)]
+
+    def __str__(self):
+        return f'trajectory of {len(self.durations)} pieces over {self.duration:.2f} s'
+
+
+def start_together(qcfs, trajectory_id=1, time_scale=1.0, relative=False):
+    """
+    Start uploaded trajectory on many drones at once.
+    Returns True if started, or False if the trajectory as flown
+    breaks airspace rules for any drone, in which case none is started.
+
+    Start packets are handed to radio sender threads without waiting,
+    so drones on different radios start in parallel, and drones
+    on the same radio within a few packets of each other.
+
+    Parameters
+    ----------
+    qcfs : [QualisysCrazyflie]
+        Drones with trajectory uploaded.
+    trajectory_id : int (optional)
+        ID the trajectory was uploaded under.
+    time_scale : float (optional)
+        Time stretch factor, e.g. 2.0 to fly at half speed.
+    relative : bool (optional)
+        Fly trajectories relative to each drone's current position.
+    """
+    started = True
+    for qcf in qcfs:
+        violations = qcf.check_trajectory(trajectory_id, time_scale, relative)
+        if violations:
+            print(f'''[{qcf.cf_body_name}@{qcf.cf_uri}] !!! TRAJECTORY NOT STARTED !!!
+                {"; ".join(violations)}!''')
+            started = False
+    if not started:
+        return False
+    for qcf in qcfs:
+        qcf.start_trajectory(trajectory_id, time_scale, relative)
+    return True
+
+
+def monotone_velocities(times, values):
+    """
+    Velocities at keyframes for monotone cubic interpolation,
+    zero at ends and wherever values hold or reverse (Fritsch-Carlson).
+    Vectorized over trailing axes of values.
+
+    Parameters
+    ----------
+    times : numpy.ndarray
+        Keyframe times, of shape (keyframes,).
+    values : numpy.ndarray
+        Keyframe values, of shape (keyframes, ...).
+    """
+    h = np.diff(times).reshape((-1,) + (1,) * (values.ndim - 1))
+    slopes = np.diff(values, axis=0) / h
+    velocities = np.zeros_like(values)
+    before, after = slopes[:-1], slopes[1:]
+    h0, h1 = h[:-1], h[1:]
+    same = before * after > 0
+    # Weighted harmonic mean of neighbouring slopes
+    w0, w1 = 2 * h1 + h0, h1 + 2 * h0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = (w0 + w1) / (w0 / before + w1 / after)
+    velocities[1:-1] = np.where(same, mean, 0.0)
+    return velocities
+
+
+def spline_velocities(times, values):
+    """
+    Velocities at keyframes for a cubic spline with continuous acceleration,
+    at rest at ends. Vectorized over trailing axes of values.
+
+    Parameters
+    ----------
+    times : numpy.ndarray
+        Keyframe times, of shape (keyframes,).
+    values : numpy.ndarray
+        Keyframe values, of shape (keyframes, ...).
+    """
+    n = len(times)
+    velocities = np.zeros_like(values)
+    if n < 3:
+        return velocities
+    h = np.diff(times)
+    slopes = np.diff(values, axis=0) / h.reshape((-1,) + (1,) * (values.ndim - 1))
+    # Continuity of acceleration at inner keyframes, tridiagonal in velocities
+    system = np.zeros((n - 2, n - 2))
+    index = np.arange(n - 2)
+    system[index, index] = 2 * (h[:-1] + h[1:])
+    system[index[1:], index[:-1]] = h[2:]
+    system[index[:-1], index[1:]] = h[:-2]
+    rhs = 3 * (h[1:].reshape((-1,) + (1,) * (values.ndim - 1)) * slopes[:-1]
+               + h[:-1].reshape((-1,) + (1,) * (values.ndim - 1)) * slopes[1:])
+    shape = rhs.shape
+    velocities[1:-1] = np.linalg.solve(system, rhs.reshape(n - 2, -1)).reshape(shape)
+    return velocities
+
+
+def hermite_coefficients(times, values, velocities):
+    """
+    Cubic polynomial coefficients between consecutive keyframes, in time since
+    the earlier keyframe, constant term first. Returns array of shape
+    (keyframes - 1, ..., 4). Vectorized over trailing axes of values.
+
+    Parameters
+    ----------
+    times : numpy.ndarray
+        Keyframe times, of shape (keyframes,).
+    values : numpy.ndarray
+        Keyframe values, of shape (keyframes, ...).
+    velocities : numpy.ndarray
+        Rates of change of values at keyframes, of the same shape.
+    """
+    h = np.diff(times).reshape((-1,) + (1,) * (values.ndim - 1))
+    p0, p1 = values[:-1], values[1:]
+    v0, v1 = velocities[:-1], velocities[1:]
+    slopes = (p1 - p0) / h
+    return np.stack([p0,
+                     v0,
+                     (3 * slopes - 2 * v0 - v1) / h,
+                     (v0 + v1 - 2 * slopes) / (h * h)], axis=-1)
+
+
+def evaluate_polynomials(coefficients, t, derivative=0):
+    """
+    Evaluate polynomials, or their derivatives, by Horner's method.
+    Vectorized over leading axes of coefficients, broadcast against t.
+
+    Parameters
+    ----------
+    coefficients : numpy.ndarray
+        Coefficients, constant term first, along the last axis.
+    t : numpy.ndarray
+        Variable, broadcast against coefficients without their last axis.
+    derivative : int (optional)
+        Derivative to evaluate.
+    """
+    degree = coefficients.shape[-1] - 1
+    if derivative:
+        factors = np.ones(degree + 1)
+        for k in range(derivative):
+            factors *= np.maximum(np.arange(degree + 1) - k, 0)
+        coefficients = (coefficients * factors)[..., derivative:]
+    result = np.zeros(np.broadcast_shapes(coefficients.shape[:-1], np.shape(t)))
+    for k in range(coefficients.shape[-1] - 1, -1, -1):
+        result = result * t + coefficients[..., k]
+    return result
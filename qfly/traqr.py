@@ -1,13 +1,17 @@
-from threading import Thread
+import asyncio
 import traceback
 
 import qfly
 
 
-class QualisysTraqr(Thread):
+class QualisysTraqr:
     """
     Wrapper for convenient operation of the Qualisys Traqr
 
+    Use as a context manager, either with `with` or,
+    sharing the application's event loop with the QTM stream,
+    with `async with`.
+
     Attributes
     ----------
     trqr_body_name : str
@@ -18,7 +22,8 @@ class QualisysTraqr(Thread):
 
     def __init__(self,
                  traqr_body_name,
-                 qtm_ip="127.0.0.1"):
+                 qtm_ip="127.0.0.1",
+                 recorder=None):
         """
         Construct QualisysTraqr object
 
@@ -26,8 +31,11 @@ class QualisysTraqr(Thread):
         ----------
         traqr_body_name : str
             Name of Traqr's rigid body in QTM
-        qtm_ip : str
-            IP address of QTM host.
+        qtm_ip : str or PoseSource
+            IP address of QTM host, or another source of poses,
+            e.g. a ReplaySource.
+        recorder : FlightRecorder (optional)
+            Recorder to log poses and tracking loss to.
         """
 
         print(f'[TRAQR {traqr_body_name}] Initializing...')
@@ -35,6 +43,7 @@ class QualisysTraqr(Thread):
         self.traqr_body_name = traqr_body_name
 
         self.pose = None
+        self.recorder = recorder
         self.qtm = None
         self.qtm_ip = qtm_ip
 
@@ -44,21 +53,55 @@ class QualisysTraqr(Thread):
         """
         Enter QualisysTraqr context
         """
+        self._track()
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, tb=None):
+        """
+        Exit QualisysTraqr context
+        """
+        self._report_exit(exc_type, exc_value, tb)
+        self.qtm.close()
+
+    async def __aenter__(self):
+        """
+        Enter QualisysTraqr context asynchronously,
+        handling poses on the running event loop.
+        """
+        self._track(asyncio.get_running_loop())
+        return self
+
+    async def __aexit__(self, exc_type=None, exc_value=None, tb=None):
+        """
+        Exit QualisysTraqr context asynchronously
+        """
+        self._report_exit(exc_type, exc_value, tb)
+        await self.qtm.aclose()
+
+    def _track(self, loop=None):
+        """
+        Subscribe to poses of Traqr's rigid body.
+
+        Parameters
+        ----------
+        loop : asyncio.AbstractEventLoop (optional)
+            Event loop to run the QTM stream on, if not running yet.
+        """
         print(f'[TRAQR {self.traqr_body_name}]  Setting up...')
 
         self.qtm = qfly.QtmWrapper(
             self.traqr_body_name,
             lambda pose: self._set_pose(pose),
-            qtm_ip=self.qtm_ip)
+            qtm_ip=self.qtm_ip,
+            loop=loop,
+            recorder=self.recorder)
 
         print(
             f'[TRAQR {self.traqr_body_name}] Connecting to QTM at {self.qtm.qtm_ip}...')
 
-        return self
-
-    def __exit__(self, exc_type=None, exc_value=None, tb=None):
+    def _report_exit(self, exc_type, exc_value, tb):
         """
-        Exit QualisysTraqr context
+        Report exiting context, and exception if any.
         """
         print(
             f'[TRAQR {self.traqr_body_name}] Exiting...')
@@ -66,7 +109,6 @@ class QualisysTraqr(Thread):
             print(
                 f'[TRAQR {self.traqr_body_name}] Encountered exception on exit...')
             traceback.print_exception(exc_type, exc_value, tb)
-        self.qtm.close()
 
     def _set_pose(self, pose):
         """
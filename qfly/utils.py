@@ -1,4 +1,97 @@
+from collections import deque
 import math
+import os
+
+import numpy as np
+
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.qfly')
+
+
+def cache_path(*parts):
+    """
+    Get path to a file in qfly's on-disk cache,
+    creating parent directories as needed.
+
+    Parameters
+    ----------
+    *parts : str
+        Path components relative to cache directory.
+    """
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def cache_dir(*parts):
+    """
+    Get path to a directory in qfly's on-disk cache,
+    creating it as needed.
+
+    Parameters
+    ----------
+    *parts : str
+        Path components relative to cache directory.
+    """
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class ConvergenceDetector:
+    """
+    Decide when noisy signals have settled, e.g. Kalman filter variances
+    after an estimator reset.
+
+    Keeps a sliding window of the latest samples of each signal.
+    Signals have converged once the window is full and the standard
+    deviation of every signal within it is below threshold.
+
+    Attributes
+    ----------
+    spreads : [float]
+        Standard deviation of each signal within the window.
+    """
+
+    def __init__(self, signal_count, window=10, threshold=0.0003):
+        """
+        Construct ConvergenceDetector object
+
+        Parameters
+        ----------
+        signal_count : int
+            Number of signals to watch.
+        window : int (optional)
+            Number of latest samples considered.
+        threshold : float (optional)
+            Max standard deviation of each signal within window.
+        """
+        self.window = window
+        self.threshold = threshold
+        self.spreads = [math.inf] * signal_count
+        self._histories = [deque(maxlen=window) for _ in range(signal_count)]
+
+    def add(self, *samples):
+        """
+        Add one sample per signal, return True if converged.
+
+        Parameters
+        ----------
+        *samples : float
+            Latest value of each signal.
+        """
+        converged = True
+        for index, (history, sample) in enumerate(zip(self._histories, samples)):
+            history.append(sample)
+            if len(history) < self.window:
+                converged = False
+                continue
+            mean = sum(history) / self.window
+            spread = sqrt(sum((x - mean) ** 2 for x in history) / (self.window - 1))
+            self.spreads[index] = spread
+            if spread >= self.threshold:
+                converged = False
+        return converged
 
 
 def sqrt(x):
@@ -55,3 +148,63 @@ def sph2cart(r, theta, phi):
     y = r * math.sin(math.radians(theta)) * math.sin(math.radians(phi))
     z = r * math.cos(math.radians(theta))
     return(x, y, z)
+
+
+def rotmatrix_to_quaternion(m):
+    """
+    Convert rotation matrix to quaternion (x, y, z, w)
+    using Shepperd's method, which takes a single square root
+    and stays accurate near 180 degree rotations.
+
+    Parameters
+    ----------
+    m : [[float]]
+        Row-major 3x3 rotation matrix, e.g. Pose.rotmatrix.
+    """
+    (m00, m01, m02), (m10, m11, m12), (m20, m21, m22) = m
+    trace = m00 + m11 + m22
+    # Branch on largest diagonal term to avoid dividing by small numbers
+    if trace > m00 and trace > m11 and trace > m22:
+        d = 1.0 + trace
+        s = 0.5 / math.sqrt(d)
+        return ((m21 - m12) * s, (m02 - m20) * s, (m10 - m01) * s, d * s)
+    if m00 > m11 and m00 > m22:
+        d = 1.0 + m00 - m11 - m22
+        s = 0.5 / math.sqrt(d)
+        return (d * s, (m01 + m10) * s, (m02 + m20) * s, (m21 - m12) * s)
+    if m11 > m22:
+        d = 1.0 + m11 - m00 - m22
+        s = 0.5 / math.sqrt(d)
+        return ((m01 + m10) * s, d * s, (m12 + m21) * s, (m02 - m20) * s)
+    d = 1.0 + m22 - m00 - m11
+    s = 0.5 / math.sqrt(d)
+    return ((m02 + m20) * s, (m12 + m21) * s, d * s, (m10 - m01) * s)
+
+
+def rotmatrices_to_quaternions(m):
+    """
+    Convert many rotation matrices to quaternions (x, y, z, w) at once.
+    Vectorized counterpart of rotmatrix_to_quaternion().
+
+    Parameters
+    ----------
+    m : array_like
+        N x 3 x 3 array of row-major rotation matrices,
+        e.g. the rotation field of a QTM frame array.
+    """
+    m = np.asarray(m, dtype=float)
+    m00, m01, m02 = m[..., 0, 0], m[..., 0, 1], m[..., 0, 2]
+    m10, m11, m12 = m[..., 1, 0], m[..., 1, 1], m[..., 1, 2]
+    m20, m21, m22 = m[..., 2, 0], m[..., 2, 1], m[..., 2, 2]
+    trace = m00 + m11 + m22
+    # Candidate (x, y, z, w) for each branch of Shepperd's method,
+    # scaled by 4 * largest quaternion component
+    candidates = np.stack([
+        np.stack([m21 - m12, m02 - m20, m10 - m01, 1.0 + trace], axis=-1),
+        np.stack([1.0 + m00 - m11 - m22, m01 + m10, m02 + m20, m21 - m12], axis=-1),
+        np.stack([m01 + m10, 1.0 + m11 - m00 - m22, m12 + m21, m02 - m20], axis=-1),
+        np.stack([m02 + m20, m12 + m21, 1.0 + m22 - m00 - m11, m10 - m01], axis=-1),
+    ], axis=-2)
+    branch = np.argmax(np.stack([trace, m00, m11, m22], axis=-1), axis=-1)
+    q = np.take_along_axis(candidates, branch[..., None, None], axis=-2)[..., 0, :]
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
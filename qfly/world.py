@@ -1,9 +1,34 @@
-from qfly import Pose
+import numpy as np
+
+from qfly.pose import Pose
+
+
+# Safety violation reason codes, combined as bit flags
+SAFE = 0
+TRACKING_LOST = 1
+OUTSIDE_X = 2
+OUTSIDE_Y = 4
+OUTSIDE_Z = 8
+TOO_FAST_XY = 16
+TOO_FAST_Z = 32
 
 
 class World:
     """
     Hold safety-critical information about the physical world.
+
+    Airspace bounds are precomputed whenever origin, expanse or padding
+    change, so that safety checks and geofencing cost a handful of
+    comparisons per drone, or a single NumPy call for a whole swarm.
+
+    Attributes
+    ----------
+    safe_min, safe_max : (float, float, float)
+        Corners of safe volume, outside of which flight is unsafe.
+        (Unit: m)
+    clamp_min, clamp_max : (float, float, float)
+        Corners of safe volume shrunk by padding, to which setpoints are clamped.
+        (Unit: m)
     """
 
     def __init__(self,
@@ -27,7 +52,7 @@ class World:
             Safety tolerance at expanse boundary.
             (Unit: m)
         speed_limit : float
-            Max allowed airspeed in horizontal (xy) 
+            Max allowed airspeed in horizontal (xy)
             and vertical (z) dimensions.
             (Unit: m/s)
         tracking_tolerance : int
@@ -35,12 +60,73 @@ class World:
             (Unit: frames)
         """
 
-        self.origin = origin
-        self.expanse = expanse
-        self.padding = padding
+        self._origin = origin
+        self._expanse = expanse
+        self._padding = padding
+        self._update_bounds()
         self.speed_limit = speed_limit
         self.tracking_tolerance = tracking_tolerance
 
+    @property
+    def origin(self):
+        """
+        Pose object containing x, y, z coordinates of origin.
+        """
+        return self._origin
+
+    @origin.setter
+    def origin(self, origin):
+        self._origin = origin
+        self._update_bounds()
+
+    @property
+    def expanse(self):
+        """
+        Edge dimension of cubic "safe" airspace extending from origin.
+        (Unit: m)
+        """
+        return self._expanse
+
+    @expanse.setter
+    def expanse(self, expanse):
+        self._expanse = expanse
+        self._update_bounds()
+
+    @property
+    def padding(self):
+        """
+        Safety tolerance at expanse boundary.
+        (Unit: m)
+        """
+        return self._padding
+
+    @padding.setter
+    def padding(self, padding):
+        self._padding = padding
+        self._update_bounds()
+
+    def _update_bounds(self):
+        """
+        Precompute airspace bounds from origin, expanse and padding.
+        """
+        origin, expanse, padding = self._origin, self._expanse, self._padding
+        self.safe_min = (origin.x - expanse,
+                         origin.y - expanse,
+                         0)
+        self.safe_max = (origin.x + expanse,
+                         origin.y + expanse,
+                         origin.z + (2 * expanse))
+        self.clamp_min = (origin.x - expanse + padding,
+                          origin.y - expanse + padding,
+                          0)
+        self.clamp_max = (origin.x + expanse - padding,
+                          origin.y + expanse - padding,
+                          origin.z + (2 * expanse) - padding)
+        self._safe_min = np.array(self.safe_min, dtype=float)
+        self._safe_max = np.array(self.safe_max, dtype=float)
+        self._clamp_min = np.array(self.clamp_min, dtype=float)
+        self._clamp_max = np.array(self.clamp_max, dtype=float)
+
     def set_origin_xy(self, pose):
         """
         Move World origin to new coordinates
@@ -51,3 +137,75 @@ class World:
             Pose object containing x, y, z coordinates of new origin
         """
         self.origin = pose
+
+    def clamp(self, positions, out=None):
+        """
+        Geofence many positions at once within safe airspace.
+        Vectorized counterpart of Pose.clamp().
+
+        Parameters
+        ----------
+        positions : array_like
+            N x 3 array of x, y, z coordinates.
+            (Unit: m)
+        out : numpy.ndarray (optional)
+            N x 3 array to write results to, may be positions itself.
+        """
+        return np.clip(positions, self._clamp_min, self._clamp_max, out=out)
+
+    def check(self, positions, tracking_loss=None):
+        """
+        Perform safety checks for many drones at once.
+        Vectorized counterpart of QualisysCrazyflie.is_safe().
+
+        Returns an array of reason codes, one per drone,
+        combining TRACKING_LOST, OUTSIDE_X, OUTSIDE_Y and OUTSIDE_Z,
+        or SAFE if there is no violation.
+
+        Parameters
+        ----------
+        positions : array_like
+            N x 3 array of x, y, z coordinates. NaN counts as outside.
+            (Unit: m)
+        tracking_loss : array_like (optional)
+            N frame counts of tracking loss.
+        """
+        positions = np.asarray(positions, dtype=float)
+        outside = ~((self._safe_min < positions) & (positions < self._safe_max))
+        codes = outside @ np.array([OUTSIDE_X, OUTSIDE_Y, OUTSIDE_Z])
+        if tracking_loss is not None:
+            codes[np.asarray(tracking_loss) > self.tracking_tolerance] |= TRACKING_LOST
+        return codes
+
+    def check_path(self, positions, velocities, tolerance=1e-6):
+        """
+        Check sampled flight paths against airspace rules, for paths
+        that are flown without geofencing, e.g. onboard trajectories.
+        Positions must stay within the padded volume that setpoints
+        are clamped to, and speeds within the speed limit.
+
+        Returns an array of reason codes, one per sample,
+        combining OUTSIDE_X, OUTSIDE_Y, OUTSIDE_Z, TOO_FAST_XY
+        and TOO_FAST_Z, or SAFE if there is no violation.
+
+        Parameters
+        ----------
+        positions : array_like
+            Array of x, y, z coordinates, of shape (..., 3).
+            (Unit: m)
+        velocities : array_like
+            Array of x, y, z velocities, of the same shape.
+            (Unit: m/s)
+        tolerance : float (optional)
+            Margin for rounding errors of sampled paths.
+            (Unit: m, m/s)
+        """
+        positions = np.asarray(positions, dtype=float)
+        velocities = np.asarray(velocities, dtype=float)
+        outside = ~((self._clamp_min <= positions + tolerance)
+                    & (positions - tolerance <= self._clamp_max))
+        codes = outside @ np.array([OUTSIDE_X, OUTSIDE_Y, OUTSIDE_Z])
+        limit = self.speed_limit + tolerance
+        codes[np.hypot(velocities[..., 0], velocities[..., 1]) > limit] |= TOO_FAST_XY
+        codes[np.abs(velocities[..., 2]) > limit] |= TOO_FAST_Z
+        return codes
@@ -6,7 +6,7 @@ setup(
     version=0.2,
     url="https://github.com/qualisys/qualisys_drone_sdk",
     license="MIT",
-    install_requires=['qtm', 'cflib', 'pynput'],
+    install_requires=['qtm', 'cflib', 'numpy', 'pynput'],
     packages=["qfly"],
     author="Mehmet Aydin Baytas c/o Qualisys AB",
     author_email="support@qualisys.com",
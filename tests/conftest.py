@@ -0,0 +1,39 @@
+import math
+
+import pytest
+
+from qfly import FlightRecorder
+from qfly.recorder import POSE, SETPOINT
+
+
+class RecordingClock:
+    """
+    Clock ticking at 100 Hz, once per reading.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.01
+        return self.now
+
+
+@pytest.fixture
+def flight(tmp_path):
+    """
+    Recording of two bodies flying for 5 frames, body b untracked in frame 2,
+    with a setpoint that must not show up in a replay.
+    """
+    path = tmp_path / 'flight'
+    with FlightRecorder(path, ring_size=16, capacity=4, clock=RecordingClock()) as recorder:
+        a, b = recorder.body_id('a'), recorder.body_id('b')
+        for frame in range(5):
+            recorder.record(POSE, a, 0.1 * frame, 0.0, 1.0, 90.0, frame=100 + frame)
+            if frame == 2:
+                recorder.record(POSE, b, math.nan, math.nan, math.nan, frame=100 + frame,
+                                tracking_loss=1)
+            else:
+                recorder.record(POSE, b, -1.0, 0.2 * frame, 0.5, frame=100 + frame)
+            recorder.record(SETPOINT, a, 9.0, 9.0, 9.0, frame=100 + frame)
+    return path
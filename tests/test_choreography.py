@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from qfly import Pose, Timeline, World
+from qfly.choreography import INTERPOLATIONS
+
+TIMES = [0.0, 1.0, 3.0, 4.0]
+
+
+def circle(drones):
+    """
+    Keyframes of drones spread around a circle, turning a quarter per keyframe.
+    """
+    phi = (np.arange(len(TIMES))[None, :] + np.arange(drones)[:, None] / drones) * np.pi / 2
+    z = np.broadcast_to(1.0 + 0.1 * np.arange(len(TIMES)), phi.shape)
+    return np.stack([0.5 * np.cos(phi), 0.5 * np.sin(phi), z], axis=-1)
+
+
+@pytest.mark.parametrize('interpolation', INTERPOLATIONS)
+def test_evaluate_hits_keyframes(interpolation):
+    positions = circle(5)
+    yaws = np.arange(5 * len(TIMES), dtype=float).reshape(5, len(TIMES))
+    timeline = Timeline(TIMES, positions, yaws, interpolation=interpolation)
+
+    for index, t in enumerate(TIMES):
+        np.testing.assert_allclose(timeline.evaluate(t)[:, :3], positions[:, index], atol=1e-12)
+        np.testing.assert_allclose(timeline.evaluate(t)[:, 3], yaws[:, index], atol=1e-12)
+
+
+@pytest.mark.parametrize('interpolation', INTERPOLATIONS)
+def test_evaluate_matches_sample_and_trajectories(interpolation):
+    timeline = Timeline(TIMES, circle(3), interpolation=interpolation)
+    t = np.linspace(-0.5, 4.5, 41)
+
+    sampled = timeline.sample(t)
+    for i, ti in enumerate(t):
+        np.testing.assert_allclose(timeline.evaluate(ti), sampled[i], atol=1e-12)
+    for index in range(len(timeline)):
+        np.testing.assert_allclose(timeline.trajectory(index).evaluate(t),
+                                   sampled[:, index], atol=1e-12)
+
+
+def test_evaluate_holds_outside_keyframes():
+    timeline = Timeline(TIMES, circle(2), interpolation='spline')
+
+    np.testing.assert_allclose(timeline.evaluate(-1.0), timeline.evaluate(0.0))
+    np.testing.assert_allclose(timeline.evaluate(10.0), timeline.evaluate(4.0))
+
+
+def test_linear_and_eased_midpoints():
+    positions = [[(0.0, 0.0, 1.0), (1.0, 0.0, 1.0)]]
+
+    def x_at(interpolation, t):
+        return Timeline([0.0, 2.0], positions, interpolation=interpolation).evaluate(t)[0, 0]
+
+    assert x_at('linear', 0.5) == pytest.approx(0.25)
+    assert x_at('ease_in', 1.0) == pytest.approx(0.25)
+    assert x_at('ease_out', 1.0) == pytest.approx(0.75)
+    assert x_at('ease_in_out', 1.0) == pytest.approx(0.5)
+    assert x_at('ease_in_out', 0.5) < 0.25
+
+
+def test_evaluate_writes_into_out():
+    timeline = Timeline(TIMES, circle(4))
+    out = np.empty((4, 4))
+
+    result = timeline.evaluate(2.0, out=out)
+
+    assert result is out
+    np.testing.assert_allclose(out, timeline.sample([2.0])[0])
+
+
+def test_interpolation_per_segment():
+    positions = [[(0.0, 0.0, 1.0), (1.0, 0.0, 1.0), (2.0, 0.0, 1.0)]]
+    timeline = Timeline([0.0, 1.0, 2.0], positions, interpolation=['linear', 'ease_out'])
+
+    assert timeline.evaluate(0.5)[0, 0] == pytest.approx(0.5)
+    assert timeline.evaluate(1.5)[0, 0] == pytest.approx(1.75)
+
+
+def test_from_drones_merges_keyframe_times():
+    timeline = Timeline.from_drones([[(0.0, Pose(0, 0, 1)), (2.0, Pose(1, 0, 1, yaw=90))],
+                                     [(1.0, Pose(0, 1, 1))]])
+
+    assert timeline.times.tolist() == [0.0, 1.0, 2.0]
+    np.testing.assert_allclose(timeline.evaluate(1.0), [[0.5, 0, 1, 45], [0, 1, 1, 0]])
+
+
+def test_rejects_bad_keyframes():
+    with pytest.raises(ValueError):
+        Timeline([0.0, 0.0], circle(1)[:, :2])
+    with pytest.raises(ValueError):
+        Timeline(TIMES, circle(1)[:, :3])
+    with pytest.raises(ValueError):
+        Timeline(TIMES, circle(1), interpolation='cubic')
+
+
+def test_check_names_drones():
+    world = World(expanse=1.0, padding=0.15, speed_limit=0.5)
+    positions = [[(0.0, 0.0, 1.0), (0.2, 0.0, 1.0), (0.0, 0.0, 1.0)],
+                 [(0.0, 0.0, 1.0), (0.95, 0.0, 1.0), (0.0, 0.0, 1.0)]]
+
+    assert Timeline([0.0, 2.0, 4.0], positions[:1]).check(world) == []
+    violations = Timeline([0.0, 1.0, 2.0], positions).check(world)
+    assert violations[0].startswith('Drones [1] outside safe volume')
+    assert violations[1].startswith('Drones [1] over speed limit')
@@ -0,0 +1,162 @@
+import time
+from threading import Event, Thread, Timer
+
+from cflib.utils.callbacks import Caller
+import numpy as np
+import pytest
+
+from qfly import QtmWrapper, QualisysCrazyflie, ReplaySource, SimSwarm, World
+from qfly.qtm import FRAME_DTYPE
+
+
+def simulated_drone(autoplay):
+    """
+    QualisysCrazyflie driving the only drone of a simulated swarm.
+    """
+    swarm = SimSwarm(['cf0'], autoplay=autoplay, seed=1)
+    qcf = QualisysCrazyflie('cf0', 'sim://0/0', World(), qtm_ip=swarm,
+                            crazyflie=swarm.crazyflie('cf0'), radio_thread=False)
+    return swarm, qcf
+
+
+def test_setup_converges_on_simulated_drone():
+    swarm, qcf = simulated_drone(autoplay=True)
+
+    with qcf:
+        assert qcf.timings['convergence'] > 0
+        assert swarm.extpos_count[0] > 0
+
+
+def test_setup_times_out_without_log_samples():
+    swarm, qcf = simulated_drone(autoplay=False)
+    qcf.scf.open_link()
+
+    t = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        qcf.setup(timeout=0.3)
+
+    # Logging never started delivering, but the deadline held
+    assert time.perf_counter() - t < 1.0
+    assert 'convergence' not in qcf.timings
+    qcf.scf.close_link()
+
+
+def test_setup_times_out_while_samples_keep_arriving():
+    swarm, qcf = simulated_drone(autoplay=False)
+    qcf.scf.open_link()
+    stop = Event()
+
+    def run():
+        # Without external positions, variances keep growing
+        while not stop.wait(0.01):
+            swarm.step()
+
+    thread = Thread(target=run)
+    thread.start()
+    try:
+        with pytest.raises(TimeoutError):
+            qcf.setup(timeout=0.5)
+    finally:
+        stop.set()
+        thread.join()
+    assert 'convergence' not in qcf.timings
+    qcf.scf.close_link()
+
+
+def test_setup_stops_when_link_is_lost():
+    swarm, qcf = simulated_drone(autoplay=False)
+    qcf.scf.open_link()
+    Timer(0.3, qcf.scf.close_link).start()
+
+    t = time.perf_counter()
+    with pytest.raises(ConnectionError):
+        qcf.setup(timeout=5.0)
+
+    assert time.perf_counter() - t < 1.0
+    assert 'convergence' not in qcf.timings
+
+
+QTM_DELAY = 0.010
+RADIO_DELAY = 0.004
+
+
+def circle(t):
+    """
+    Drone flying a circle of 1 m radius at 1 m/s.
+    """
+    return np.stack([np.cos(t), np.sin(t), np.ones_like(t)], axis=-1)
+
+
+class StubCrazyflie:
+    """
+    Stands in for cflib's Crazyflie, taking time to deliver poses.
+    """
+
+    def __init__(self):
+        self.extpos = self
+        self.link_quality_updated = Caller()
+        self.link_statistics = self
+        self.arrivals = []
+
+    def send_extpos(self, x, y, z):
+        time.sleep(RADIO_DELAY)
+        self.arrivals.append((time.perf_counter(), x, y, z))
+
+
+def fly_circle(lead, duration=2.5, rate=100):
+    """
+    Replay a circle to a stubbed drone with extpos_lead set to lead.
+    Returns distance of poses from drone when they arrive, after the
+    first second, and the QualisysCrazyflie.
+    """
+    times = np.arange(int(duration * rate)) / rate
+    frames = np.zeros((len(times), 1), dtype=FRAME_DTYPE)
+    # Frames leave QTM some time after the drone was where they say
+    frames['position'][:, 0] = circle(times - QTM_DELAY)
+    frames['rotation'] = np.eye(3)
+    frames['valid'] = True
+    frames['frame'] = np.arange(len(times))[:, None]
+    replay = ReplaySource(frames, ['cf'], times=times)
+    cf = StubCrazyflie()
+    starts = []
+
+    qcf = QualisysCrazyflie('cf', 'stub://0', World(expanse=10), qtm_ip=replay,
+                            crazyflie=cf, extpos_lead=lead)
+    # Host time at replay time 0, from frames passed on without delay
+    clock = QtmWrapper('cf', lambda pose: starts.append(
+        replay.received - replay.timestamp * 1e-6), qtm_ip=replay)
+    qcf.track()
+    replay.finished.wait()
+    time.sleep(0.1)
+    clock.close()
+    qcf.untrack()
+
+    arrivals = np.array(cf.arrivals)
+    t = arrivals[:, 0] - min(starts)
+    error = np.linalg.norm(arrivals[:, 1:] - circle(t), axis=1)
+    return error[t > 1.0], qcf
+
+
+@pytest.fixture(scope='module')
+def circles():
+    return {lead: fly_circle(lead) for lead in (None, 'auto', QTM_DELAY + RADIO_DELAY)}
+
+
+def test_lead_brings_poses_closer_to_drone_on_arrival(circles):
+    off = np.median(circles[None][0])
+    auto = np.median(circles['auto'][0])
+    fixed = np.median(circles[QTM_DELAY + RADIO_DELAY][0])
+
+    # Poses are a little over 14 ms behind at 1 m/s without lead
+    assert 0.012 < off < 0.025
+    assert auto < off
+    # Only a lead that knows QTM latency too catches up fully
+    assert fixed < 0.005
+    assert fixed < auto
+
+
+def test_auto_lead_measures_radio_delay(circles):
+    assert circles[None][1].measured_lead == 0.0
+    assert circles[QTM_DELAY + RADIO_DELAY][1].measured_lead == 0.0
+    # QTM latency is invisible to qfly, while time to send is not
+    assert RADIO_DELAY < circles['auto'][1].measured_lead < QTM_DELAY + RADIO_DELAY
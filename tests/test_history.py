@@ -0,0 +1,115 @@
+from threading import Event, Thread
+
+import numpy as np
+import pytest
+
+from qfly import Pose, PoseHistory
+
+
+def filled(size, count, path=lambda t: (t, -t, 1.0), rate=100.0):
+    """
+    History of a body following path, sampled at rate.
+    """
+    history = PoseHistory(size)
+    for frame in range(count):
+        t = frame / rate
+        history.append(Pose(*path(t), yaw=frame), t)
+    return history
+
+
+def test_wraps_around_keeping_latest():
+    history = filled(size=4, count=10)
+
+    times, positions = history.latest()
+
+    assert len(history) == 4
+    assert history.count == 10
+    np.testing.assert_allclose(times, [0.06, 0.07, 0.08, 0.09])
+    np.testing.assert_allclose(positions[:, 0], times)
+    assert history.pose.yaw == 9
+    assert history.time == pytest.approx(0.09)
+    assert len(history.latest(2)[0]) == 2
+    assert len(history.latest(100)[0]) == 4
+
+
+def test_latest_returns_copies():
+    history = filled(size=4, count=3)
+
+    times, positions = history.latest()
+    positions[:] = 0.0
+    history.append(Pose(5.0, 5.0, 5.0), 1.0)
+
+    assert history.latest()[1][0, 0] == 0.0
+    assert times.tolist() == pytest.approx([0.0, 0.01, 0.02])
+
+
+def test_velocity_and_acceleration():
+    history = filled(size=16, count=40, path=lambda t: (2.0 * t, 0.5 * t * t, 1.0))
+    t = history.time
+
+    np.testing.assert_allclose(history.velocity(10), [2.0, t - 0.045, 0.0], atol=1e-9)
+    # Finite difference is the velocity half a frame back
+    np.testing.assert_allclose(history.velocity(), [2.0, t - 0.005, 0.0], atol=1e-9)
+    np.testing.assert_allclose(history.acceleration(), [0.0, 1.0, 0.0], atol=1e-6)
+    np.testing.assert_allclose(history.acceleration(10), [0.0, 1.0, 0.0], atol=1e-6)
+
+
+def test_too_few_poses_for_estimates():
+    history = filled(size=4, count=1)
+
+    assert history.velocity() is None
+    assert history.acceleration() is None
+
+
+def test_pose_at_interpolates():
+    history = filled(size=8, count=5)
+
+    pose = history.pose_at(0.024)
+
+    assert pose[:3] == pytest.approx((0.024, -0.024, 1.0))
+    # Orientation of the nearest pose
+    assert pose.yaw == 2
+    assert history.pose_at(0.04).yaw == 4
+    assert history.pose_at(0.041) is None
+    assert history.pose_at(-0.001) is None
+
+
+def test_clear():
+    history = filled(size=4, count=10)
+
+    history.clear()
+
+    assert len(history) == 0
+    assert history.pose is None
+    assert history.latest()[0].shape == (0,)
+    assert history.pose_at(0.05) is None
+
+
+def test_reads_are_consistent_while_appending():
+    # Small enough to wrap around all the time
+    history = PoseHistory(size=8)
+    stop = Event()
+
+    def append():
+        frame = 0
+        while not stop.is_set():
+            frame += 1
+            history.append(Pose(frame, frame, frame), float(frame))
+
+    writer = Thread(target=append)
+    writer.start()
+    torn = 0
+    try:
+        for _ in range(20000):
+            times, positions = history.latest()
+            # Poses from before and after an append do not mix
+            if np.any(positions[:, 0] != times) or np.any(np.diff(times) != 1.0):
+                torn += 1
+            pose = history.pose_at(history.time - 2.5) if history.count > 8 else None
+            if pose is not None and not pose.x == pose.y == pose.z:
+                torn += 1
+    finally:
+        stop.set()
+        writer.join()
+
+    assert torn == 0
@@ -0,0 +1,90 @@
+import math
+
+import numpy as np
+import pytest
+
+from qfly import LatencyMetrics
+from qfly.metrics import RollingHistogram
+
+
+class FakeClock:
+    """
+    Clock that only moves when told to.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_histogram_keeps_latest_samples():
+    histogram = RollingHistogram(size=10)
+    for value in range(25):
+        histogram.add(float(value))
+
+    assert histogram.count == 25
+    np.testing.assert_array_equal(histogram.values(), np.arange(15.0, 25.0))
+    assert histogram.percentile(50) == pytest.approx(19.5)
+    np.testing.assert_allclose(histogram.percentile([0, 100]), [15.0, 24.0])
+
+
+def test_histogram_summary():
+    histogram = RollingHistogram(size=200)
+    for value in range(1, 101):
+        histogram.add(float(value))
+
+    summary = histogram.summary()
+
+    assert summary['count'] == 100
+    assert summary['mean'] == pytest.approx(50.5)
+    assert summary['p50'] == pytest.approx(50.5)
+    assert summary['p90'] == pytest.approx(90.1)
+    assert summary['p99'] == pytest.approx(99.01)
+    assert summary['max'] == 100.0
+
+
+def test_empty_histogram():
+    histogram = RollingHistogram()
+
+    assert math.isnan(histogram.percentile(50))
+    assert np.isnan(histogram.percentile([50, 90])).all()
+    assert histogram.summary()['count'] == 0
+
+
+def test_stages_and_loss():
+    clock = FakeClock()
+    metrics = LatencyMetrics(clock=clock)
+    # Frame number, QTM timestamp and host time received
+    frames = [(1, 1_000_000, 10.000),
+              (2, 1_010_000, 10.015),
+              (5, 1_040_000, 10.042)]
+
+    for frame, timestamp, received in frames:
+        clock.now = received + 0.001
+        metrics.on_frame(frame, timestamp, received)
+        clock.now = received + 0.004
+        metrics.on_send(received)
+
+    # Aged by QTM and network beyond the fastest frame, i.e. the first
+    np.testing.assert_allclose(metrics.histograms['qtm'].values(), [0.0, 0.005, 0.002],
+                               atol=1e-9)
+    assert metrics.percentile('decode', 50) == pytest.approx(0.001)
+    assert metrics.percentile('send', 99) == pytest.approx(0.004)
+    assert metrics.time == pytest.approx(1.04)
+    assert (metrics.frames, metrics.dropped) == (3, 2)
+    assert metrics.loss_rate == pytest.approx(2 / 5)
+    summary = metrics.summary()
+    assert set(summary) == {'qtm', 'decode', 'send', 'loss'}
+    assert summary['loss'] == {'frames': 3, 'dropped': 2, 'rate': pytest.approx(0.4)}
+    assert summary['send']['max'] == pytest.approx(0.004)
+
+
+def test_time_by_receipt_without_timestamps():
+    metrics = LatencyMetrics(clock=FakeClock())
+
+    metrics.on_frame(1, None, 3.5)
+
+    assert metrics.time == 3.5
+    assert metrics.histograms['qtm'].count == 0
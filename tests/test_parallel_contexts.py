@@ -0,0 +1,203 @@
+import asyncio
+from threading import Lock
+import time
+
+import pytest
+
+from qfly import ParallelContexts
+from qfly.parallel_contexts import MultipleError
+
+
+class Log:
+    """
+    Events of managers, and how many were starting at once, overall and by radio.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.starting = {}
+        self.most_starting = {}
+        self._lock = Lock()
+
+    def add(self, event, name):
+        with self._lock:
+            self.events.append((event, name))
+
+    def count(self, key, change):
+        with self._lock:
+            self.starting[key] = self.starting.get(key, 0) + change
+            self.most_starting[key] = max(self.most_starting.get(key, 0), self.starting[key])
+
+    def names(self, event):
+        return sorted(name for e, name in self.events if e == event)
+
+
+class Manager:
+    """
+    Context manager taking its time to start, which may fail to start or stop.
+    """
+
+    def __init__(self, name, log, cf_uri=None, delay=0.05, fail=False, fail_exit=False):
+        self.name = name
+        if cf_uri is not None:
+            self.cf_uri = cf_uri
+        self.log = log
+        self.delay = delay
+        self.fail = fail
+        self.fail_exit = fail_exit
+
+    def _starting(self, change):
+        self.log.count('all', change)
+        self.log.count(ParallelContexts.by_radio(self), change)
+
+    def _entered(self):
+        self._starting(-1)
+        if self.fail:
+            raise RuntimeError(f'{self.name} failed to start')
+        self.log.add('enter', self.name)
+
+    def _exited(self):
+        self.log.add('exit', self.name)
+        if self.fail_exit:
+            raise RuntimeError(f'{self.name} failed to stop')
+
+    def __enter__(self):
+        self._starting(1)
+        time.sleep(self.delay)
+        self._entered()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._exited()
+
+    async def __aenter__(self):
+        self._starting(1)
+        await asyncio.sleep(self.delay)
+        self._entered()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._exited()
+
+
+def enter(contexts, asynchronous):
+    """
+    Start and stop contexts, with or without async with.
+    """
+    if not asynchronous:
+        with contexts:
+            pass
+        return
+
+    async def run():
+        async with contexts:
+            pass
+
+    asyncio.run(run())
+
+
+def errors_of(excinfo):
+    return sorted(str(exc_value) for _, exc_value, _ in excinfo.value.errors)
+
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_starts_and_stops_all(asynchronous):
+    log = Log()
+    managers = [Manager(f'm{i}', log) for i in range(4)]
+    contexts = ParallelContexts(*managers)
+
+    enter(contexts, asynchronous)
+
+    assert log.names('enter') == log.names('exit') == ['m0', 'm1', 'm2', 'm3']
+    assert log.most_starting['all'] == 4
+    assert all(set(timings) == {'queued', 'enter'} for timings in contexts.timings)
+
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_max_workers_bounds_concurrent_starts(asynchronous):
+    log = Log()
+    managers = [Manager(f'm{i}', log) for i in range(5)]
+
+    enter(ParallelContexts(*managers, max_workers=2), asynchronous)
+
+    assert log.most_starting['all'] == 2
+    assert len(log.names('enter')) == 5
+
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_by_radio_starts_drones_on_one_radio_in_turn(asynchronous):
+    log = Log()
+    managers = [Manager('a', log, 'radio://0/80/2M/E7E7E7E701'),
+                Manager('b', log, 'radio://0/90/2M/E7E7E7E702'),
+                Manager('c', log, 'radio://1/80/2M/E7E7E7E701'),
+                Manager('d', log, 'radio://1/90/2M/E7E7E7E702'),
+                Manager('e', log),
+                Manager('f', log)]
+
+    enter(ParallelContexts(*managers, group_by=ParallelContexts.by_radio), asynchronous)
+
+    assert log.most_starting['radio://0'] == log.most_starting['radio://1'] == 1
+    # Managers without a radio each start on their own
+    assert log.most_starting['all'] == 4
+
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_failure_stops_only_started_managers(asynchronous):
+    log = Log()
+    managers = [Manager('a', log, 'radio://0/80', delay=0.1, fail=True),
+                Manager('b', log, 'radio://0/90'),
+                Manager('c', log, 'radio://1/80', delay=0.0)]
+
+    with pytest.raises(MultipleError) as excinfo:
+        enter(ParallelContexts(*managers, group_by=ParallelContexts.by_radio), asynchronous)
+
+    assert errors_of(excinfo) == ['a failed to start']
+    # b queued behind a on radio 0 is skipped, c on radio 1 is stopped again
+    assert log.names('enter') == log.names('exit') == ['c']
+
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_timeout_stops_managers_that_start_late(asynchronous):
+    log = Log()
+    managers = [Manager('slow', log, delay=0.3), Manager('fast', log, delay=0.0)]
+
+    t = time.perf_counter()
+    with pytest.raises(MultipleError) as excinfo:
+        enter(ParallelContexts(*managers, timeout=0.1), asynchronous)
+
+    # Gave up on the slow manager without waiting for it
+    assert time.perf_counter() - t < 0.3
+    assert errors_of(excinfo) == ['Manager did not start within 0.1 s']
+    assert log.names('exit') == ['fast']
+    if not asynchronous:
+        # Stopped from its own thread once it has started after all
+        time.sleep(0.4)
+        assert log.names('exit') == ['fast', 'slow']
+
+
+def test_async_timeout_stops_late_manager_on_its_loop():
+    log = Log()
+    contexts = ParallelContexts(Manager('slow', log, delay=0.3), timeout=0.1)
+
+    async def run():
+        with pytest.raises(MultipleError):
+            async with contexts:
+                pass
+        assert log.names('exit') == []
+        await asyncio.sleep(0.4)
+
+    asyncio.run(run())
+
+    assert log.names('enter') == log.names('exit') == ['slow']
+
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_startup_errors_kept_when_stopping_fails(asynchronous):
+    log = Log()
+    managers = [Manager('a', log, delay=0.1, fail=True),
+                Manager('b', log, delay=0.0, fail_exit=True)]
+
+    with pytest.raises(MultipleError) as excinfo:
+        enter(ParallelContexts(*managers), asynchronous)
+
+    assert errors_of(excinfo) == ['a failed to start', 'b failed to stop']
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from qfly import ConstantVelocityPredictor, KalmanPredictor, Pose
+from qfly.pose import PredictedPose
+
+VELOCITY = np.array([1.0, -0.5, 0.2])
+
+
+def feed(predictor, frames=50, rate=100.0, noise=0.0, seed=1):
+    """
+    Measure a body moving at constant velocity, returning time of last frame.
+    """
+    rng = np.random.default_rng(seed)
+    for frame in range(frames):
+        t = frame / rate
+        x, y, z = (VELOCITY * t + (0.0, 0.0, 1.0) + rng.normal(0.0, noise, 3)).tolist()
+        predictor.update(Pose(x, y, z, yaw=30.0), t)
+    return t
+
+
+@pytest.mark.parametrize('make', [ConstantVelocityPredictor, KalmanPredictor])
+def test_prediction_over_gap(make):
+    predictor = make(max_gap=0.1)
+    t = feed(predictor)
+
+    pose = predictor.predict(t + 0.05)
+
+    assert isinstance(pose, PredictedPose)
+    assert pose.predicted
+    np.testing.assert_allclose(pose[:3], VELOCITY * (t + 0.05) + (0.0, 0.0, 1.0), atol=1e-3)
+    # Orientation is held
+    assert pose.yaw == 30.0
+
+
+@pytest.mark.parametrize('make', [ConstantVelocityPredictor, KalmanPredictor])
+def test_no_prediction_past_max_gap_or_before_last_pose(make):
+    predictor = make(max_gap=0.1)
+    assert predictor.predict(0.0) is None
+    t = feed(predictor)
+
+    assert predictor.predict(t + 0.1) is not None
+    assert predictor.predict(t + 0.11) is None
+    assert predictor.predict(t - 0.01) is None
+
+    predictor.reset()
+    assert predictor.predict(t) is None
+
+
+def test_single_pose_is_held():
+    predictor = ConstantVelocityPredictor()
+    predictor.update(Pose(1.0, 2.0, 3.0), 0.0)
+
+    assert predictor.predict(0.05)[:3] == (1.0, 2.0, 3.0)
+
+
+def test_kalman_filters_noise():
+    noisy = dict(frames=200, noise=0.002)
+    errors = []
+    for predictor in (ConstantVelocityPredictor(), KalmanPredictor(noise=0.002)):
+        t = feed(predictor, **noisy)
+        truth = VELOCITY * (t + 0.1) + (0.0, 0.0, 1.0)
+        errors.append(np.linalg.norm(np.subtract(predictor.predict(t + 0.1)[:3], truth)))
+
+    finite_difference, kalman = errors
+    assert kalman < finite_difference / 2
+    assert kalman < 0.01
+
+
+def test_predictors_share_history():
+    kalman = KalmanPredictor()
+    follower = ConstantVelocityPredictor(history=kalman.history)
+    t = feed(kalman)
+
+    np.testing.assert_allclose(follower.predict(t + 0.05)[:3],
+                               VELOCITY * (t + 0.05) + (0.0, 0.0, 1.0), atol=1e-9)
@@ -0,0 +1,188 @@
+import asyncio
+import math
+import struct
+
+import numpy as np
+from qtm import QRTEvent
+from qtm.packet import QRTComponentType, QRTPacket
+
+from qfly import QtmStream
+
+
+def packet_of(bodies, framenumber=1, timestamp=1000):
+    """
+    QTM packet with one 6D component holding the given bodies,
+    as ((x, y, z) in mm, column-major rotation matrix) pairs.
+    """
+    data = b''.join(struct.pack('<3f', *position) + struct.pack('<9f', *rotation)
+                    for position, rotation in bodies)
+    component = struct.pack('<ihh', len(bodies), 0, 0) + data
+    component = struct.pack('<II', len(component) + 8,
+                            QRTComponentType.Component6d.value) + component
+    return QRTPacket(struct.pack('<qII', timestamp, framenumber, 1) + component)
+
+
+def rotation_about_z(degrees):
+    c, s = math.cos(math.radians(degrees)), math.sin(math.radians(degrees))
+    return np.array([[c, -s, 0.0], [s, c, 0.0], [0.0, 0.0, 1.0]])
+
+
+class Subscriber:
+    """
+    Stands in for QtmWrapper, keeping whatever it is passed.
+    """
+
+    def __init__(self, body, batch):
+        self.body = body
+        self.batch = batch
+        self.received = []
+
+    def _on_pose(self, pose):
+        self.received.append(pose)
+
+    def _on_record(self, record):
+        self.received.append(None if record is None else record.copy())
+
+
+def stream_with(subscribers, bodies):
+    stream = QtmStream('test')
+    for subscriber in subscribers:
+        stream.subscribe(subscriber)
+    stream._set_body_index({body: index for index, body in enumerate(bodies)})
+    return stream
+
+
+def test_batch_decode_matches_per_body_poses():
+    rotations = [rotation_about_z(angle) for angle in (0.0, 30.0, 180.0)]
+    bodies = [((100.0 * i, -200.0, 300.0 + i), tuple(rotation.T.ravel()))
+              for i, rotation in enumerate(rotations)]
+    names = ['a', 'b', 'c']
+    poses = [Subscriber(name, batch=False) for name in names]
+    records = [Subscriber(name, batch=True) for name in names]
+    stream = stream_with(poses + records, names)
+
+    stream._on_packet(packet_of(bodies, framenumber=7))
+
+    for index, (pose_subscriber, record_subscriber) in enumerate(zip(poses, records)):
+        pose, = pose_subscriber.received
+        record, = record_subscriber.received
+        np.testing.assert_allclose(record['position'], pose[:3], rtol=1e-6)
+        np.testing.assert_allclose(record['rotation'], pose.rotmatrix, atol=1e-6)
+        np.testing.assert_allclose(record['rotation'], rotations[index], atol=1e-6)
+        assert record['valid']
+        assert record['frame'] == 7
+
+
+def test_missing_bodies_register_tracking_loss_on_both_paths():
+    names = ['a', 'b']
+    subscribers = [Subscriber('b', batch=False), Subscriber('b', batch=True)]
+    stream = stream_with(subscribers, names)
+
+    # Body b is defined but not in this packet
+    stream._on_packet(packet_of([((0.0, 0.0, 0.0), tuple(np.eye(3).ravel()))]))
+
+    assert [s.received for s in subscribers] == [[None], [None]]
+
+
+def test_untracked_body_is_invalid_record():
+    subscriber = Subscriber('a', batch=True)
+    stream = stream_with([subscriber], ['a'])
+
+    stream._on_packet(packet_of([((math.nan,) * 3, (math.nan,) * 9)]))
+
+    record, = subscriber.received
+    assert not record['valid']
+
+
+def test_unsubscribed_bodies_are_not_routed():
+    subscriber = Subscriber('a', batch=False)
+    stream = stream_with([subscriber], ['a'])
+    stream.unsubscribe(subscriber)
+
+    stream._on_packet(packet_of([((0.0, 0.0, 0.0), tuple(np.eye(3).ravel()))]))
+
+    assert subscriber.received == []
+
+
+class StubConnection:
+    """
+    Stands in for a QTM connection, answering with 6D parameters
+    of the given bodies once released.
+    """
+
+    def __init__(self, bodies, error=None):
+        self.bodies = bodies
+        self.error = error
+        self.released = asyncio.Event()
+
+    async def get_parameters(self, parameters):
+        await self.released.wait()
+        if self.error is not None:
+            raise self.error
+        names = ''.join(f'<Body><Name>{body}</Name></Body>' for body in self.bodies)
+        return f'<QTM_Parameters_Ver_1.25><The_6D>{names}</The_6D></QTM_Parameters_Ver_1.25>'
+
+
+def positions_received(subscribers):
+    return [[None if pose is None else pose.x for pose in s.received] for s in subscribers]
+
+
+def test_reload_reroutes_reordered_bodies():
+    subscribers = [Subscriber('a', batch=False), Subscriber('b', batch=False)]
+    stream = stream_with(subscribers, ['a', 'b'])
+    # Bodies a at x=1 m and b at x=2 m, after b moved in front of a in QTM
+    packet = packet_of([((2000.0, 0.0, 0.0), tuple(np.eye(3).ravel())),
+                        ((1000.0, 0.0, 0.0), tuple(np.eye(3).ravel()))])
+
+    async def run():
+        stream._connection = StubConnection(['b', 'a'])
+        stream._on_event(QRTEvent.EventCaptureStarted)
+        # Old indices are not used while new ones are on their way
+        stream._on_packet(packet)
+        stream._connection.released.set()
+        await stream._reload_task
+        stream._on_packet(packet)
+
+    asyncio.run(run())
+
+    assert positions_received(subscribers) == [[None, 1.0], [None, 2.0]]
+    assert stream.index_of('a') == 1
+
+
+def test_latest_reload_wins():
+    subscriber = Subscriber('a', batch=False)
+    stream = stream_with([subscriber], ['a', 'b'])
+
+    async def run():
+        stream._connection = first = StubConnection(['b', 'a'])
+        stream._on_event(QRTEvent.EventCaptureStarted)
+        superseded = stream._reload_task
+        stream._connection = StubConnection(['c', 'b', 'a'])
+        stream._on_event(QRTEvent.EventCalibrationStopped)
+        stream._connection.released.set()
+        await stream._reload_task
+        # The first reload answers last, with what is by now out of date
+        first.released.set()
+        await superseded
+
+    asyncio.run(run())
+
+    assert stream.index_of('a') == 2
+
+
+def test_failed_reload_keeps_registering_tracking_loss(capsys):
+    subscriber = Subscriber('a', batch=False)
+    stream = stream_with([subscriber], ['a'])
+    packet = packet_of([((1000.0, 0.0, 0.0), tuple(np.eye(3).ravel()))])
+
+    async def run():
+        stream._connection = StubConnection(['a'], error=ConnectionError('lost'))
+        stream._on_event(QRTEvent.EventCaptureStarted)
+        stream._connection.released.set()
+        await asyncio.wait((stream._reload_task,))
+        stream._on_packet(packet)
+
+    asyncio.run(run())
+
+    assert positions_received([subscriber]) == [[None]]
+    assert 'Could not reload rigid bodies' in capsys.readouterr().out
@@ -0,0 +1,291 @@
+import asyncio
+import queue
+from threading import Event, Timer, current_thread
+
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.param import ParamTocElement
+from cflib.crtp.crtpstack import CRTPPacket
+import pytest
+
+from qfly import ExtposThrottle, SimSwarm
+from qfly.radio import RadioSender, set_params
+
+# Parameters of stub drones, by ID
+PARAMS = [('ring', 'effect', '<B', ParamTocElement.RW_ACCESS),
+          ('posCtlPid', 'xyVelMax', '<f', ParamTocElement.RW_ACCESS),
+          ('firmware', 'revision0', '<I', ParamTocElement.RO_ACCESS)]
+
+
+class FakeClock:
+    """
+    Clock that only moves when told to.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Blocker:
+    """
+    Packet function holding up the sender thread until released.
+    """
+
+    def __init__(self):
+        self.started = Event()
+        self.released = Event()
+
+    def __call__(self):
+        self.started.set()
+        assert self.released.wait(2.0)
+
+
+def blocked_mailboxes(radio, *uris):
+    """
+    Mailboxes for drones on one radio, behind a mailbox whose
+    packet blocks the sender thread until its blocker is released.
+    """
+    first = RadioSender.mailbox(f'{radio}/10/2M/E7E7E7E700')
+    blocker = Blocker()
+    first.post('extpos', blocker)
+    assert blocker.started.wait(1.0)
+    return first, blocker, [RadioSender.mailbox(f'{radio}/{uri}') for uri in uris]
+
+
+class StubLink:
+    """
+    Link to a drone acknowledging parameter writes,
+    losing the first few replies to writes of chosen parameters.
+    """
+
+    needs_resending = True
+
+    def __init__(self, lose=None):
+        self.lose = dict(lose or {})
+        self.written = []
+        self._replies = queue.Queue()
+
+    def send_packet(self, pk):
+        ident = pk.data[0]
+        self.written.append(ident)
+        if self.lose.get(ident):
+            self.lose[ident] -= 1
+            return
+        self._replies.put(CRTPPacket(pk.header, pk.data))
+
+    def receive_packet(self, wait=0):
+        try:
+            return self._replies.get(timeout=wait)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def crazyflie():
+    """
+    cflib Crazyflie on a stub link, with PARAMS in its param TOC.
+    """
+    cf = Crazyflie(link=StubLink())
+    for ident, (group, name, pytype, access) in enumerate(PARAMS):
+        element = ParamTocElement(ident)
+        element.group, element.name = group, name
+        element.pytype, element.access = pytype, access
+        cf.param.toc.add_element(element)
+    yield cf
+    cf.incoming.stop()
+
+
+def offer(throttle, clock, duration, interval=0.001):
+    """
+    Offer frames to throttle at a fixed interval, returning how many were let through.
+    """
+    sent = throttle.sent
+    for _ in range(round(duration / interval)):
+        clock.now += interval
+        throttle.admit()
+    return throttle.sent - sent
+
+
+def test_throttle_without_cap_lets_everything_through():
+    throttle = ExtposThrottle()
+
+    assert all(throttle.admit() for _ in range(100))
+    assert (throttle.received, throttle.sent, throttle.dropped) == (100, 100, 0)
+
+
+def test_throttle_holds_cap():
+    clock = FakeClock()
+    throttle = ExtposThrottle(max_rate=100, clock=clock)
+
+    sent = offer(throttle, clock, 1.0)
+
+    assert sent == pytest.approx(100, abs=1)
+    assert throttle.received == 1000
+    assert throttle.dropped == throttle.received - throttle.sent
+
+
+def test_throttle_adapts_to_link_quality():
+    throttle = ExtposThrottle(max_rate=100, min_rate=20, smoothing=1.0)
+
+    rates = []
+    for quality in (100.0, 90.0, 70.0, 50.0, 10.0):
+        throttle.on_link_quality(quality)
+        rates.append(throttle.rate)
+
+    assert rates == pytest.approx([100, 100, 60, 20, 20])
+
+
+def test_throttle_smooths_link_quality_and_sends_at_adapted_rate():
+    clock = FakeClock()
+    throttle = ExtposThrottle(max_rate=100, min_rate=20, smoothing=0.5, clock=clock)
+
+    throttle.on_link_quality(100.0)
+    throttle.on_link_quality(0.0)
+
+    assert throttle.link_quality == pytest.approx(50.0)
+    assert throttle.rate == pytest.approx(20)
+    assert offer(throttle, clock, 1.0) == pytest.approx(20, abs=1)
+
+
+def test_mailbox_keeps_latest_packet_of_each_kind():
+    first, blocker, (mailbox,) = blocked_mailboxes('radio://90', '80/2M/E7E7E7E701')
+    sent, done = [], []
+
+    for i in range(3):
+        mailbox.post('commander', sent.append, ('commander', i), done=done.append)
+    mailbox.post('extpos', sent.append, ('extpos', 0))
+    blocker.released.set()
+    mailbox.close()
+    first.close()
+
+    # Sent in Mailbox.KINDS order, older commander packets dropped
+    assert sent == [('extpos', 0), ('commander', 2)]
+    assert done == [False, False, True]
+
+
+def test_high_level_supersedes_waiting_setpoint():
+    first, blocker, (mailbox,) = blocked_mailboxes('radio://91', '80/2M/E7E7E7E701')
+    sent, done = [], []
+
+    mailbox.post('commander', sent.append, 'setpoint', done=done.append)
+    mailbox.post('high_level', sent.append, 'start')
+    # A setpoint posted after the start command still goes out, after it
+    mailbox.post('commander', sent.append, 'later setpoint')
+    mailbox.post('extpos', sent.append, 'pose')
+    assert done == [False]
+    blocker.released.set()
+    mailbox.close()
+    first.close()
+
+    assert sent == ['pose', 'start', 'later setpoint']
+
+
+def test_close_flushes_waiting_packets():
+    first, blocker, (mailbox,) = blocked_mailboxes('radio://92', '80/2M/E7E7E7E701')
+    sent = []
+
+    mailbox.post('commander', sent.append, 'setpoint')
+    Timer(0.05, blocker.released.set).start()
+    mailbox.close()
+
+    assert sent == ['setpoint']
+    first.close()
+
+
+def test_post_async_reports_sent_or_superseded():
+    first, blocker, (mailbox,) = blocked_mailboxes('radio://93', '80/2M/E7E7E7E701')
+
+    async def post_twice():
+        superseded = asyncio.ensure_future(mailbox.post_async('commander', print, 'old'))
+        await asyncio.sleep(0)
+        sent = asyncio.ensure_future(mailbox.post_async('commander', lambda: None))
+        await asyncio.sleep(0)
+        blocker.released.set()
+        return await superseded, await sent
+
+    assert asyncio.run(post_twice()) == (False, True)
+    mailbox.close()
+    first.close()
+
+
+def test_one_sender_thread_per_radio():
+    uris = ['radio://94/80/2M/E7E7E7E701',
+            'radio://94/90/1M/E7E7E7E702',
+            'radio://95/80/2M/E7E7E7E701']
+    mailboxes = [RadioSender.mailbox(uri) for uri in uris]
+    threads = [None] * len(uris)
+    sent = Event()
+
+    def record(index):
+        threads[index] = current_thread()
+        if all(threads):
+            sent.set()
+
+    for index, mailbox in enumerate(mailboxes):
+        mailbox.post('extpos', record, index)
+    assert sent.wait(1.0)
+    for mailbox in mailboxes:
+        mailbox.close()
+
+    assert threads[0] is threads[1]
+    assert threads[2] is not threads[0]
+    assert current_thread() not in threads
+    # Senders stop with the last mailbox on their radio
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_set_params_records_acknowledged_values(crazyflie):
+    updates = []
+    crazyflie.param.add_update_callback(group='ring', name='effect',
+                                        cb=lambda name, value: updates.append((name, value)))
+
+    failures = set_params(crazyflie, {'ring.effect': 3, 'posCtlPid.xyVelMax': 0.5})
+
+    assert failures == {}
+    assert crazyflie.link.written == [0, 1]
+    assert crazyflie.param.values['ring']['effect'] == '3'
+    assert crazyflie.param.values['posCtlPid']['xyVelMax'] == '0.5'
+    assert updates == [('ring.effect', '3')]
+
+
+def test_set_params_resends_when_reply_is_lost(crazyflie):
+    crazyflie.link.lose = {0: 1}
+
+    failures = set_params(crazyflie, {'ring.effect': 3, 'posCtlPid.xyVelMax': 0.5})
+
+    assert failures == {}
+    # Written again by cflib once its reply timer ran out
+    assert crazyflie.link.written == [0, 1, 0]
+    assert crazyflie.param.values['ring']['effect'] == '3'
+
+
+def test_set_params_reports_unacknowledged_writes(crazyflie):
+    # Lost until after set_params() gives up
+    crazyflie.link.lose = {1: 3}
+
+    failures = set_params(crazyflie, {'ring.effect': 3, 'posCtlPid.xyVelMax': 0.5},
+                          timeout=0.3)
+
+    assert failures == {'posCtlPid.xyVelMax': 'no acknowledgement'}
+    assert 'posCtlPid' not in crazyflie.param.values
+
+
+def test_set_params_skips_unknown_and_read_only(crazyflie):
+    failures = set_params(crazyflie, {'ring.nothing': 1, 'firmware.revision0': 1})
+
+    assert failures == {'ring.nothing': 'not in param TOC',
+                        'firmware.revision0': 'read-only'}
+    assert crazyflie.link.written == []
+
+
+def test_set_params_on_simulated_drone():
+    cf = SimSwarm(['cf0']).crazyflie('cf0')
+
+    assert set_params(cf, {'posCtlPid.xyVelMax': 0.25, 'ring.effect': 7.0}) == {}
+    assert cf.param.values['posCtlPid.xyVelMax'] == 0.25
+    assert cf.param.values['ring.effect'] == 7
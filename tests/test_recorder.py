@@ -0,0 +1,19 @@
+import numpy as np
+
+from qfly import FlightRecorder
+from qfly.recorder import POSE, SETPOINT
+
+
+def test_recording_round_trip(flight):
+    columns, bodies = FlightRecorder.load(flight)
+
+    assert bodies == ['a', 'b']
+    assert len(columns['t']) == 15
+    assert np.all(np.diff(columns['t']) > 0)
+    kinds = np.asarray(columns['kind'])
+    assert (kinds == SETPOINT).sum() == 5
+    poses = (kinds == POSE) & (np.asarray(columns['body']) == 0)
+    np.testing.assert_allclose(np.asarray(columns['x'])[poses], 0.1 * np.arange(5))
+    np.testing.assert_array_equal(np.asarray(columns['frame'])[poses], 100 + np.arange(5))
+    # Metadata is replaced whole, never left half written
+    assert not list(flight.glob('*.tmp'))
@@ -0,0 +1,42 @@
+import numpy as np
+
+from qfly import ReplaySource
+
+
+class Subscriber:
+    """
+    Stands in for QtmWrapper, keeping copies of records it is passed.
+    """
+
+    def __init__(self, body):
+        self.body = body
+        self.batch = True
+        self.received = []
+
+    def _on_record(self, record):
+        self.received.append(None if record is None else record.copy())
+
+
+def test_replay_passes_on_recorded_poses(flight):
+    replay = ReplaySource.from_recording(flight, autoplay=False)
+    subscribers = [Subscriber('a'), Subscriber('b')]
+    for subscriber in subscribers:
+        replay.subscribe(subscriber)
+    replay.open()
+
+    while replay.step():
+        pass
+
+    assert replay.finished.is_set()
+    received_a, received_b = (subscriber.received for subscriber in subscribers)
+    assert [int(record['frame']) for record in received_a] == list(range(100, 105))
+    np.testing.assert_allclose([record['position'] for record in received_a],
+                               [(0.1 * frame, 0.0, 1.0) for frame in range(5)])
+    # Yaw of 90 degrees becomes a quarter turn about z
+    np.testing.assert_allclose(received_a[0]['rotation'],
+                               [[0, -1, 0], [1, 0, 0], [0, 0, 1]], atol=1e-12)
+    np.testing.assert_allclose(received_b[1]['rotation'], np.eye(3))
+    assert [bool(record['valid']) for record in received_b] == [True, True, False, True, True]
+    # Frames are timed like they were recorded, 3 records apart
+    np.testing.assert_allclose(replay.times, 0.03 * np.arange(5))
+    replay.release()
@@ -0,0 +1,121 @@
+import pytest
+
+from qfly import Scheduler
+
+
+class FakeClock:
+    """
+    Clock that only moves when slept on, or when told to.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        assert seconds > 0
+        self.now += seconds
+
+
+def scheduler_on(clock, **kwargs):
+    return Scheduler(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_slots_are_spread_across_period():
+    clock = FakeClock()
+    scheduler = scheduler_on(clock, rate=10)
+    calls = []
+    scheduler.add(lambda name, t: calls.append((name, t)), 'a')
+    scheduler.add(lambda name, t: calls.append((name, t)), 'b')
+
+    scheduler.run(duration=0.3)
+
+    assert [name for name, _ in calls] == ['a', 'b'] * 3
+    assert [t for _, t in calls] == pytest.approx([0.0, 0.05, 0.1, 0.15, 0.2, 0.25])
+    assert scheduler.ticks == 3
+    assert scheduler.missed == 0
+    assert scheduler.max_drift == pytest.approx(0.0)
+
+
+def test_slots_share_deadline_without_spreading():
+    clock = FakeClock()
+    scheduler = scheduler_on(clock, rate=10, spread=False)
+    times = []
+    scheduler.add(times.append)
+    scheduler.add(times.append)
+
+    scheduler.run(duration=0.2)
+
+    assert times == pytest.approx([0.0, 0.0, 0.1, 0.1])
+
+
+def test_deadlines_do_not_drift_with_work():
+    clock = FakeClock()
+    scheduler = scheduler_on(clock, rate=10)
+    times = []
+
+    def work(t):
+        times.append(t)
+        clock.now += 0.03
+
+    scheduler.add(work)
+    scheduler.run(duration=0.5)
+
+    # Wakeups stay on the grid of the start time, not the previous wakeup
+    assert times == pytest.approx([0.0, 0.1, 0.2, 0.3, 0.4])
+    assert scheduler.missed == 0
+
+
+def test_overdue_ticks_are_skipped_and_counted():
+    clock = FakeClock()
+    scheduler = scheduler_on(clock, rate=10)
+    times = []
+
+    def stall_once(t):
+        times.append(t)
+        if len(times) == 2:
+            clock.now += 0.35
+
+    scheduler.add(stall_once)
+    scheduler.run(duration=0.8)
+
+    # Ticks 0.2 and 0.3 are skipped, tick 0.4 runs late at 0.45
+    assert times == pytest.approx([0.0, 0.1, 0.45, 0.5, 0.6, 0.7])
+    assert scheduler.missed == 2
+    assert scheduler.max_drift == pytest.approx(0.05)
+
+
+def test_callback_returning_false_stops():
+    clock = FakeClock()
+    scheduler = scheduler_on(clock, rate=50)
+    times = []
+    scheduler.add(lambda t: times.append(t) or t < 0.05)
+
+    scheduler.run()
+
+    assert times == pytest.approx([0.0, 0.02, 0.04, 0.06])
+
+
+def test_until_is_checked_every_tick():
+    clock = FakeClock()
+    scheduler = scheduler_on(clock, rate=50)
+    times = []
+    scheduler.add(times.append)
+
+    scheduler.run(until=lambda t: t > 0.09)
+
+    # Checked before waiting for the next tick, so the tick at 0.1 s still runs
+    assert times == pytest.approx([0.0, 0.02, 0.04, 0.06, 0.08, 0.1])
+
+
+def test_empty_schedule_waits_for_each_tick():
+    clock = FakeClock()
+    scheduler = scheduler_on(clock, rate=10)
+
+    scheduler.run(duration=0.3)
+
+    assert clock.now == pytest.approx(0.3)
+    assert scheduler.ticks == 3
+    assert scheduler.missed == 0
@@ -0,0 +1,235 @@
+from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.mem import MemoryElement
+import numpy as np
+import pytest
+
+from qfly import SimSwarm, Trajectory
+
+
+class Subscriber:
+    """
+    Stands in for QtmWrapper, keeping copies of records it is passed.
+    """
+
+    def __init__(self, body):
+        self.body = body
+        self.batch = True
+        self.received = []
+
+    def _on_record(self, record):
+        self.received.append(None if record is None else record.copy())
+
+
+def connected(bodies=('cf0',), **kwargs):
+    """
+    Lockstep simulation with the first drone connected.
+    """
+    swarm = SimSwarm(list(bodies), autoplay=False, seed=1, **kwargs)
+    cf = swarm.crazyflie(0)
+    cf.open_link('sim://0/0')
+    return swarm, cf
+
+
+def log_variances(cf, period_in_ms=10):
+    """
+    Start logging Kalman position variances, returning list samples go to.
+    """
+    samples = []
+    config = LogConfig(name='Kalman Variance', period_in_ms=period_in_ms)
+    for axis in 'XYZ':
+        config.add_variable(f'kalman.varP{axis}', 'float')
+    cf.log.add_config(config)
+    config.data_received_cb.add_callback(lambda timestamp, data, logconf: samples.append(
+        [data[f'kalman.varP{axis}'] for axis in 'XYZ']))
+    return samples
+
+
+def fly(swarm, duration, each_step=None):
+    for _ in range(round(duration * swarm.rate)):
+        if each_step is not None:
+            each_step()
+        swarm.step()
+
+
+def test_extpos_settles_kalman_variance():
+    swarm, cf = connected()
+    samples = log_variances(cf)
+
+    fly(swarm, 1.0, lambda: cf.extpos.send_extpos(*swarm.position[0]))
+    settled = np.array(samples)
+    fly(swarm, 0.5)
+    drifted = np.array(samples[len(settled):])
+
+    assert swarm.extpos_count[0] == 100
+    assert len(settled) == 100
+    assert np.all(np.diff(settled, axis=0) < 0)
+    assert np.all(settled[-1] < 0.1)
+    # Drifts apart again once external positions are over 0.1 s old
+    assert np.all(np.diff(drifted[-20:], axis=0) > 0)
+
+
+def test_reset_estimation_parameter_resets_variance():
+    swarm, cf = connected()
+    samples = log_variances(cf)
+    fly(swarm, 1.0, lambda: cf.extpos.send_extpose(*swarm.position[0], 0, 0, 0, 1))
+
+    cf.param.set_value('kalman.resetEstimation', 1)
+    swarm.step()
+
+    assert samples[-1] == pytest.approx([SimSwarm.kalman_initial] * 3, rel=0.05)
+
+
+def test_position_setpoint_flown_within_speed_limit():
+    swarm, cf = connected()
+    cf.param.set_value('posCtlPid.xyVelMax', 0.5)
+    speeds = []
+
+    def setpoint():
+        cf.commander.send_position_setpoint(2.0, 0.0, 1.0, 90.0)
+        speeds.append(np.hypot(*swarm.velocity[0, :2]))
+
+    fly(swarm, 6.0, setpoint)
+
+    assert swarm.flying[0]
+    np.testing.assert_allclose(swarm.position[0], (2.0, 0.0, 1.0), atol=0.01)
+    assert max(speeds) <= 0.5 + 1e-9
+    assert cf.param.get_value('posCtlPid.xyVelMax') == '0.5'
+    assert swarm.setpoint_count[0] == 600
+
+
+def test_motors_cut_without_setpoints():
+    swarm, cf = connected()
+    fly(swarm, 2.0, lambda: cf.commander.send_position_setpoint(0.0, 0.0, 1.0, 0.0))
+
+    fly(swarm, SimSwarm.watchdog + 1.0)
+
+    assert not swarm.flying[0]
+    assert swarm.position[0, 2] == 0.0
+
+
+def test_stop_setpoint_cuts_motors():
+    swarm, cf = connected()
+    fly(swarm, 2.0, lambda: cf.commander.send_position_setpoint(0.0, 0.0, 1.0, 0.0))
+
+    cf.commander.send_stop_setpoint()
+    fly(swarm, 1.0)
+
+    assert not swarm.flying[0]
+    assert swarm.position[0, 2] == 0.0
+
+
+def upload(cf, trajectory, trajectory_id=1):
+    """
+    Upload trajectory and define it for the high-level commander.
+    """
+    mem, = cf.mem.get_mems(MemoryElement.TYPE_TRAJ)
+    mem.trajectory = trajectory.pieces()
+    assert mem.write_data_sync()
+    cf.high_level_commander.define_trajectory(trajectory_id, 0, len(trajectory.durations))
+
+
+TRAJECTORY = Trajectory.from_keyframes([0.0, 2.0, 4.0],
+                                       [(0.0, 0.0, 0.0), (0.5, 0.0, 1.0), (0.5, 0.5, 1.0)],
+                                       [0.0, 90.0, 90.0])
+
+
+def test_trajectory_flown_by_high_level_commander():
+    swarm, cf = connected()
+    upload(cf, TRAJECTORY)
+    cf.param.set_value('commander.enHighLevel', 1)
+
+    cf.high_level_commander.start_trajectory(1, time_scale=2.0)
+    fly(swarm, 2.0)
+
+    # Yaw goes through trajectory memory in radians, and comes back in degrees
+    assert swarm.yaw[0] == pytest.approx(TRAJECTORY.evaluate(1.0)[3], rel=1e-5)
+    fly(swarm, 7.0)
+    assert swarm.flying[0]
+    np.testing.assert_allclose(swarm.position[0], (0.5, 0.5, 1.0), atol=0.01)
+    assert swarm.setpoint_count[0] == 0
+
+
+def test_trajectory_needs_high_level_commander():
+    swarm, cf = connected()
+    upload(cf, TRAJECTORY)
+
+    cf.high_level_commander.start_trajectory(1)
+    fly(swarm, 1.0)
+
+    assert not swarm.flying[0]
+
+
+def test_relative_trajectory_starts_from_setpoint():
+    swarm, cf = connected()
+    upload(cf, TRAJECTORY)
+    cf.param.set_value('commander.enHighLevel', 1)
+    fly(swarm, 3.0, lambda: cf.commander.send_position_setpoint(1.0, 0.0, 0.5, 0.0))
+
+    cf.high_level_commander.start_trajectory(1, relative_position=True)
+    fly(swarm, 6.0)
+
+    np.testing.assert_allclose(swarm.position[0], (1.5, 0.5, 1.5), atol=0.01)
+
+
+def test_setpoint_takes_over_from_trajectory():
+    swarm, cf = connected()
+    upload(cf, TRAJECTORY)
+    cf.param.set_value('commander.enHighLevel', 1)
+    cf.high_level_commander.start_trajectory(1)
+    fly(swarm, 1.0)
+
+    fly(swarm, 4.0, lambda: cf.commander.send_position_setpoint(-0.5, 0.0, 0.5, 0.0))
+
+    np.testing.assert_allclose(swarm.position[0], (-0.5, 0.0, 0.5), atol=0.01)
+
+
+def test_unknown_parameter_is_rejected():
+    swarm, cf = connected()
+
+    with pytest.raises(KeyError):
+        cf.param.set_value('nothing.here', 1)
+
+
+def test_link_loss_stops_logging():
+    swarm, cf = connected()
+    samples = log_variances(cf)
+    disconnected = []
+    cf.disconnected.add_callback(disconnected.append)
+    fly(swarm, 0.1)
+
+    cf.close_link()
+    fly(swarm, 0.1)
+
+    assert disconnected == ['sim://0/0']
+    assert not cf.is_connected()
+    assert len(samples) == 10
+
+
+def test_mocap_frames_follow_drones():
+    swarm = SimSwarm(['cf0', 'cf1'], autoplay=False, noise=0.0)
+    subscribers = [Subscriber('cf0'), Subscriber('cf1')]
+    for subscriber in subscribers:
+        swarm.subscribe(subscriber)
+    swarm.open()
+
+    swarm.step()
+
+    for index, subscriber in enumerate(subscribers):
+        record, = subscriber.received
+        assert record['valid']
+        assert record['frame'] == 1
+        np.testing.assert_allclose(record['position'], swarm.position[index])
+    swarm.release()
+
+
+def test_mocap_dropouts():
+    swarm = SimSwarm(['cf0'], autoplay=False, dropout=1.0)
+    subscriber = Subscriber('cf0')
+    swarm.subscribe(subscriber)
+    swarm.open()
+
+    swarm.step()
+
+    record, = subscriber.received
+    assert record is None or not record['valid']
+    swarm.release()
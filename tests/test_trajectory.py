@@ -0,0 +1,96 @@
+import math
+
+import numpy as np
+import pytest
+
+from qfly import Pose, Trajectory, World
+from qfly.trajectory import PIECE_COEFFICIENTS, PIECE_SIZE
+
+TIMES = [0.0, 2.0, 3.0, 5.0]
+POSITIONS = [(0.0, 0.0, 0.0), (0.5, 0.0, 1.0), (0.5, 0.5, 1.0), (0.0, 0.0, 0.5)]
+YAWS = [0.0, 90.0, 90.0, 180.0]
+
+
+@pytest.mark.parametrize('smooth', [False, True])
+def test_passes_through_keyframes_at_rest_at_ends(smooth):
+    trajectory = Trajectory.from_keyframes(TIMES, POSITIONS, YAWS, smooth=smooth)
+
+    np.testing.assert_allclose(trajectory.evaluate(TIMES),
+                               np.column_stack([POSITIONS, YAWS]), atol=1e-12)
+    velocities = trajectory.evaluate([0.0, 5.0], derivative=1)
+    np.testing.assert_allclose(velocities, 0.0, atol=1e-12)
+    assert trajectory.duration == 5.0
+
+
+def test_holds_before_start_and_after_end():
+    trajectory = Trajectory.from_keyframes(TIMES, POSITIONS)
+
+    np.testing.assert_allclose(trajectory.evaluate(-1.0), trajectory.evaluate(0.0))
+    np.testing.assert_allclose(trajectory.evaluate(9.0), trajectory.evaluate(5.0))
+
+
+@pytest.mark.parametrize('smooth', [False, True])
+def test_derivatives_match_finite_differences(smooth):
+    trajectory = Trajectory.from_keyframes(TIMES, POSITIONS, YAWS, smooth=smooth)
+    t = np.linspace(0.1, 4.9, 25)
+    h = 1e-6
+
+    for derivative in (1, 2):
+        numeric = (trajectory.evaluate(t + h, derivative - 1)
+                   - trajectory.evaluate(t - h, derivative - 1)) / (2 * h)
+        np.testing.assert_allclose(trajectory.evaluate(t, derivative), numeric, atol=1e-4)
+
+
+def test_monotone_interpolation_never_overshoots():
+    trajectory = Trajectory.from_keyframes(TIMES, POSITIONS)
+    samples = trajectory.evaluate(np.linspace(0.0, 5.0, 501))[:, :3]
+
+    assert np.all(samples >= np.min(POSITIONS, axis=0) - 1e-12)
+    assert np.all(samples <= np.max(POSITIONS, axis=0) + 1e-12)
+
+
+def test_pose_keyframes_carry_yaw():
+    trajectory = Trajectory.from_keyframes([0, 1], [Pose(0, 0, 0, yaw=10), Pose(1, 0, 0, yaw=30)])
+
+    assert trajectory.evaluate(1.0)[3] == pytest.approx(30.0)
+
+
+def test_pieces_pad_coefficients_and_convert_yaw():
+    trajectory = Trajectory.from_keyframes(TIMES, POSITIONS, YAWS)
+
+    pieces = trajectory.pieces()
+
+    assert len(pieces) == 3
+    assert trajectory.size == 3 * PIECE_SIZE
+    assert [piece.duration for piece in pieces] == [2.0, 1.0, 2.0]
+    for piece, start, coefficients in zip(pieces, TIMES, trajectory.coefficients):
+        for axis, poly in enumerate((piece.x, piece.y, piece.z)):
+            assert len(poly.values) == PIECE_COEFFICIENTS
+            np.testing.assert_allclose(poly.values[:4], coefficients[axis])
+            assert poly.values[4:] == [0.0] * 4
+        np.testing.assert_allclose(piece.yaw.values[:4], np.radians(coefficients[3]))
+        assert len(piece.pack()) == PIECE_SIZE
+    # Last piece ends at the last keyframe
+    end = sum(value * 2.0 ** k for k, value in enumerate(pieces[-1].yaw.values))
+    assert end == pytest.approx(math.pi)
+
+
+def test_check_reports_bounds_and_speed():
+    world = World(expanse=1.0, padding=0.15, speed_limit=1.0)
+
+    assert Trajectory.from_keyframes(TIMES, POSITIONS).check(world) == []
+    outside = Trajectory.from_keyframes([0, 4], [(0, 0, 0.5), (0.95, 0, 0.5)])
+    # Reported from when it first crosses into the padding
+    assert outside.check(world) == ['Outside safe volume at 3.20 s: (0.851, 0.000, 0.500)']
+    fast = Trajectory.from_keyframes([0, 0.5], [(0, 0, 0.5), (0.5, 0, 1.0)])
+    violations = fast.check(world)
+    assert [v.split()[0] for v in violations] == ['Horizontal', 'Vertical']
+
+
+def test_check_as_flown_faster_or_shifted():
+    world = World(expanse=1.0, padding=0.15, speed_limit=1.0)
+    trajectory = Trajectory.from_keyframes(TIMES, POSITIONS)
+
+    assert trajectory.check(world, time_scale=2.0) == []
+    assert trajectory.check(world, time_scale=0.25)
+    assert trajectory.check(world, offset=(0.5, 0.0, 0.0))[0].startswith('Outside')
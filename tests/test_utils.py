@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+import pytest
+
+from qfly import utils
+
+
+def rotation(axis, degrees):
+    """
+    Rotation matrix about an axis, by Rodrigues' formula.
+    """
+    x, y, z = np.asarray(axis, dtype=float) / np.linalg.norm(axis)
+    k = np.array([[0.0, -z, y], [z, 0.0, -x], [-y, x, 0.0]])
+    angle = math.radians(degrees)
+    return np.eye(3) + math.sin(angle) * k + (1 - math.cos(angle)) * k @ k
+
+
+def matrix_of(q):
+    """
+    Rotation matrix of a unit quaternion (x, y, z, w).
+    """
+    x, y, z, w = q
+    return np.array([[1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+                     [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+                     [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]])
+
+
+ROTATIONS = [rotation((1, 0, 0), 0),
+             rotation((0, 0, 1), 30),
+             rotation((1, 2, 3), -75),
+             rotation((0, 1, 1), 135),
+             # Half turns, where the trace method alone breaks down
+             rotation((1, 0, 0), 180),
+             rotation((0, 1, 0), 180),
+             rotation((0, 0, 1), 180),
+             rotation((1, 1, 0), 180),
+             rotation((1, -1, 1), 179.999)]
+
+
+@pytest.mark.parametrize('m', ROTATIONS)
+def test_quaternion_reproduces_rotation(m):
+    q = utils.rotmatrix_to_quaternion(m.tolist())
+
+    assert math.isclose(np.linalg.norm(q), 1.0, rel_tol=1e-9)
+    np.testing.assert_allclose(matrix_of(q), m, atol=1e-9)
+
+
+def test_vectorized_quaternions_match_scalar():
+    quaternions = utils.rotmatrices_to_quaternions(np.stack(ROTATIONS))
+
+    for m, q in zip(ROTATIONS, quaternions):
+        expected = utils.rotmatrix_to_quaternion(m.tolist())
+        # q and -q are the same rotation
+        sign = 1.0 if np.dot(q, expected) >= 0 else -1.0
+        np.testing.assert_allclose(sign * q, expected, atol=1e-9)
+        np.testing.assert_allclose(matrix_of(q), m, atol=1e-9)
+
+
+def test_vectorized_quaternions_keep_leading_shape():
+    m = np.broadcast_to(np.eye(3), (2, 4, 3, 3))
+
+    quaternions = utils.rotmatrices_to_quaternions(m)
+
+    assert quaternions.shape == (2, 4, 4)
+    np.testing.assert_allclose(quaternions, np.broadcast_to([0, 0, 0, 1], (2, 4, 4)))
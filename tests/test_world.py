@@ -0,0 +1,70 @@
+import math
+
+import numpy as np
+
+from qfly import Pose, World
+from qfly.world import (OUTSIDE_X, OUTSIDE_Y, OUTSIDE_Z, SAFE, TOO_FAST_XY, TOO_FAST_Z,
+                        TRACKING_LOST)
+
+
+def test_check_combines_reason_codes():
+    world = World(origin=Pose(0, 0, 0), expanse=1.0, tracking_tolerance=10)
+    positions = [(0.0, 0.0, 1.0),
+                 (1.5, 0.0, 1.0),
+                 (0.0, -1.5, 1.0),
+                 (0.0, 0.0, 2.5),
+                 (1.5, 0.0, -0.5),
+                 (math.nan, 0.0, 1.0)]
+
+    codes = world.check(positions, tracking_loss=[0, 0, 0, 0, 11, 10])
+
+    assert codes.tolist() == [SAFE,
+                              OUTSIDE_X,
+                              OUTSIDE_Y,
+                              OUTSIDE_Z,
+                              OUTSIDE_X | OUTSIDE_Z | TRACKING_LOST,
+                              OUTSIDE_X]
+
+
+def test_check_follows_origin():
+    world = World(origin=Pose(0, 0, 0), expanse=1.0)
+    world.origin = Pose(2.0, 0, 0)
+
+    assert world.check([(2.5, 0.0, 1.0), (0.5, 0.0, 1.0)]).tolist() == [SAFE, OUTSIDE_X]
+
+
+def test_clamp_matches_pose_clamp():
+    world = World(origin=Pose(0, 0, 0), expanse=1.0, padding=0.1)
+    positions = np.array([(0.5, -0.5, 1.0), (2.0, -2.0, -1.0), (-0.95, 0.95, 2.5)])
+
+    clamped = world.clamp(positions)
+
+    for position, expected in zip(positions, clamped):
+        np.testing.assert_allclose(Pose(*position).clamp(world)[:3], expected)
+    assert world.clamp(positions, out=positions) is positions
+
+
+def test_check_path_keeps_clear_of_padding_and_speed_limit():
+    world = World(origin=Pose(0, 0, 0), expanse=1.0, padding=0.2, speed_limit=0.5)
+    positions = np.array([[0.0, 0.0, 1.0],
+                          [0.9, 0.0, 1.0],
+                          [0.0, 0.0, 1.0],
+                          [0.0, 0.0, 1.0]])
+    velocities = np.array([[0.3, 0.3, 0.5],
+                           [0.0, 0.0, 0.0],
+                           [0.4, 0.4, 0.0],
+                           [0.0, 0.0, -0.6]])
+
+    codes = world.check_path(positions, velocities)
+
+    # Inside safe volume, but in the padding setpoints are clamped out of
+    assert codes.tolist() == [SAFE, OUTSIDE_X, TOO_FAST_XY, TOO_FAST_Z]
+
+
+def test_check_path_keeps_leading_shape():
+    world = World()
+
+    codes = world.check_path(np.zeros((5, 3, 3)) + (0, 0, 1), np.zeros((5, 3, 3)))
+
+    assert codes.shape == (5, 3)
+    assert not codes.any()